@@ -41,10 +41,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'workshop.profiling.QueryProfilingMiddleware',  # no-op unless REQUEST_PROFILING
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'workshop.middleware.RoleMiddleware',
     'workshop.middleware.SessionTrackingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -56,6 +58,22 @@ SESSION_COOKIE_AGE = 3456000
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False 
 SESSION_SAVE_EVERY_REQUEST = True 
 
+# Session storage mode:
+#   db    → default DB engine: django_session is rewritten on every request
+#   cache → workshop.session_backend: sessions live in the cache and hit the
+#           DB only on login/logout, data changes or every SESSION_PERSIST_INTERVAL
+#           (writes). With the per-process LocMemCache each request still reads
+#           the row, so a revoke in HQ reaches every worker at once.
+SESSION_MODE = config('SESSION_MODE', default='db')
+if SESSION_MODE == 'cache':
+    SESSION_ENGINE = 'workshop.session_backend'
+SESSION_PERSIST_INTERVAL = config('SESSION_PERSIST_INTERVAL', default=60 * 15, cast=int)  # seconds
+
+# Session activity (HQ monitor) is buffered per process and flushed in bulk
+SESSION_ACTIVITY_FLUSH_INTERVAL = 60 * 5  # seconds
+SESSION_ACTIVITY_FLUSH_THRESHOLD = 200    # pending sessions
+SESSION_ACTIVITY_KNOWN_LIMIT = 5000       # sessions remembered per process (LRU)
+
 # Browser Defense (Hardening)
 SESSION_COOKIE_HTTPONLY = True
 CSRF_COOKIE_HTTPONLY = True
@@ -66,7 +84,8 @@ ROOT_URLCONF = 'formulad_workshop.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates + render timing for request profiling (workshop/profiling.py)
+        'BACKEND': 'workshop.profiling.ProfiledDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -109,6 +128,32 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache (analysis zone results and user roles are cached with version-based
+# invalidation). LocMemCache is per-process: multi-worker deployments should
+# point this at a shared backend (e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache) so a write in one
+# worker invalidates cached zones in all of them. Roles are only cached across
+# requests with a shared backend (workshop/roles.py) — with LocMemCache a
+# group change in one worker would not reach the others, so each request
+# reads the user's groups once instead.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='formulad-workshop'),
+    }
+}
+
+# Owner alerts are queued in NotificationOutbox and delivered by
+# `python manage.py send_notifications` (API base URLs overridable for testing).
+# That worker must run alongside the web server: without it no security alert
+# or login / password-reset OTP is delivered, not even printed to a terminal.
+TWILIO_API_URL = config('TWILIO_API_URL', default='https://api.twilio.com')
+TELEGRAM_API_URL = config('TELEGRAM_API_URL', default='https://api.telegram.org')
+NOTIFICATION_BACKENDS = {
+    'SMS': 'workshop.notification_backends.TwilioSMSBackend',
+    'TELEGRAM': 'workshop.notification_backends.TelegramBackend',
+}
+
 # Authentication settings
 LOGIN_REDIRECT_URL = 'home'
 LOGIN_URL = 'login'
@@ -124,6 +169,10 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        'json_line': {
+            'format': '{message}',
+            'style': '{',
+        },
     },
     'handlers': {
         'file': {
@@ -134,6 +183,15 @@ LOGGING = {
             'backupCount': 5,
             'formatter': 'verbose',
         },
+        'slow_requests': {
+            'level': 'WARNING',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': os.path.join(BASE_DIR, 'slow_requests.log'),
+            'maxBytes': 5 * 1024 * 1024,  # 5 MB
+            'backupCount': 5,
+            'formatter': 'json_line',
+            'delay': True,
+        },
     },
     'loggers': {
         'django': {
@@ -141,5 +199,19 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': True,
         },
+        # One JSON line per request slower than SLOW_REQUEST_MS
+        'workshop.profiling': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }
+
+# Request profiling (opt-in): query count, DB / template time and slowest SQL per
+# request, slow request log and the /manage/performance/ aggregates
+REQUEST_PROFILING = config('REQUEST_PROFILING', default=False, cast=bool)
+SLOW_REQUEST_MS = config('SLOW_REQUEST_MS', default=500, cast=int)
+PROFILING_SLOW_QUERIES = 5        # slowest queries kept per request
+PROFILING_WINDOW_MINUTES = 60     # aggregates shown on the performance page
+PROFILING_FLUSH_INTERVAL = 10     # seconds between merges into the shared cache
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import (
-    Category, Item, ConsumptionRecord,
+    Category, Item, ConsumptionRecord, StockMovement,
     SupplierShop, ShopCatalogItem,
     SupplierRestockBill, SupplierRestockItem, SupplierPayment,
 )
@@ -16,6 +16,12 @@ class ItemAdmin(admin.ModelAdmin):
     list_filter = ('category',)
     search_fields = ('name',)
 
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('item', 'delta', 'source_type', 'source_id', 'timestamp')
+    list_filter = ('source_type',)
+    search_fields = ('item__name',)
+
 @admin.register(ConsumptionRecord)
 class ConsumptionRecordAdmin(admin.ModelAdmin):
     list_display = ('user', 'item', 'quantity', 'date')
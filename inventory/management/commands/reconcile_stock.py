@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from inventory.models import Item, StockMovement
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds Item.current_stock from the StockMovement ledger (SUM of deltas per item)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report drifted items, do not rewrite current_stock',
+        )
+
+    def handle(self, *args, **options):
+        # ONE grouped query: ledger balance per item
+        ledger = dict(
+            StockMovement.objects.values('item').annotate(balance=Sum('delta'))
+            .order_by().values_list('item', 'balance')
+        )
+
+        drifted = [
+            (pk, name, stock, ledger.get(pk, 0.0))
+            for pk, name, stock in Item.objects.values_list('pk', 'name', 'current_stock').iterator()
+            if abs(stock - ledger.get(pk, 0.0)) > 1e-6
+        ]
+        for pk, name, stock, balance in drifted:
+            self.stdout.write(f'   {name} (#{pk}): cached {stock:g}, ledger {balance:g}')
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('✅ All item stock matches the movement ledger'))
+            return
+        if options['check']:
+            self.stdout.write(self.style.WARNING(f'⚠️ {len(drifted)} item(s) out of sync with the ledger'))
+            return
+
+        balance_sq = Subquery(
+            StockMovement.objects.filter(item=OuterRef('pk')).values('item')
+            .annotate(balance=Sum('delta')).values('balance')[:1],
+            output_field=FloatField(),
+        )
+        with transaction.atomic():
+            Item.objects.update(current_stock=Coalesce(balance_sq, Value(0.0)))
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt stock for {len(drifted)} drifted item(s) from the ledger'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+def populate_normalized_names(apps, schema_editor):
+    Item = apps.get_model('inventory', 'Item')
+    items = list(Item.objects.only('id', 'name'))
+    for item in items:
+        item.normalized_name = (item.name or '').strip().lower()
+    Item.objects.bulk_update(items, ['normalized_name'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_remove_supplierpayment_linked_bill'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='normalized_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(populate_normalized_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def seed_opening_balances(apps, schema_editor):
+    """One OPENING movement per stocked item so SUM(delta) == current_stock."""
+    Item = apps.get_model('inventory', 'Item')
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    StockMovement.objects.bulk_create(
+        (
+            StockMovement(item_id=pk, source_type='OPENING', source_id=pk, delta=stock)
+            for pk, stock in Item.objects.exclude(current_stock=0).values_list('pk', 'current_stock').iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_item_normalized_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(choices=[('OPENING', 'Opening Balance'), ('JOB_SPARE', 'Job Card Spare Item'), ('JOB_CARD', 'Job Card Trash / Restore'), ('RESTOCK', 'Supplier Restock'), ('MANUAL', 'Manual Correction')], max_length=10)),
+                ('source_id', models.BigIntegerField(blank=True, null=True)),
+                ('delta', models.FloatField()),
+                ('timestamp', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='inventory.item')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['item', '-timestamp'], name='inventory_s_item_id_149929_idx'), models.Index(fields=['source_type', 'source_id'], name='inventory_s_source__18ec1c_idx')],
+            },
+        ),
+        migrations.RunPython(seed_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_stockmovement'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consumptionrecord',
+            index=models.Index(fields=['-timestamp'], name='inventory_c_timesta_fa4df3_idx'),
+        ),
+    ]
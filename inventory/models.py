@@ -3,6 +3,8 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from workshop.snapshots import FieldSnapshotMixin
+
 class Category(models.Model):
     """
     Groups Inventory Items (e.g., Engine Parts, Fluids, Electrical).
@@ -23,12 +25,15 @@ class Item(models.Model):
     Attributes:
         category (ForeignKey): Link to parent group.
         name (CharField): Part name (matches SparePart master list).
+        normalized_name (CharField): Indexed lower-cased name, used by the stock
+            signals instead of an unindexable `name__iexact` scan.
         average_stock (FloatField): Threshold for low-stock warnings.
         current_stock (FloatField): Real-time quantity on hand.
         usage_count (FloatField): Popularity score for smart-sorting.
     """
     category = models.ForeignKey(Category, related_name='items', on_delete=models.CASCADE)
     name = models.CharField(max_length=200, db_index=True)
+    normalized_name = models.CharField(max_length=200, db_index=True, editable=False, default='')
     average_stock = models.FloatField(default=0, help_text="Ideal stock level for calculation")
     current_stock = models.FloatField(default=0)
     usage_count = models.FloatField(default=0, help_text="Cached popularity score (frequency of use)")
@@ -45,6 +50,18 @@ class Item(models.Model):
     def __str__(self):
         return f"{self.category.name} - {self.name}"
 
+    @staticmethod
+    def normalize_name(name):
+        """Canonical key for matching spare part names to warehouse items."""
+        return (name or '').strip().lower()
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = self.normalize_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'normalized_name'}
+        super().save(*args, **kwargs)
+
     def stock_percentage(self):
         """Calculates health percentage for visual progress bars."""
         if self.average_stock <= 0:
@@ -61,6 +78,43 @@ class Item(models.Model):
         else:
             return "#22c55e" # Green (Healthy)
 
+class StockMovement(models.Model):
+    """
+    Append-only ledger of every change to an Item's stock.
+    Item.current_stock is a cached projection: SUM(delta) per item.
+    `manage.py reconcile_stock` rebuilds the projection from this table.
+
+    Attributes:
+        source_type (CharField): What caused the movement (see SOURCE_TYPES).
+        source_id (BigIntegerField): PK of the causing row (spare item, job card,
+            restock item or item for manual corrections), if any.
+        delta (FloatField): Effective change applied (negative = deducted).
+            Deductions are clamped so stock never goes below zero.
+    """
+    SOURCE_TYPES = [
+        ('OPENING', 'Opening Balance'),
+        ('JOB_SPARE', 'Job Card Spare Item'),
+        ('JOB_CARD', 'Job Card Trash / Restore'),
+        ('RESTOCK', 'Supplier Restock'),
+        ('MANUAL', 'Manual Correction'),
+    ]
+
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='movements')
+    source_type = models.CharField(max_length=10, choices=SOURCE_TYPES)
+    source_id = models.BigIntegerField(null=True, blank=True)
+    delta = models.FloatField()
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['item', '-timestamp']),
+            models.Index(fields=['source_type', 'source_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.item.name}: {self.delta:+g} ({self.source_type} #{self.source_id})"
+
+
 class ConsumptionRecord(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
@@ -68,6 +122,12 @@ class ConsumptionRecord(models.Model):
     date = models.DateField(default=timezone.now)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Consumption history, newest first
+            models.Index(fields=['-timestamp']),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.item.name} ({self.quantity})"
 
@@ -162,13 +222,16 @@ class SupplierRestockBill(models.Model):
             self.supplier.update_totals()
 
 
-class SupplierRestockItem(models.Model):
+class SupplierRestockItem(FieldSnapshotMixin, models.Model):
     bill = models.ForeignKey(SupplierRestockBill, on_delete=models.CASCADE, related_name='items')
     item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='restock_items')
     quantity = models.FloatField()
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Previous quantity for the restock stock signal
+    snapshot_fields = ('quantity',)
+
     def __str__(self):
         return f"{self.item.name} x {self.quantity}"
 
@@ -1,28 +1,21 @@
 # inventory/signals.py
 from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.db.models import F, Value
-from django.db.models.functions import Greatest
+from workshop.analysis_cache import invalidate_zone_cache
+from workshop.autocomplete_index import invalidate_autocomplete_index
 from workshop.models import JobCardSpareItem, JobCard
-from .models import Item, SupplierRestockItem
+from .stock import queue_stock_delta, queue_stock_movement, apply_stock_movements, ALL
+from .models import Item, SupplierShop, SupplierRestockBill, SupplierRestockItem, SupplierPayment
 
 @receiver(pre_save, sender=JobCardSpareItem)
 def track_old_quantity(sender, instance, **kwargs):
     """
     Snapshots the original part data before a database commit.
     This is critical for calculating stock deltas during updates.
+    The values come from the load-time snapshot (FieldSnapshotMixin), not a re-fetch.
     """
-    if instance.pk:
-        try:
-            old_instance = JobCardSpareItem.objects.get(pk=instance.pk)
-            instance._old_quantity = old_instance.quantity or 0
-            instance._old_name = old_instance.spare_part_name
-        except JobCardSpareItem.DoesNotExist:
-            instance._old_quantity = 0
-            instance._old_name = None
-    else:
-        instance._old_quantity = 0
-        instance._old_name = None
+    instance._old_quantity = instance.get_original('quantity') or 0
+    instance._old_name = instance.get_original('spare_part_name')
 
 @receiver(post_save, sender=JobCardSpareItem)
 def update_stock_on_save(sender, instance, created, **kwargs):
@@ -44,37 +37,28 @@ def update_stock_on_save(sender, instance, created, **kwargs):
     Scenario C: New Entry
         1. Deduct full quantity from Warehouse.
     """
+    # Status / price / shop edits do not move stock
+    if not created and not instance.has_changed('spare_part_name', 'quantity'):
+        return
+
     new_qty = float(instance.quantity or 0)
     new_name = instance.spare_part_name
     
     old_qty = float(getattr(instance, '_old_quantity', 0))
     old_name = getattr(instance, '_old_name', None)
 
-    # Logic Implementation...
+    # Logic Implementation (deltas are resolved/applied in one batch, see inventory/stock.py)
     if old_name and old_name != new_name:
         # Scenario A: Rename
-        old_inv_item = Item.objects.filter(name__iexact=old_name).first()
-        if old_inv_item:
-            Item.objects.filter(pk=old_inv_item.pk).update(
-                current_stock=F('current_stock') + old_qty
-            )
-            
+        queue_stock_delta(old_name, old_qty, source_id=instance.pk)
         if new_name:
-            new_inv_item = Item.objects.filter(name__iexact=new_name).first()
-            if new_inv_item:
-                Item.objects.filter(pk=new_inv_item.pk).update(
-                    current_stock=Greatest(F('current_stock') - new_qty, Value(0.0))
-                )
+            queue_stock_delta(new_name, -new_qty, source_id=instance.pk)
                 
     elif new_name:
         # Scenario B/C: Quantity Change
         diff = new_qty - old_qty
         if diff != 0:
-            inv_item = Item.objects.filter(name__iexact=new_name).first()
-            if inv_item:
-                Item.objects.filter(pk=inv_item.pk).update(
-                    current_stock=Greatest(F('current_stock') - diff, Value(0.0))
-                )
+            queue_stock_delta(new_name, -diff, source_id=instance.pk)
 
 @receiver(post_delete, sender=JobCardSpareItem)
 def restore_stock_on_delete(sender, instance, **kwargs):
@@ -83,25 +67,14 @@ def restore_stock_on_delete(sender, instance, **kwargs):
     Ensure 100% warehouse integrity on cancellations.
     """
     if instance.spare_part_name and instance.quantity:
-        inv_item = Item.objects.filter(name__iexact=instance.spare_part_name).first()
-        if inv_item:
-            Item.objects.filter(pk=inv_item.pk).update(
-                current_stock=F('current_stock') + float(instance.quantity)
-            )
+        queue_stock_delta(instance.spare_part_name, float(instance.quantity), source_id=instance.pk)
 
 # -----------------------------------------------------------------------------
 # JobCard Soft-Delete Reversal
 # -----------------------------------------------------------------------------
 @receiver(pre_save, sender=JobCard)
 def track_jobcard_deleted_state(sender, instance, **kwargs):
-    if instance.pk:
-        try:
-            old_instance = JobCard.objects.get(pk=instance.pk)
-            instance._old_is_deleted = old_instance.is_deleted
-        except JobCard.DoesNotExist:
-            instance._old_is_deleted = False
-    else:
-        instance._old_is_deleted = False
+    instance._old_is_deleted = instance.get_original('is_deleted', False)
 
 @receiver(post_save, sender=JobCard)
 def update_stock_on_jobcard_delete(sender, instance, created, **kwargs):
@@ -116,43 +89,45 @@ def update_stock_on_jobcard_delete(sender, instance, created, **kwargs):
     spare_items = instance.spares.filter(spare_part_name__isnull=False).exclude(spare_part_name='')
     
     qty_map = {}
-    for spare in spare_items:
-        name_lower = spare.spare_part_name.strip().lower()
-        qty_map[name_lower] = qty_map.get(name_lower, 0) + float(spare.quantity or 0)
+    for name, qty in spare_items.values_list('spare_part_name', 'quantity'):
+        name_lower = Item.normalize_name(name)
+        qty_map[name_lower] = qty_map.get(name_lower, 0) + float(qty or 0)
 
-    for name_lower, total_qty in qty_map.items():
-        Item.objects.filter(name__iexact=name_lower).update(
-            current_stock=Greatest(F('current_stock') + (direction * total_qty), Value(0.0))
-        )
+    # Every matching item, all names resolved in one query
+    apply_stock_movements({
+        (('name', name_lower, ALL), 'JOB_CARD', instance.pk): direction * total_qty
+        for name_lower, total_qty in qty_map.items()
+    })
 
 # -----------------------------------------------------------------------------
 # Supplier Restock Signals
 # -----------------------------------------------------------------------------
 @receiver(pre_save, sender=SupplierRestockItem)
 def track_old_restock_quantity(sender, instance, **kwargs):
-    if instance.pk:
-        try:
-            old_instance = SupplierRestockItem.objects.get(pk=instance.pk)
-            instance._old_quantity = old_instance.quantity or 0
-        except SupplierRestockItem.DoesNotExist:
-            instance._old_quantity = 0
-    else:
-        instance._old_quantity = 0
+    instance._old_quantity = instance.get_original('quantity') or 0
 
 @receiver(post_save, sender=SupplierRestockItem)
 def update_stock_on_restock_save(sender, instance, created, **kwargs):
+    if not created and not instance.has_changed('quantity'):
+        return
     new_qty = float(instance.quantity or 0)
     old_qty = float(getattr(instance, '_old_quantity', 0))
     diff = new_qty - old_qty
     
-    if diff != 0 and instance.item:
-        Item.objects.filter(pk=instance.item.pk).update(
-            current_stock=Greatest(F('current_stock') + diff, Value(0.0))
-        )
+    if diff != 0 and instance.item_id:
+        queue_stock_movement(diff, 'RESTOCK', instance.pk, item_id=instance.item_id)
 
 @receiver(post_delete, sender=SupplierRestockItem)
 def restore_stock_on_restock_delete(sender, instance, **kwargs):
-    if instance.item and instance.quantity:
-        Item.objects.filter(pk=instance.item.pk).update(
-            current_stock=Greatest(F('current_stock') - float(instance.quantity), Value(0.0))
-        )
+    if instance.item_id and instance.quantity:
+        queue_stock_movement(-float(instance.quantity), 'RESTOCK', instance.pk, item_id=instance.item_id)
+
+
+# Supplier bills and payments feed the Owner Analysis inventory zone
+for _model in (SupplierShop, SupplierRestockBill, SupplierRestockItem, SupplierPayment):
+    post_save.connect(invalidate_zone_cache, sender=_model, dispatch_uid=f'zone_cache_save_{_model.__name__}')
+    post_delete.connect(invalidate_zone_cache, sender=_model, dispatch_uid=f'zone_cache_delete_{_model.__name__}')
+
+# Inventory item names feed the spares autocomplete
+post_save.connect(invalidate_autocomplete_index, sender=Item, dispatch_uid='autocomplete_save_Item')
+post_delete.connect(invalidate_autocomplete_index, sender=Item, dispatch_uid='autocomplete_delete_Item')
@@ -0,0 +1,130 @@
+# inventory/stock.py
+"""
+Batched Workshop-to-Warehouse stock adjustments, recorded in the StockMovement ledger.
+
+Every stock change is described as a movement: (target item, delta, source).
+Movements are resolved, applied and written in bulk:
+  - ONE locked read of the affected Items (by indexed normalized_name or pk)
+  - ONE UPDATE of Item.current_stock (CASE per item)
+  - ONE bulk INSERT into StockMovement
+— per save outside a batch, or per deferred_totals() block (a whole job card
+formset or restock bill).
+
+Item.current_stock stays the O(1) read path; it always equals SUM(delta) of
+the item's movements because the ledger stores the *effective* delta (a
+deduction is clamped so stock never drops below zero, as before).
+
+Name matching rules (unchanged from the per-line signals):
+  - 'first': the line's single best match (Item default ordering) — spare
+             save / rename / delete.
+  - 'all':   every Item with that name — job card soft-delete / restore.
+"""
+from django.db import transaction
+from django.db.models import Case, FloatField, Q, Value, When
+
+from workshop.totals import block_buffer
+from .models import Item, StockMovement
+
+FIRST = 'first'
+ALL = 'all'
+
+
+def queue_stock_movement(delta, source_type, source_id=None, *, name=None, item_id=None, match=FIRST):
+    """
+    Records a stock change for `item_id`, or for the item(s) named `name`
+    (case-insensitive). Positive delta restores stock, negative deducts.
+    Applied immediately, or with the rest of the batch inside deferred_totals().
+    """
+    if not delta:
+        return
+    if item_id is not None:
+        target = ('pk', item_id)
+    else:
+        key = Item.normalize_name(name)
+        if not key:
+            return
+        target = ('name', key, match)
+
+    entry = (target, source_type, source_id)
+    buffer = block_buffer('inventory_stock', apply_stock_movements)
+    if buffer is None:
+        apply_stock_movements({entry: float(delta)})
+        return
+    buffer[entry] = buffer.get(entry, 0.0) + float(delta)
+
+
+def queue_stock_delta(name, delta, source_type='JOB_SPARE', source_id=None, match=FIRST):
+    """Name-based shortcut used by the job card spare signals."""
+    queue_stock_movement(delta, source_type, source_id, name=name, match=match)
+
+
+def _lock_targets(entries):
+    """
+    ONE query: locks and loads every Item the entries point at.
+    Returns ({normalized_name: [pk, ...] in default ordering}, {pk: current_stock}).
+    """
+    names = {target[1] for target, _, _ in entries if target[0] == 'name'}
+    pks = {target[1] for target, _, _ in entries if target[0] == 'pk'}
+
+    rows = Item.objects.filter(Q(normalized_name__in=names) | Q(pk__in=pks))
+
+    by_name, stock = {}, {}
+    for pk, name, current in rows.select_for_update().values_list('pk', 'normalized_name', 'current_stock'):
+        by_name.setdefault(name, []).append(pk)
+        stock[pk] = current
+    return by_name, stock
+
+
+def apply_stock_movements(movements):
+    """
+    Applies {(target, source_type, source_id): delta} in bulk.
+    Deductions are clamped per movement, in queue order, so the outcome is the
+    same as applying the saves one by one.
+    """
+    movements = {entry: d for entry, d in movements.items() if d}
+    if not movements:
+        return
+
+    with transaction.atomic():
+        by_name, stock = _lock_targets(movements)
+        new_stock = dict(stock)
+        ledger = []
+
+        for (target, source_type, source_id), delta in movements.items():
+            if target[0] == 'pk':
+                pks = [target[1]] if target[1] in stock else []
+            else:
+                pks = by_name.get(target[1], [])
+                if target[2] != ALL:
+                    pks = pks[:1]
+            for pk in pks:
+                effective = max(new_stock[pk] + delta, 0.0) - new_stock[pk]
+                if effective:
+                    new_stock[pk] += effective
+                    ledger.append(StockMovement(
+                        item_id=pk, source_type=source_type, source_id=source_id, delta=effective,
+                    ))
+
+        changed = {pk: value for pk, value in new_stock.items() if value != stock[pk]}
+        if changed:
+            Item.objects.filter(pk__in=changed).update(
+                current_stock=Case(
+                    *[When(pk=pk, then=Value(value)) for pk, value in changed.items()],
+                    output_field=FloatField(),
+                )
+            )
+        StockMovement.objects.bulk_create(ledger)
+
+
+def set_stock(item, new_stock, source_type='MANUAL'):
+    """
+    Manual correction: sets an item's stock to `new_stock` and records the
+    difference in the ledger, so the projection and the ledger stay equal.
+    """
+    with transaction.atomic():
+        current = Item.objects.select_for_update().values_list('current_stock', flat=True).get(pk=item.pk)
+        delta = float(new_stock) - current
+        Item.objects.filter(pk=item.pk).update(current_stock=float(new_stock))
+        if delta:
+            StockMovement.objects.create(item_id=item.pk, source_type=source_type, source_id=item.pk, delta=delta)
+    item.current_stock = float(new_stock)
@@ -1,6 +1,14 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
 from django.test import TestCase
-from inventory.models import Category, Item
+from django.test.utils import CaptureQueriesContext
+from inventory.models import Category, Item, StockMovement, SupplierShop, SupplierRestockBill, SupplierRestockItem
+from inventory.stock import set_stock
 from workshop.models import JobCard, JobCardSpareItem
+from workshop.totals import deferred_totals
 from datetime import date
 
 
@@ -98,3 +106,141 @@ class InventorySignalsTestCase(TestCase):
         track_old_quantity(sender=JobCardSpareItem, instance=spare)
         self.assertEqual(spare._old_quantity, 0)
         self.assertIsNone(spare._old_name)
+
+    # ------------------------------------------------------------------
+    # Load-time snapshots (no pre_save re-fetch)
+    # ------------------------------------------------------------------
+    def test_update_reads_old_values_from_snapshot(self):
+        JobCardSpareItem.objects.create(job_card=self.job, spare_part_name='Oil Filter', quantity=2)
+        spare = JobCardSpareItem.objects.get(job_card=self.job)
+
+        spare.quantity = 3
+        with CaptureQueriesContext(connection) as ctx:
+            spare.save()
+
+        refetches = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT') and '"workshop_jobcardspareitem"."id" =' in q['sql']
+        ]
+        self.assertEqual(refetches, [])
+        self.item_oil.refresh_from_db()
+        self.assertEqual(self.item_oil.current_stock, 7)
+
+    def test_unrelated_edit_skips_stock_sync(self):
+        spare = JobCardSpareItem.objects.create(job_card=self.job, spare_part_name='Oil Filter', quantity=2)
+
+        spare.status = 'ORDERED'
+        with CaptureQueriesContext(connection) as ctx:
+            spare.save()
+
+        self.assertFalse([q for q in ctx.captured_queries if '"inventory_item"' in q['sql']])
+        self.item_oil.refresh_from_db()
+        self.assertEqual(self.item_oil.current_stock, 8)
+
+    # ------------------------------------------------------------------
+    # Normalized-name resolution
+    # ------------------------------------------------------------------
+    def test_normalized_name_maintained_on_save(self):
+        self.item_oil.name = '  OIL Filter Premium '
+        self.item_oil.save(update_fields=['name'])
+        self.item_oil.refresh_from_db()
+        self.assertEqual(self.item_oil.normalized_name, 'oil filter premium')
+
+    def test_case_insensitive_match(self):
+        JobCardSpareItem.objects.create(
+            job_card=self.job, spare_part_name='oil FILTER', quantity=4
+        )
+        self.item_oil.refresh_from_db()
+        self.assertEqual(self.item_oil.current_stock, 6)
+
+    def test_batch_resolves_names_in_one_query(self):
+        """Inside deferred_totals() all lines share one Item lookup and one UPDATE."""
+        with CaptureQueriesContext(connection) as ctx:
+            with deferred_totals():
+                for name in ('Oil Filter', 'Air Filter', 'Oil Filter', 'Unknown Part'):
+                    JobCardSpareItem.objects.create(job_card=self.job, spare_part_name=name, quantity=1)
+
+        item_queries = [q['sql'] for q in ctx.captured_queries if '"inventory_item"' in q['sql']]
+        self.assertEqual(len([q for q in item_queries if q.startswith('SELECT')]), 1)
+        self.assertEqual(len([q for q in item_queries if q.startswith('UPDATE')]), 1)
+
+        self.item_oil.refresh_from_db()
+        self.item_air.refresh_from_db()
+        self.assertEqual(self.item_oil.current_stock, 8)
+        self.assertEqual(self.item_air.current_stock, 9)
+
+    def test_jobcard_soft_delete_restores_in_batch(self):
+        JobCardSpareItem.objects.create(job_card=self.job, spare_part_name='Oil Filter', quantity=2)
+        JobCardSpareItem.objects.create(job_card=self.job, spare_part_name='Air Filter', quantity=3)
+
+        self.job.is_deleted = True
+        self.job.save()
+        self.item_oil.refresh_from_db()
+        self.item_air.refresh_from_db()
+        self.assertEqual(self.item_oil.current_stock, 10)
+        self.assertEqual(self.item_air.current_stock, 10)
+
+        self.job.is_deleted = False
+        self.job.save()
+        self.item_oil.refresh_from_db()
+        self.assertEqual(self.item_oil.current_stock, 8)
+
+
+class StockMovementLedgerTestCase(TestCase):
+    """Every stock change is written to the StockMovement ledger."""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Consumables')
+        self.item = Item.objects.create(category=self.category, name='Oil Filter', average_stock=10)
+        set_stock(self.item, 10, source_type='OPENING')
+        self.job = JobCard.objects.create(
+            admitted_date=date.today(), brand_name='Toyota', model_name='Corolla',
+            registration_number='KL01LED1234'
+        )
+
+    def _ledger_balance(self):
+        return StockMovement.objects.filter(item=self.item).aggregate(total=Sum('delta'))['total']
+
+    def _assert_in_sync(self, expected):
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.current_stock, expected)
+        self.assertEqual(self._ledger_balance(), expected)
+
+    def test_spare_lifecycle_is_recorded(self):
+        spare = JobCardSpareItem.objects.create(job_card=self.job, spare_part_name='Oil Filter', quantity=2)
+        spare.quantity = 5
+        spare.save()
+        self._assert_in_sync(5)
+
+        movements = StockMovement.objects.filter(source_type='JOB_SPARE', source_id=spare.pk)
+        self.assertEqual(sorted(movements.values_list('delta', flat=True)), [-3.0, -2.0])
+
+        spare.delete()
+        self._assert_in_sync(10)
+
+    def test_clamped_deduction_records_effective_delta(self):
+        JobCardSpareItem.objects.create(job_card=self.job, spare_part_name='Oil Filter', quantity=15)
+        self._assert_in_sync(0)
+        self.assertEqual(StockMovement.objects.get(source_type='JOB_SPARE').delta, -10)
+
+    def test_restock_and_manual_correction_are_recorded(self):
+        shop = SupplierShop.objects.create(name='Parts Hub')
+        bill = SupplierRestockBill.objects.create(supplier=shop, bill_date=date.today())
+        SupplierRestockItem.objects.create(bill=bill, item=self.item, quantity=4, total_price=400)
+        self._assert_in_sync(14)
+
+        set_stock(self.item, 12)
+        self._assert_in_sync(12)
+        self.assertEqual(StockMovement.objects.get(source_type='MANUAL').delta, -2)
+
+    def test_reconcile_stock_repairs_drift(self):
+        Item.objects.filter(pk=self.item.pk).update(current_stock=99)
+
+        out = StringIO()
+        call_command('reconcile_stock', '--check', stdout=out)
+        self.assertIn('out of sync', out.getvalue())
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.current_stock, 99)
+
+        call_command('reconcile_stock', stdout=StringIO())
+        self._assert_in_sync(10)
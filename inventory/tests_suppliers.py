@@ -8,7 +8,8 @@ from decimal import Decimal
 from django.test import TestCase, Client
 from django.contrib.auth.models import User, Group
 from django.urls import reverse
-from django.db import transaction
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
 
 from .models import (
     Category, Item, SupplierShop, ShopCatalogItem,
@@ -505,6 +506,28 @@ class SupplierShopViewTests(TestCase):
         self.assertContains(response, 'Fully Covered')
         self.assertContains(response, 'Unpaid')
 
+    def test_status_cascade_uses_running_window(self):
+        """Per-bill coverage on both pagers comes from one windowed running sum."""
+        shop = SupplierShop.objects.create(name='Window Shop')
+        bills = [
+            SupplierRestockBill.objects.create(supplier=shop, total_amount=3000, bill_date=bill_date)
+            for bill_date in ('2025-01-01', '2025-02-01', '2025-03-01')
+        ]
+        bills[0].discount_amount = Decimal('1000')
+        bills[0].save()
+        SupplierPayment.objects.create(supplier=shop, amount=3000)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('supplier_shop_detail', args=[shop.id]))
+        self.assertTrue(any(' OVER ' in q['sql'] for q in ctx.captured_queries))
+        statuses = {bill.pk: bill.covered_status for bill in response.context['bills']}
+        self.assertEqual(statuses, {bills[0].pk: 'COVERED', bills[1].pk: 'PARTIAL', bills[2].pk: 'UNPAID'})
+
+        response = self.client.get(reverse('ajax_supplier_bills', args=[shop.id]), {'page': 1})
+        chunk = {bill.pk: bill for bill in response.context['bills']}
+        self.assertEqual(chunk[bills[1].pk].pending_amount, Decimal('2000'))
+        self.assertEqual(chunk[bills[2].pk].covered_status, 'UNPAID')
+
     # ── AJAX Pagination ──
 
     def test_ajax_bills_returns_200(self):
@@ -2,6 +2,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from .models import Category, Item, ConsumptionRecord
+from .stock import set_stock
 from workshop.decorators import staff_required
 from django.db.models import F, Q
 from django.core.paginator import Paginator
@@ -70,12 +71,13 @@ def add_item(request, category_id):
         avg_stock = float(request.POST.get('average_stock') or 0)
         cur_stock = float(request.POST.get('current_stock') or 0)
 
-        Item.objects.create(
+        item = Item.objects.create(
             category=category,
             name=name,
             average_stock=avg_stock,
-            current_stock=cur_stock,
         )
+        # Opening stock goes through the ledger like any other movement
+        set_stock(item, cur_stock)
         messages.success(request, f"Item '{name}' added.")
         return redirect('inventory_category_detail', category_id=category.id)
     return redirect('inventory_category_detail', category_id=category.id)
@@ -86,10 +88,10 @@ def edit_item(request, item_id):
     if request.method == 'POST':
         item.name = request.POST.get('name')
         item.average_stock = float(request.POST.get('average_stock') or 0)
+        item.save(update_fields=['name', 'average_stock'])
         cur = request.POST.get('current_stock')
         if cur is not None:
-             item.current_stock = float(cur)
-        item.save()
+             set_stock(item, float(cur))
         messages.success(request, f"Item '{item.name}' updated.")
         return redirect('inventory_category_detail', category_id=item.category.id)
     return redirect('inventory_category_detail', category_id=item.category.id)
@@ -125,16 +127,16 @@ def update_stock(request, item_id):
     Manual stock correction view.
     INTENTIONAL BYPASS: This view directly sets current_stock without
     triggering signals. Use only for manual corrections (e.g., physical
-    stock count reconciliation). Signal-based auto-sync still applies
-    to all JobCard and Restock operations.
+    stock count reconciliation). The difference is written to the
+    StockMovement ledger as a MANUAL movement. Signal-based auto-sync
+    still applies to all JobCard and Restock operations.
     """
     item = get_object_or_404(Item, pk=item_id)
     if request.method == 'POST':
         new_stock = request.POST.get('current_stock')
         if new_stock is not None:
-            # Optionally add a record to StockLedger if keeping audit
-            item.current_stock = float(new_stock or 0)
-            item.save()
+            # Recorded as a MANUAL movement so the ledger still reconciles
+            set_stock(item, float(new_stock or 0))
             messages.success(request, f"Stock updated for {item.name}")
             messages.warning(request, "⚠️ Manual stock correction saved. This overrides the automatic signal-based count.")
     next_url = request.POST.get('next') or request.GET.get('next')
@@ -1,13 +1,29 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Count, Prefetch, Sum, F, OuterRef, Subquery, Q, DecimalField
-from django.db.models.functions import Coalesce
-from decimal import Decimal
+from django.db.models import Count, Prefetch, F
 from datetime import timedelta, date
 from .models import Item, Category, SupplierShop, ShopCatalogItem, SupplierRestockBill, SupplierRestockItem, SupplierPayment
 from workshop.decorators import staff_required
 from django.db import transaction, IntegrityError
+from workshop.totals import deferred_totals
+from workshop.ledger import apply_waterfall, running_totals
+
+
+def _apply_bill_waterfall(shop, bills):
+    """
+    Sets covered_status / pending_amount on `bills` (one page of the shop's
+    bills): payments cover the oldest bills first, over the shop's whole
+    history. Running sums come from ONE window query.
+    """
+    running = running_totals(
+        SupplierRestockBill.objects.filter(supplier=shop),
+        amount=F('total_amount') - F('discount_amount'),
+        order_by=[F('bill_date').asc(), F('id').asc()],
+        pks=[bill.pk for bill in bills],
+    )
+    apply_waterfall(bills, running, shop.total_paid_amount, amount=lambda bill: bill.get_effective_amount)
+
 
 @staff_required
 def supplier_shop_list(request):
@@ -57,21 +73,9 @@ def supplier_shop_detail(request, shop_id):
     end_date_str = request.GET.get('end_date', '')
     today = date.today()
 
-    older_bills_sum_sq = SupplierRestockBill.objects.filter(
-        supplier=OuterRef('supplier')
-    ).filter(
-        Q(bill_date__lt=OuterRef('bill_date')) | 
-        Q(bill_date=OuterRef('bill_date'), id__lte=OuterRef('id'))
-    ).values('supplier').annotate(
-        total=Sum(F('total_amount') - F('discount_amount'))
-    ).values('total')
-
     bills_qs = (
         shop.bills
         .prefetch_related('items__item')
-        .annotate(
-            absolute_running_sum=Coalesce(Subquery(older_bills_sum_sq), Decimal('0'), output_field=DecimalField())
-        )
         .order_by('-bill_date', '-id')
     )
     payments_qs = shop.payments.filter(is_trashed=False).order_by('-date', '-id')
@@ -101,22 +105,7 @@ def supplier_shop_detail(request, shop_id):
     payments_list = list(payments_qs[:30])
 
     # ── Absolute Ledger Waterfall Calculation ──
-    total_paid = shop.total_paid_amount
-    for bill in bills_list:
-        effective_amt = bill.get_effective_amount
-        older_sum = bill.absolute_running_sum - effective_amt
-        bulk_pool = total_paid - older_sum
-        
-        if bulk_pool >= effective_amt:
-            bill.covered_status = 'COVERED'
-            bill.pending_amount = Decimal('0')
-        elif bulk_pool <= Decimal('0'):
-            bill.covered_status = 'UNPAID'
-            bill.pending_amount = effective_amt
-        else:
-            bill.covered_status = 'PARTIAL'
-            bill.pending_amount = effective_amt - bulk_pool
-            bill.covered_amount = bulk_pool
+    _apply_bill_waterfall(shop, bills_list)
 
     return render(request, 'inventory/suppliers/shop_detail.html', {
         'shop': shop,
@@ -175,7 +164,7 @@ def add_shop_catalog_item(request, shop_id):
         
         if item_name and category_name:
             # Check if item exists globally (case-insensitive)
-            existing_item = Item.objects.filter(name__iexact=item_name).first()
+            existing_item = Item.objects.filter(normalized_name=Item.normalize_name(item_name)).first()
             
             if existing_item:
                 # Check if it's already in THIS shop
@@ -286,24 +275,26 @@ def shop_restock_bill(request, shop_id):
         try:
             discount = float(request.POST.get('discount_amount') or 0)
             
-            bill = SupplierRestockBill.objects.create(
-                supplier=shop,
-                discount_amount=discount
-            )
+            # Stock movements for every line are written in one batch
+            with deferred_totals():
+                bill = SupplierRestockBill.objects.create(
+                    supplier=shop,
+                    discount_amount=discount
+                )
             
-            for item in items:
-                qty = float(request.POST.get(f'qty_{item.id}') or 0)
-                price = float(request.POST.get(f'price_{item.id}') or 0)
-                if qty > 0:
-                    SupplierRestockItem.objects.create(
-                        bill=bill,
-                        item=item,
-                        quantity=qty,
-                        total_price=price
-                    )
+                for item in items:
+                    qty = float(request.POST.get(f'qty_{item.id}') or 0)
+                    price = float(request.POST.get(f'price_{item.id}') or 0)
+                    if qty > 0:
+                        SupplierRestockItem.objects.create(
+                            bill=bill,
+                            item=item,
+                            quantity=qty,
+                            total_price=price
+                        )
                     
-            # Update bill totals which will trigger shop total update
-            bill.update_totals()
+                # Update bill totals which will trigger shop total update
+                bill.update_totals()
             
             # Clear session
             if 'restock_items' in request.session:
@@ -325,50 +316,52 @@ def edit_restock_bill(request, shop_id, bill_id):
     
     if request.method == 'POST':
         try:
-            # 1. Update bill-level info
-            bill_date_str = request.POST.get('bill_date')
-            if bill_date_str:
-                bill.bill_date = bill_date_str
+            # Stock movements for every line are written in one batch
+            with deferred_totals():
+                # 1. Update bill-level info
+                bill_date_str = request.POST.get('bill_date')
+                if bill_date_str:
+                    bill.bill_date = bill_date_str
                 
-            discount = float(request.POST.get('discount_amount') or 0)
-            bill.discount_amount = discount
-            bill.save()
+                discount = float(request.POST.get('discount_amount') or 0)
+                bill.discount_amount = discount
+                bill.save()
             
-            # 2. Update existing items
-            for restock_item in bill.items.all():
-                qty_str = request.POST.get(f'qty_{restock_item.id}')
-                price_str = request.POST.get(f'price_{restock_item.id}')
+                # 2. Update existing items
+                for restock_item in bill.items.all():
+                    qty_str = request.POST.get(f'qty_{restock_item.id}')
+                    price_str = request.POST.get(f'price_{restock_item.id}')
                 
-                if qty_str is not None:
-                    qty = float(qty_str)
-                    price = float(price_str or 0)
-                    if qty <= 0:
-                        restock_item.delete()
-                    else:
-                        restock_item.quantity = qty
-                        restock_item.total_price = price
-                        restock_item.save()
-                        
-            # 3. Add any new items selected from the catalog
-            new_item_ids = request.POST.getlist('new_items')
-            if new_item_ids:
-                items_to_add = Item.objects.filter(id__in=new_item_ids)
-                for new_item in items_to_add:
-                    qty_str = request.POST.get(f'new_qty_{new_item.id}')
-                    price_str = request.POST.get(f'new_price_{new_item.id}')
-                    if qty_str:
+                    if qty_str is not None:
                         qty = float(qty_str)
                         price = float(price_str or 0)
-                        if qty > 0:
-                            SupplierRestockItem.objects.create(
-                                bill=bill,
-                                item=new_item,
-                                quantity=qty,
-                                total_price=price
-                            )
-
-            # Trigger total update
-            bill.update_totals()
+                        if qty <= 0:
+                            restock_item.delete()
+                        else:
+                            restock_item.quantity = qty
+                            restock_item.total_price = price
+                            restock_item.save()
+                        
+                # 3. Add any new items selected from the catalog
+                new_item_ids = request.POST.getlist('new_items')
+                if new_item_ids:
+                    items_to_add = Item.objects.filter(id__in=new_item_ids)
+                    for new_item in items_to_add:
+                        qty_str = request.POST.get(f'new_qty_{new_item.id}')
+                        price_str = request.POST.get(f'new_price_{new_item.id}')
+                        if qty_str:
+                            qty = float(qty_str)
+                            price = float(price_str or 0)
+                            if qty > 0:
+                                SupplierRestockItem.objects.create(
+                                    bill=bill,
+                                    item=new_item,
+                                    quantity=qty,
+                                    total_price=price
+                                )
+
+                # Trigger total update
+                bill.update_totals()
             messages.success(request, f"Bill #{bill.id} updated successfully.")
             return redirect('supplier_shop_detail', shop_id=shop.id)
         except ValueError:
@@ -394,7 +387,8 @@ def edit_restock_bill(request, shop_id, bill_id):
 def delete_restock_bill(request, shop_id, bill_id):
     if request.method == 'POST':
         bill = get_object_or_404(SupplierRestockBill, pk=bill_id, supplier_id=shop_id)
-        bill.delete()
+        with deferred_totals():
+            bill.delete()
         messages.success(request, "Bill deleted and stock reversed.")
     return redirect('supplier_shop_detail', shop_id=shop_id)
 
@@ -449,18 +443,7 @@ def ajax_supplier_bills(request, shop_id):
     page = int(request.GET.get('page', 1))
     filter_type = request.GET.get('filter', 'all')
     
-    older_bills_sum_sq = SupplierRestockBill.objects.filter(
-        supplier=OuterRef('supplier')
-    ).filter(
-        Q(bill_date__lt=OuterRef('bill_date')) | 
-        Q(bill_date=OuterRef('bill_date'), id__lte=OuterRef('id'))
-    ).values('supplier').annotate(
-        total=Sum(F('total_amount') - F('discount_amount'))
-    ).values('total')
-
-    bills_qs = shop.bills.prefetch_related('items__item').annotate(
-        absolute_running_sum=Coalesce(Subquery(older_bills_sum_sq), Decimal('0'), output_field=DecimalField())
-    ).order_by('-bill_date', '-id')
+    bills_qs = shop.bills.prefetch_related('items__item').order_by('-bill_date', '-id')
 
     # Quick filters
     from django.utils import timezone
@@ -481,22 +464,7 @@ def ajax_supplier_bills(request, shop_id):
     page_bills = list(bills_qs[start:end])
 
     # ── Absolute Ledger Waterfall Calculation ──
-    total_paid = shop.total_paid_amount
-    for bill in page_bills:
-        effective_amt = bill.get_effective_amount
-        older_sum = bill.absolute_running_sum - effective_amt
-        bulk_pool = total_paid - older_sum
-        
-        if bulk_pool >= effective_amt:
-            bill.covered_status = 'COVERED'
-            bill.pending_amount = Decimal('0')
-        elif bulk_pool <= Decimal('0'):
-            bill.covered_status = 'UNPAID'
-            bill.pending_amount = effective_amt
-        else:
-            bill.covered_status = 'PARTIAL'
-            bill.pending_amount = effective_amt - bulk_pool
-            bill.covered_amount = bulk_pool
+    _apply_bill_waterfall(shop, page_bills)
 
     return render(request, 'inventory/suppliers/partials/bill_list_chunk.html', {
         'shop': shop,
@@ -22,4 +22,5 @@ user = User(username='Rijas')
 # 2. Trigger Alert
 print("\n--- SIMULATING TITAN SECURITY BROADCAST ---")
 send_titan_security_alert(user, request)
+print("Queued. Deliver with: python manage.py send_notifications --once")
 print("--- END SIMULATION ---\n")
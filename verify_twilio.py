@@ -8,7 +8,7 @@ sys.path.append(os.getcwd())
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'formulad_workshop.settings')
 django.setup()
 
-from workshop.auth_views import send_twilio_sms
+from workshop.notifications import deliver
 
 def test_twilio():
     print("\n--- 🛰️ TITAN TWILIO HANDSHAKE ---")
@@ -30,8 +30,13 @@ def test_twilio():
     msg = "🛡️ TITAN SECURITY: This is a live test of your WorkshopOS Alert System. Connection Successful."
     print(f"Attempting to send to {target}...")
     
-    success = send_twilio_sms(target, msg)
-    
+    try:
+        deliver('SMS', target, msg)
+        success = True
+    except Exception as e:
+        print(f"!!! SMS FAILED: {e}")
+        success = False
+
     if success:
         print("\n✅ SUCCESS! Check your phone for the Titan Alert.")
     else:
@@ -10,8 +10,10 @@ from .models import (
     JobCardLabourItem,
     UserProfile,
     Mechanic,
+    NotificationOutbox,
     BulkPayer,
-    BulkPaymentHistory
+    BulkPaymentHistory,
+    BulkPaymentAllocation,
 )
 
 # -------------------------
@@ -24,6 +26,14 @@ class UserProfileAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'mobile_number')
 
 
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('channel', 'recipient', 'status', 'attempts', 'next_attempt_at', 'expires_at', 'sent_at', 'created_at')
+    list_filter = ('status', 'channel')
+    search_fields = ('recipient',)
+    exclude = ('message',)  # may hold an OTP until delivered
+
+
 @admin.register(Mechanic)
 class MechanicAdmin(admin.ModelAdmin):
     list_display = ('name', 'is_active', 'created_at')
@@ -114,9 +124,24 @@ class BulkPayerAdmin(admin.ModelAdmin):
     filter_horizontal = ('job_cards',)
 
 
+class BulkPaymentAllocationInline(admin.TabularInline):
+    model = BulkPaymentAllocation
+    extra = 0
+    raw_id_fields = ('job_card',)
+
+
 @admin.register(BulkPaymentHistory)
 class BulkPaymentHistoryAdmin(admin.ModelAdmin):
     list_display = ('bulk_payer', 'amount', 'payment_method', 'jobs_affected', 'created_at')
     list_filter = ('payment_method',)
     search_fields = ('bulk_payer__customer_name',)
+    inlines = [BulkPaymentAllocationInline]
+
+
+@admin.register(BulkPaymentAllocation)
+class BulkPaymentAllocationAdmin(admin.ModelAdmin):
+    list_display = ('job_card', 'history', 'amount', 'resulting_status')
+    list_filter = ('resulting_status',)
+    search_fields = ('job_card__registration_number', 'job_card__bill_number')
+    raw_id_fields = ('job_card', 'history')
 
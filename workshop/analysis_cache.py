@@ -0,0 +1,109 @@
+"""
+workshop/analysis_cache.py
+==========================
+Versioned Cache for Analysis Zone Results
+==========================================
+
+Each zone dict is cached under (zone_name, start_date, end_date). Instead of
+deleting keys on writes (which would need to know every cached range), the
+cache *version* is bumped: old entries simply stop being read and expire.
+
+Two version counters are kept:
+  - live    → bumped on EVERY relevant write. Used by ranges that include
+              today and by zones that read all-time state (LIVE_ZONES).
+  - history → bumped only when a write touches a date BEFORE today.
+              Used by closed ranges (end_date < today), so `last_month` /
+              `last_year` stay cached while today's job cards are edited.
+
+Writes are reported by the post_save / post_delete receivers in
+workshop.signals and inventory.signals via bump_zone_cache_version().
+"""
+
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
+
+from .rollups import as_date
+
+ZONE_CACHE_TIMEOUT = 60 * 60 * 24  # 24h — versions, not TTL, keep results fresh
+ZONE_CACHE_PREFIX = 'analysis_zone'
+
+# Zones that also read undated, all-time state (active jobs, shop balances)
+# can never be treated as a closed historical range.
+LIVE_ZONES = {'mechanic', 'inventory'}
+
+
+def _version_key(scope):
+    return f'{ZONE_CACHE_PREFIX}:version:{scope}'
+
+
+def _get_version(scope):
+    return cache.get_or_set(_version_key(scope), 1, None)
+
+
+def _bump(scope):
+    key = _version_key(scope)
+    # add() is a no-op if the counter exists; incr() is atomic on shared backends
+    cache.add(key, 1, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 2, None)
+
+
+def bump_zone_cache_version(*touched_dates):
+    """
+    Invalidates cached zone results after a write.
+    `touched_dates` are the business dates of the changed row (old and new,
+    None allowed); if none are known, the write is assumed to affect history.
+    """
+    _bump('live')
+    today = timezone.localdate()
+    dates = [d for d in map(as_date, touched_dates) if d is not None]
+    if not dates or any(d < today for d in dates):
+        _bump('history')
+
+
+def get_zone_data(zone_name, handler, start_date, end_date):
+    """Returns handler(start_date, end_date), served from cache when still valid."""
+    closed = end_date < timezone.localdate() and zone_name not in LIVE_ZONES
+    version = _get_version('history' if closed else 'live')
+    key = f'{ZONE_CACHE_PREFIX}:{zone_name}:{start_date.isoformat()}:{end_date.isoformat()}'
+
+    data = cache.get(key, version=version)
+    if data is None:
+        data = handler(start_date, end_date)
+        cache.set(key, data, ZONE_CACHE_TIMEOUT, version=version)
+    return data
+
+
+# Date fields that place a row (or its parent job card / bill) in a report range
+_DATE_FIELDS = ('admitted_date', 'discharged_date', 'date', 'bill_date', 'ordered_date', 'received_date')
+_PARENT_FIELDS = ('job_card', 'bill')
+
+
+def _touched_dates(instance):
+    dates = [getattr(instance, f, None) for f in _DATE_FIELDS]
+    dates.extend(getattr(instance, '_old_rollup_days', ()))
+    for parent_field in _PARENT_FIELDS:
+        if getattr(instance, f'{parent_field}_id', None) is None:
+            continue
+        try:
+            parent = getattr(instance, parent_field)
+        except ObjectDoesNotExist:
+            # Parent already removed in the same cascade — be conservative
+            return []
+        dates.extend(getattr(parent, f, None) for f in _DATE_FIELDS)
+    return dates
+
+
+def invalidate_zone_cache(sender, instance, raw=False, created=None, **kwargs):
+    """post_save / post_delete receiver for every model the zones read."""
+    if raw:
+        return
+    if created is False and (hasattr(instance, 'date') or hasattr(instance, 'bill_date')):
+        # An edit may have moved the entry out of a past day we can't see any more
+        bump_zone_cache_version()
+        return
+    bump_zone_cache_version(*_touched_dates(instance))
@@ -7,8 +7,12 @@ Admin Data Analysis & Reports — Owner-Only Dashboard
 Architecture: 
   - analysis_dashboard(): Main page. Computes 4 hero KPIs on page load. 
   - analysis_zone():       AJAX endpoint. Returns ONE zone partial at a time. 
+  - analysis_zones_batch(): AJAX endpoint. Returns several zones as JSON in one
+                           round trip, computed concurrently, with timings. 
                            This lazy-loading pattern prevents 30+ queries on 
                            page load when data is at 1M+ records. 
+                           Zone dicts are cached per (zone, start, end) and
+                           invalidated by version bumps (analysis_cache.py). 
  
 SQLite Compatibility: 
   All queries use .distinct() with NO field arguments (SQLite-safe). 
@@ -23,16 +27,22 @@ Performance Rules (enforced in every zone handler):
   5. No N+1 queries — all data from annotate/aggregate, never per-object calls 
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
+import time
+from django.db import connection
 from django.shortcuts import render
-from django.http import Http404
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
 from django.db.models import Sum, Count, Q, DecimalField, Avg, FloatField, F, ExpressionWrapper, IntegerField, DurationField
 from django.db.models.functions import Coalesce, TruncMonth, TruncDay
 from decimal import Decimal
 import json
 
+from .analysis_cache import get_zone_data
 from .decorators import owner_required
-from .models import JobCard, Mechanic
+from .models import JobCard, Mechanic, DailyRollup
+from .profiling import profiled
 
 
 # =============================================================================
@@ -181,7 +191,8 @@ def format_inr_short(amount):
 def _get_hero_kpis(start_date, end_date):
     """
     Returns the 4 hero KPIs for the given date range.
-    All queries filter by admitted_date range — the primary indexed field.
+    Reads the ADMITTED-basis DailyRollup buckets (one row per day/status/method)
+    instead of scanning JobCard — the same admitted_date semantics, pre-aggregated.
     
     Returns a dict with:
       total_revenue     — Sum of total_bill_amount for DELIVERED jobs
@@ -190,43 +201,28 @@ def _get_hero_kpis(start_date, end_date):
       outstanding       — Sum of (total_bill_amount - received_amount) for
                           PENDING + PARTIAL (all non-deleted jobs, not just delivered)
     """
-    base_qs = JobCard.objects.filter(
-        is_deleted=False,
-        admitted_date__gte=start_date,
-        admitted_date__lte=end_date,
+    base_qs = DailyRollup.objects.filter(
+        basis='ADMITTED',
+        day__gte=start_date,
+        day__lte=end_date,
     )
 
     # Delivered jobs: revenue and collected
-    delivered_qs = base_qs.filter(delivered=True)
-    delivered_agg = delivered_qs.aggregate(
-        revenue=Coalesce(Sum('total_bill_amount'), Decimal('0'), output_field=DecimalField()),
-        collected=Coalesce(Sum('received_amount'), Decimal('0'), output_field=DecimalField()),
-        count=Count('id'),
+    delivered_agg = base_qs.filter(delivered=True).aggregate(
+        revenue=Coalesce(Sum('revenue'), Decimal('0'), output_field=DecimalField()),
+        collected=Coalesce(Sum('collected'), Decimal('0'), output_field=DecimalField()),
+        count=Coalesce(Sum('job_count'), 0),
     )
 
     # Outstanding = unpaid amount across PENDING and PARTIAL jobs (all, not just delivered)
     # Formula: total_bill_amount - received_amount for status in [PENDING, PARTIAL]
-    outstanding_agg = base_qs.filter(
+    out_data = base_qs.filter(
         payment_status__in=['PENDING', 'PARTIAL']
     ).aggregate(
-        outstanding=Coalesce(
-            Sum('total_bill_amount') - Sum('received_amount'),
-            Decimal('0'),
-            output_field=DecimalField()
-        )
+        total=Coalesce(Sum('revenue'), Decimal('0'), output_field=DecimalField()),
+        paid=Coalesce(Sum('collected'), Decimal('0'), output_field=DecimalField()),
     )
-
-    # Fallback: compute manually if the subtraction returns None
-    if outstanding_agg['outstanding'] is None:
-        out_data = base_qs.filter(
-            payment_status__in=['PENDING', 'PARTIAL']
-        ).aggregate(
-            total=Coalesce(Sum('total_bill_amount'), Decimal('0'), output_field=DecimalField()),
-            paid=Coalesce(Sum('received_amount'), Decimal('0'), output_field=DecimalField()),
-        )
-        outstanding = out_data['total'] - out_data['paid']
-    else:
-        outstanding = outstanding_agg['outstanding']
+    outstanding = out_data['total'] - out_data['paid']
 
     revenue   = delivered_agg['revenue']
     collected = delivered_agg['collected']
@@ -305,7 +301,8 @@ def analysis_zone(request, zone_name):
         'cashbook':  _zone_cashbook,
         'workshop':  _zone_workshop,
     }
-    zone_data = handlers[zone_name](start_date, end_date)
+    # Served from the versioned zone cache; recomputed only after relevant writes
+    zone_data = get_zone_data(zone_name, handlers[zone_name], start_date, end_date)
 
     context = {
         'range_key':  range_key,
@@ -319,6 +316,91 @@ def analysis_zone(request, zone_name):
     return render(request, template, context)
 
 
+# =============================================================================
+# BATCHED ZONE ENDPOINT — All (or selected) zones in ONE round trip.
+# Independent handlers run concurrently on a small thread pool.
+# =============================================================================
+
+# Each worker thread opens its own DB connection (Django connections are
+# thread-local), so keep this well under the database connection limit.
+ZONE_BATCH_WORKERS = 4
+
+
+def _compute_zone(zone_name, start_date, end_date):
+    """Returns (zone_data, elapsed_ms) for one zone."""
+    started = time.perf_counter()
+    handler = globals()[ZONE_REGISTRY[zone_name]]
+    data = get_zone_data(zone_name, handler, start_date, end_date)
+    return data, round((time.perf_counter() - started) * 1000, 1)
+
+
+def _compute_zone_in_worker(zone_name, start_date, end_date):
+    """Thread-pool wrapper: the worker's own DB connection is closed afterwards."""
+    try:
+        return _compute_zone(zone_name, start_date, end_date)
+    finally:
+        # Worker threads are reused: release this thread's connection now
+        connection.close()
+
+
+@owner_required
+def analysis_zones_batch(request):
+    """
+    AJAX endpoint returning several zone partials in a single JSON response.
+
+    URL: GET /analysis/zones/?range=this_month&zones=revenue,cashbook
+    `zones` is optional — defaults to every zone in ZONE_REGISTRY.
+
+    Response:
+      {"zones": {"revenue": {"html": "...", "ms": 12.3}, ...}, "total_ms": 40.1}
+    """
+    requested = [z for z in request.GET.get('zones', '').split(',') if z]
+    zone_names = requested or list(ZONE_REGISTRY)
+    unknown = [z for z in zone_names if z not in ZONE_REGISTRY]
+    if unknown:
+        raise Http404(f"Zone '{unknown[0]}' does not exist.")
+
+    range_key = request.GET.get('range', 'this_month')
+    start_str = request.GET.get('start', '')
+    end_str   = request.GET.get('end', '')
+
+    start_date, end_date, date_label = get_date_range(range_key, start_str, end_str)
+    started = time.perf_counter()
+
+    if connection.in_atomic_block:
+        # Other connections cannot see this transaction's uncommitted rows
+        # (ATOMIC_REQUESTS / test cases) — compute serially on this connection.
+        results = {name: _compute_zone(name, start_date, end_date) for name in zone_names}
+    else:
+        with ThreadPoolExecutor(max_workers=min(ZONE_BATCH_WORKERS, len(zone_names))) as pool:
+            futures = {
+                name: pool.submit(profiled(_compute_zone_in_worker), name, start_date, end_date)
+                for name in zone_names
+            }
+            results = {name: future.result() for name, future in futures.items()}
+
+    base_context = {
+        'range_key':  range_key,
+        'start_date': start_date,
+        'end_date':   end_date,
+        'date_label': date_label,
+    }
+    zones = {}
+    for name in zone_names:
+        data, elapsed_ms = results[name]
+        html = render_to_string(
+            f'workshop/analysis/zones/zone_{name}.html',
+            {**base_context, **data},
+            request=request,
+        )
+        zones[name] = {'html': html, 'ms': elapsed_ms}
+
+    return JsonResponse({
+        'zones':    zones,
+        'total_ms': round((time.perf_counter() - started) * 1000, 1),
+    })
+
+
 # =============================================================================
 # ZONE HANDLERS (Private) — One per zone, filled in Phases 3–9
 # =============================================================================
@@ -328,17 +410,21 @@ def _zone_revenue(start_date, end_date):
     Zone 1: Revenue & Profit Analytics
     Phase 3 implementation — 8 KPIs + 4 chart datasets.
     
-    Queries (6 total):
-      1. Spare revenue + cost aggregate (SpareItem JOIN JobCard)
-      2. Labour revenue aggregate (LabourItem JOIN JobCard)
-      3. JobCard aggregate: discount, avg bill, payment methods
-      4. Top 5 discount recipients
-      5. Monthly trend (12 data points max)
-      6. Daily revenue (31 data points max)
+    Queries 1–4 read the pre-aggregated DailyRollup table (ADMITTED basis,
+    delivered buckets), so cost is O(days in range), not O(job cards):
+      1. Revenue / cost / discount / job count aggregate (spares + labour folded in)
+      2. Payment method distribution
+      3. Monthly trend (12 data points max)
+      4. Daily or monthly revenue bars
+      5. Top 5 customers (JobCard — per-customer data is not rolled up)
     """
-    from .models import JobCardSpareItem, JobCardLabourItem
-
-    # Base queryset — delivered, non-deleted, in date range
+    # Base queryset — delivered, non-deleted, in date range (rollup buckets)
+    base_rollup = DailyRollup.objects.filter(
+        basis='ADMITTED',
+        delivered=True,
+        day__gte=start_date,
+        day__lte=end_date,
+    )
     base_jc = JobCard.objects.filter(
         is_deleted=False,
         delivered=True,
@@ -347,51 +433,26 @@ def _zone_revenue(start_date, end_date):
     )
 
     # -------------------------------------------------------------------------
-    # QUERY 1: Spare parts revenue and cost
-    # -------------------------------------------------------------------------
-    spare_agg = JobCardSpareItem.objects.filter(
-        job_card__is_deleted=False,
-        job_card__delivered=True,
-        job_card__admitted_date__gte=start_date,
-        job_card__admitted_date__lte=end_date,
-    ).aggregate(
-        spare_revenue=Coalesce(Sum('total_price'),   Decimal('0'), output_field=DecimalField()),
-        spare_cost=Coalesce(Sum('unit_price'),       Decimal('0'), output_field=DecimalField()),
-        spare_qty=Coalesce(Sum('quantity'),          Decimal('0'), output_field=DecimalField()),
-    )
-    spare_revenue = spare_agg['spare_revenue']
-    spare_cost    = spare_agg['spare_cost']
-    spare_profit  = spare_revenue - spare_cost
-
-    # -------------------------------------------------------------------------
-    # QUERY 2: Labour revenue
-    # -------------------------------------------------------------------------
-    labour_agg = JobCardLabourItem.objects.filter(
-        job_card__is_deleted=False,
-        job_card__delivered=True,
-        job_card__admitted_date__gte=start_date,
-        job_card__admitted_date__lte=end_date,
-    ).aggregate(
-        labour_revenue=Coalesce(Sum('amount'), Decimal('0'), output_field=DecimalField()),
-    )
-    labour_revenue = labour_agg['labour_revenue']
-
-    # -------------------------------------------------------------------------
-    # QUERY 3: JobCard-level stats (discount, avg bill, payment methods, totals)
+    # QUERY 1: Spares, labour and JobCard-level totals in ONE rollup aggregate
     # -------------------------------------------------------------------------
-    jc_agg = base_jc.aggregate(
-        total_revenue=Coalesce(Sum('total_bill_amount'), Decimal('0'), output_field=DecimalField()),
-        total_collected=Coalesce(Sum('received_amount'),  Decimal('0'), output_field=DecimalField()),
-        total_discount=Coalesce(Sum('discount_amount'),   Decimal('0'), output_field=DecimalField()),
-        avg_bill=Coalesce(Avg('total_bill_amount'),       Decimal('0'), output_field=DecimalField()),
-        total_jobs=Count('id'),
-        jobs_with_discount=Count('id', filter=Q(discount_amount__gt=0)),
+    agg = base_rollup.aggregate(
+        spare_revenue=Coalesce(Sum('spare_revenue'),   Decimal('0'), output_field=DecimalField()),
+        spare_cost=Coalesce(Sum('spare_cost'),         Decimal('0'), output_field=DecimalField()),
+        labour_revenue=Coalesce(Sum('labour_revenue'), Decimal('0'), output_field=DecimalField()),
+        total_revenue=Coalesce(Sum('revenue'),         Decimal('0'), output_field=DecimalField()),
+        total_collected=Coalesce(Sum('collected'),     Decimal('0'), output_field=DecimalField()),
+        total_discount=Coalesce(Sum('discount'),       Decimal('0'), output_field=DecimalField()),
+        total_jobs=Coalesce(Sum('job_count'), 0),
     )
-    total_revenue   = jc_agg['total_revenue']
-    total_collected = jc_agg['total_collected']
-    total_discount  = jc_agg['total_discount']
-    avg_bill        = jc_agg['avg_bill']
-    total_jobs      = jc_agg['total_jobs']
+    spare_revenue   = agg['spare_revenue']
+    spare_cost      = agg['spare_cost']
+    spare_profit    = spare_revenue - spare_cost
+    labour_revenue  = agg['labour_revenue']
+    total_revenue   = agg['total_revenue']
+    total_collected = agg['total_collected']
+    total_discount  = agg['total_discount']
+    total_jobs      = agg['total_jobs']
+    avg_bill        = total_revenue / total_jobs if total_jobs else Decimal('0')
 
     # Collection efficiency %
     collection_pct = (
@@ -400,11 +461,11 @@ def _zone_revenue(start_date, end_date):
     )
 
     # -------------------------------------------------------------------------
-    # QUERY 4: Payment method distribution (for pie chart)
+    # QUERY 2: Payment method distribution (for pie chart)
     # -------------------------------------------------------------------------
-    payment_method_qs = base_jc.values('payment_method').annotate(
-        count=Count('id'),
-        revenue=Coalesce(Sum('total_bill_amount'), Decimal('0'), output_field=DecimalField()),
+    payment_method_qs = base_rollup.values('payment_method').annotate(
+        count=Sum('job_count'),
+        revenue=Coalesce(Sum('revenue'), Decimal('0'), output_field=DecimalField()),
     ).order_by('-count')
 
     payment_methods = [
@@ -417,13 +478,13 @@ def _zone_revenue(start_date, end_date):
     ]
 
     # -------------------------------------------------------------------------
-    # QUERY 5: Monthly revenue trend (up to 12 months)
+    # QUERY 3: Monthly revenue trend (up to 12 months)
     # -------------------------------------------------------------------------
-    monthly_qs = base_jc.annotate(
-        month=TruncMonth('admitted_date')
+    monthly_qs = base_rollup.annotate(
+        month=TruncMonth('day')
     ).values('month').annotate(
-        revenue=Coalesce(Sum('total_bill_amount'), Decimal('0'), output_field=DecimalField()),
-        count=Count('id'),
+        revenue=Coalesce(Sum('revenue'), Decimal('0'), output_field=DecimalField()),
+        count=Sum('job_count'),
     ).order_by('month')
 
     monthly_labels  = [m['month'].strftime('%b %Y') for m in monthly_qs]
@@ -431,7 +492,7 @@ def _zone_revenue(start_date, end_date):
     monthly_counts  = [m['count'] for m in monthly_qs]
 
     # -------------------------------------------------------------------------
-    # QUERY 6: Daily OR Monthly revenue (auto-scales to range)
+    # QUERY 4: Daily OR Monthly revenue (auto-scales to range)
     # >< 45 days  → daily bars (max ~45 points)
     # ≥ 45 days  → monthly bars (12 points max)
     # -------------------------------------------------------------------------
@@ -439,20 +500,20 @@ def _zone_revenue(start_date, end_date):
     use_monthly = range_days >= 45
 
     if use_monthly:
-        period_qs = base_jc.annotate(
-            period=TruncMonth('admitted_date')
+        period_qs = base_rollup.annotate(
+            period=TruncMonth('day')
         ).values('period').annotate(
-            revenue=Coalesce(Sum('total_bill_amount'), Decimal('0'), output_field=DecimalField()),
-            count=Count('id'),
+            revenue=Coalesce(Sum('revenue'), Decimal('0'), output_field=DecimalField()),
+            count=Sum('job_count'),
         ).order_by('period')
         daily_labels  = [d['period'].strftime('%b %Y') for d in period_qs]
         chart_title_suffix = '(Monthly)'
     else:
-        period_qs = base_jc.annotate(
-            period=TruncDay('admitted_date')
+        period_qs = base_rollup.annotate(
+            period=TruncDay('day')
         ).values('period').annotate(
-            revenue=Coalesce(Sum('total_bill_amount'), Decimal('0'), output_field=DecimalField()),
-            count=Count('id'),
+            revenue=Coalesce(Sum('revenue'), Decimal('0'), output_field=DecimalField()),
+            count=Sum('job_count'),
         ).order_by('period')
         daily_labels  = [d['period'].strftime('%d %b') for d in period_qs]
         chart_title_suffix = '(Daily)'
@@ -464,7 +525,7 @@ def _zone_revenue(start_date, end_date):
     daily_chart_title = f'{period_label} {chart_title_suffix}'
 
     # -------------------------------------------------------------------------
-    # QUERY 7: Top 5 customers by revenue (in this period)
+    # QUERY 5: Top 5 customers by revenue (in this period)
     # -------------------------------------------------------------------------
     top_customers = list(
         base_jc.values('customer_name').annotate(
@@ -1077,8 +1138,8 @@ def _zone_cashbook(start_date, end_date):
       2. Top 10 expense categories
       3. Top 5 income categories
       4. Monthly income vs expense trend
-      5. Payment method breakdown from JobCard collections
-      6. JobCard payment status breakdown (PENDING/PARTIAL/PAID/BULK_PAID)
+      5. Payment method breakdown from JobCard collections (DailyRollup)
+      6. JobCard payment status breakdown (PENDING/PARTIAL/PAID/BULK_PAID) (DailyRollup)
     """
     from .models import CashbookEntry
 
@@ -1141,31 +1202,31 @@ def _zone_cashbook(start_date, end_date):
     cb_trend_expense  = [month_map[l]['EXPENSE'] for l in cb_trend_labels]
     cb_trend_profit   = [month_map[l]['INCOME'] - month_map[l]['EXPENSE'] for l in cb_trend_labels]
 
-    # ── QUERY 5: Payment method breakdown from delivered job cards ──
-    base_jc = JobCard.objects.filter(
-        is_deleted=False, delivered=True,
-        discharged_date__gte=start_date,
-        discharged_date__lte=end_date,
-    )
+    # ── QUERY 5: Payment method breakdown from delivered job cards (DISCHARGED rollups) ──
     pay_method_qs = (
-        base_jc.filter(payment_method__isnull=False)
+        DailyRollup.objects.filter(
+            basis='DISCHARGED', delivered=True,
+            day__gte=start_date,
+            day__lte=end_date,
+        )
         .values('payment_method')
-        .annotate(cnt=Count('id'), revenue=Coalesce(Sum('received_amount'), Decimal('0'), output_field=DecimalField()))
+        .annotate(cnt=Sum('job_count'), revenue=Coalesce(Sum('collected'), Decimal('0'), output_field=DecimalField()))
         .order_by('-revenue')
     )
     pay_methods = list(pay_method_qs)
-    pm_labels   = [r['payment_method'] for r in pay_methods]
+    # Cards without a method stay in the chart ('Unknown'), so it sums to the collected revenue
+    pm_labels   = [r['payment_method'] or 'Unknown' for r in pay_methods]
     pm_revenue  = [int(r['revenue'] or 0) for r in pay_methods]
 
-    # ── QUERY 6: Payment status breakdown across all active jobs in period ──
+    # ── QUERY 6: Payment status breakdown across all active jobs in period (ADMITTED rollups) ──
     status_qs = (
-        JobCard.objects.filter(
-            is_deleted=False,
-            admitted_date__gte=start_date,
-            admitted_date__lte=end_date,
+        DailyRollup.objects.filter(
+            basis='ADMITTED',
+            day__gte=start_date,
+            day__lte=end_date,
         )
         .values('payment_status')
-        .annotate(cnt=Count('id'))
+        .annotate(cnt=Sum('job_count'))
     )
     ps_map = {r['payment_status']: r['cnt'] for r in status_qs}
 
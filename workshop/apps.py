@@ -11,6 +11,15 @@ def create_user_groups(sender, **kwargs):
     for group_name in groups:
         Group.objects.get_or_create(name=group_name)
 
+def restore_search_index(sender, using='default', **kwargs):
+    """
+    Recreates the job card search index if the migration rebuilt
+    workshop_jobcard (SQLite drops the FTS sync triggers with the old table).
+    """
+    from django.db import connections
+    from workshop.search import ensure_search_index
+    ensure_search_index(connections[using])
+
 class WorkshopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'workshop'
@@ -18,4 +27,7 @@ class WorkshopConfig(AppConfig):
     def ready(self):
         # Register the signal to create groups after migrations
         post_migrate.connect(create_user_groups, sender=self)
+        post_migrate.connect(restore_search_index, sender=self)
+        # Keep the analysis rollups in sync with job card changes
+        import workshop.signals
 
@@ -7,10 +7,10 @@ import time
 from datetime import timedelta
 from django.utils import timezone
 from .models import UserSession, FailedAttempt
+from .decorators import is_owner
+from .notifications import enqueue_notifications
 from django.db.models import F
-from twilio.rest import Client
 import logging
-import requests
 
 logger = logging.getLogger(__name__)
 
@@ -134,83 +134,29 @@ def reset_login_failures(request):
 
 
 # ============================================================
-# LIVE NOTIFICATION ENGINE (Twilio + Terminal Fallback)
+# LIVE NOTIFICATION ENGINE (Outbox → send_notifications worker)
+# Views only enqueue; delivery happens in workshop/notifications.py
 # ============================================================
-def send_twilio_sms(to_mobile, message):
-    """
-    Dispatches a real SMS via Twilio. 
-    Falls back to Mock (terminal) if keys are missing.
-    """
-    sid = config('TWILIO_ACCOUNT_SID', default='your_sid_here').strip()
-    token = config('TWILIO_AUTH_TOKEN', default='your_token_here').strip()
-    from_num = config('TWILIO_FROM_NUMBER', default='your_twilio_number_here').strip()
-
-    # Safety check: Is the user still using placeholders?
-    if 'your_sid_here' in sid or not sid:
-        print(f"--- [TITAN MOCK MODE] ---")
-        print(f"TO: {to_mobile}\nMESSAGE: {message}")
-        print(f"--------------------------")
-        return False
-
-    try:
-        client = Client(sid, token)
-        client.messages.create(
-            body=message,
-            from_=from_num,
-            to=to_mobile
-        )
-        return True
-    except Exception as e:
-        logger.error(f"Titan SMS Failure: {str(e)}")
-        print(f"!!! SMS FAILED: {str(e)}")
-        return False
-
-def send_telegram_msg(chat_id, message):
-    """
-    Dispatches a message via Telegram Bot API natively.
-    """
-    token = config('TELEGRAM_BOT_TOKEN', default='').strip()
-    if not token or 'your_bot_token_here' in token or not chat_id:
-        return False
-        
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {
-        'chat_id': chat_id,
-        'text': message,
-        'parse_mode': 'HTML'
-    }
-    
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        return response.status_code == 200
-    except Exception as e:
-        logger.error(f"Telegram Failure: {str(e)}")
-        return False
+OTP_LIFETIME = 300  # seconds (5 minutes)
+
 
 def send_otp_sms(mobile_number, otp):
-    """Sends OTP for Owner 2FA via Twilio & Telegram."""
-    msg = f"Your WorkshopOS Login Code: <b>{otp}</b>"
-    
-    # 1. Twilio SMS
-    success_sms = send_twilio_sms(mobile_number, f"Your WorkshopOS Login Code: {otp}")
-    if success_sms:
-        print(f"[OK] OTP Sent via SMS to {mobile_number}")
-    else:
-        print(f"[WARN] OTP SMS Fallback to Terminal: {mobile_number} | Code: {otp}")
-        
-    # 2. Telegram Broadcast
+    """Queues the OTP for Owner 2FA via Twilio & Telegram (never sent once it has expired)."""
+    outbox = [('SMS', mobile_number, f"Your WorkshopOS Login Code: {otp}")]
+
+    # Telegram copy for the matching owner
     owner1_mobile = normalize_phone(config('OWNER_1_MOBILE', default=''))
     owner2_mobile = normalize_phone(config('OWNER_2_MOBILE', default=''))
     norm_target = normalize_phone(mobile_number)
-    
+
+    chat_id = None
     if norm_target == owner1_mobile:
         chat_id = config('OWNER_1_CHAT_ID', default='').strip()
-        if send_telegram_msg(chat_id, msg):
-             print(f"[OK] OTP Sent via Telegram to Owner 1")
     elif norm_target == owner2_mobile:
         chat_id = config('OWNER_2_CHAT_ID', default='').strip()
-        if send_telegram_msg(chat_id, msg):
-             print(f"[OK] OTP Sent via Telegram to Owner 2")
+    outbox.append(('TELEGRAM', chat_id, f"Your WorkshopOS Login Code: <b>{otp}</b>"))
+
+    enqueue_notifications(outbox, expires_at=timezone.now() + timedelta(seconds=OTP_LIFETIME))
 
 
 # ============================================================
@@ -220,6 +166,7 @@ def send_titan_security_alert(user, request):
     """
     Broadcasts a high-priority security alert to BOTH owners (Sahad & Rijas).
     Covers all HQ Portal entry points (Owner & Staff logins).
+    Only queues the messages (one INSERT): the login never waits on an API.
     """
     owner1_mobile = config('OWNER_1_MOBILE', default='').strip()
     owner2_mobile = config('OWNER_2_MOBILE', default='').strip()
@@ -237,26 +184,16 @@ def send_titan_security_alert(user, request):
         f"If this wasn't expected, REVOKE access now from your dashboard!"
     )
     
-    # Broadcast to both owners via Dual-Channel (SMS + Telegram)
-    recipients = [
-        (config('OWNER_1_USERNAME', default='Sahad'), owner1_mobile, config('OWNER_1_CHAT_ID', default='').strip()),
-        (config('OWNER_2_USERNAME', default='Rijas'), owner2_mobile, config('OWNER_2_CHAT_ID', default='').strip()),
-    ]
-    
-    for name, mobile, chat_id in recipients:
-        # Channel 1: Telegram (Primary, Free, Fast)
-        if chat_id:
-            if send_telegram_msg(chat_id, msg):
-                print(f"[OK] Security Broadcast sent via Telegram to {name}")
-                
-        # Channel 2: Twilio SMS (Secondary/Fallback)
-        if mobile:
-            success = send_twilio_sms(mobile, msg)
-            if success:
-                print(f"[OK] Security Broadcast sent via SMS to {name} ({mobile})")
-            else:
-                print(f"[WARN] Security Broadcast MOCK to {name}: {mobile}")
-                print(f"{msg}")
+    # Broadcast to both owners via Dual-Channel:
+    # Telegram (Primary, Free, Fast) + Twilio SMS (Secondary/Fallback)
+    outbox = []
+    for mobile, chat_id in (
+        (owner1_mobile, config('OWNER_1_CHAT_ID', default='').strip()),
+        (owner2_mobile, config('OWNER_2_CHAT_ID', default='').strip()),
+    ):
+        outbox.append(('TELEGRAM', chat_id, msg))
+        outbox.append(('SMS', mobile, msg))
+    enqueue_notifications(outbox)
 
 
 
@@ -289,7 +226,7 @@ def staff_login_view(request):
 
         if user is not None:
             # Block owners from staff portal (Generic Error for security)
-            if user.groups.filter(name='Owner').exists() or user.is_superuser:
+            if is_owner(user):
                 # Do NOT record this as a failure — credentials are valid, wrong portal
                 messages.error(request, "Invalid credentials.")
                 return redirect('login')
@@ -345,7 +282,7 @@ def admin_login_view(request):
 
         if user is not None:
             # Must be an Owner or superuser
-            if not (user.groups.filter(name='Owner').exists() or user.is_superuser):
+            if not is_owner(user):
                 record_login_failure(request)
                 messages.error(request, "Invalid credentials.")
                 return redirect('admin_login')
@@ -433,7 +370,7 @@ def owner_forgot_password_view(request):
         # Store in session
         request.session['pwd_reset_user_id'] = user.id
         request.session['pwd_reset_otp'] = otp_hash
-        request.session['pwd_reset_expire'] = time.time() + 300  # 5 minutes
+        request.session['pwd_reset_expire'] = time.time() + OTP_LIFETIME
         request.session['last_otp_send_time'] = time.time() # Update cooldown
 
         # Send OTP
@@ -0,0 +1,204 @@
+"""
+workshop/autocomplete_index.py
+==============================
+In-Memory Autocomplete Index
+============================
+
+The autocomplete endpoints are hit on every keystroke. Each hit used to run
+one or two `icontains` scans over a master list (spares ran two: inventory
+Items, then SparePart with an `exclude(name__in=...)` subquery).
+
+The master lists are small and change rarely, so each process keeps them in
+memory as a PrefixIndex, ranked by usage:
+
+    brands    CarBrand          ranked by job cards with that brand
+    models    CarModel          ranked by job cards with that model
+    spares    SparePart         ranked by job card spare lines with that name
+    inventory inventory.Item    ranked by Item.usage_count
+    concerns  ConcernSolution   ranked by job card concerns with that text
+
+A keystroke is answered from memory: word-start prefix matches first (via
+the prefix map), then any other substring matches (same semantics as the old
+icontains), both in usage order. No database query.
+
+Freshness:
+  - Every list has a version counter in the shared cache. post_save /
+    post_delete receivers (and the auto-learn bulk_create in the job card
+    views) bump it via invalidate_autocomplete(); each process notices the
+    new version on its next lookup and rebuilds that list lazily.
+  - Usage counts move with every job card, so a list is also rebuilt once
+    it is older than AUTOCOMPLETE_INDEX_TTL.
+"""
+
+import threading
+import time
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import Lower, Trim
+
+AUTOCOMPLETE_INDEX_TTL = 60 * 30  # usage ranking refresh (seconds)
+AUTOCOMPLETE_VERSION_PREFIX = 'autocomplete_index:version'
+PREFIX_LENGTH = 3
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+class PrefixIndex:
+    """Ranked names with a word-start prefix map (first PREFIX_LENGTH chars of each word)."""
+
+    def __init__(self, rows, version=None):
+        # rows: (name, usage, extra) — highest usage first, then alphabetical
+        ranked = sorted(rows, key=lambda row: (-row[1], row[0].lower()))
+        self.entries = [(name, name.lower(), extra) for name, _, extra in ranked]
+        self.version = version
+        self.built_at = time.monotonic()
+
+        self.prefixes = {}
+        for i, (_, lower, _) in enumerate(self.entries):
+            keys = set()
+            for pos, char in enumerate(lower):
+                if char.isalnum() and (pos == 0 or not lower[pos - 1].isalnum()):
+                    keys.update(lower[pos:pos + n] for n in range(1, PREFIX_LENGTH + 1))
+            for key in keys:
+                self.prefixes.setdefault(key, []).append(i)
+
+    def search(self, q, limit, exclude=(), where=None):
+        """
+        Names containing `q` (case-insensitive), word-start matches first.
+        `exclude`: lowercased names to skip; `where(extra)`: extra filter.
+        """
+        q = q.lower()
+        results, seen = [], set()
+
+        def collect(indexes):
+            for i in indexes:
+                if len(results) >= limit:
+                    return
+                name, lower, extra = self.entries[i]
+                if i in seen or q not in lower or lower in exclude:
+                    continue
+                if where is not None and not where(extra):
+                    continue
+                seen.add(i)
+                results.append(name)
+
+        if q:
+            collect(self.prefixes.get(q[:PREFIX_LENGTH], ()))
+        collect(range(len(self.entries)))
+        return results
+
+
+# -----------------------------------------------------------------------------
+# List builders (one or two grouped queries each, run on rebuild only)
+# -----------------------------------------------------------------------------
+def _usage(model, field):
+    """{lowercased, trimmed value: row count} in ONE grouped query."""
+    return dict(
+        model.objects.annotate(key=Lower(Trim(field))).values('key')
+        .annotate(n=Count('id')).order_by().values_list('key', 'n')
+    )
+
+
+def _build_brands():
+    usage = _usage(apps.get_model('workshop', 'JobCard'), 'brand_name')
+    return [
+        (name, usage.get(name.strip().lower(), 0), None)
+        for name in apps.get_model('workshop', 'CarBrand').objects.values_list('name', flat=True)
+    ]
+
+
+def _build_models():
+    usage = _usage(apps.get_model('workshop', 'JobCard'), 'model_name')
+    return [
+        (name, usage.get(name.strip().lower(), 0), (brand or '').lower())
+        for name, brand in apps.get_model('workshop', 'CarModel').objects.values_list('name', 'brand__name')
+    ]
+
+
+def _build_spares():
+    usage = _usage(apps.get_model('workshop', 'JobCardSpareItem'), 'spare_part_name')
+    return [
+        (name, usage.get(name.strip().lower(), 0), None)
+        for name in apps.get_model('workshop', 'SparePart').objects.values_list('name', flat=True)
+    ]
+
+
+def _build_inventory():
+    return [
+        (name, usage, None)
+        for name, usage in apps.get_model('inventory', 'Item').objects.values_list('name', 'usage_count')
+    ]
+
+
+def _build_concerns():
+    usage = _usage(apps.get_model('workshop', 'JobCardConcern'), 'concern_text')
+    return [
+        (text, usage.get(text.strip().lower(), 0), None)
+        for text in apps.get_model('workshop', 'ConcernSolution').objects.values_list('concern', flat=True)
+    ]
+
+
+BUILDERS = {
+    'brands': _build_brands,
+    'models': _build_models,
+    'spares': _build_spares,
+    'inventory': _build_inventory,
+    'concerns': _build_concerns,
+}
+
+# Model label → lists whose entries it feeds (a brand rename changes the models filter too)
+INVALIDATED_BY = {
+    'workshop.CarBrand': ('brands', 'models'),
+    'workshop.CarModel': ('models',),
+    'workshop.SparePart': ('spares',),
+    'workshop.ConcernSolution': ('concerns',),
+    'inventory.Item': ('inventory',),
+}
+
+
+# -----------------------------------------------------------------------------
+# Versioning
+# -----------------------------------------------------------------------------
+def _version_key(name):
+    return f'{AUTOCOMPLETE_VERSION_PREFIX}:{name}'
+
+
+def invalidate_autocomplete(*names):
+    """Marks the given lists stale in every process (rebuilt on next lookup)."""
+    for name in names:
+        key = _version_key(name)
+        cache.add(key, 1, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+
+
+def invalidate_autocomplete_index(sender, raw=False, **kwargs):
+    """post_save / post_delete receiver for the master list models."""
+    if raw:
+        return
+    invalidate_autocomplete(*INVALIDATED_BY.get(sender._meta.label, ()))
+
+
+def get_index(name):
+    """The current PrefixIndex for a list, rebuilt if stale."""
+    version = cache.get_or_set(_version_key(name), 1, None)
+    index = _indexes.get(name)
+    if index is not None and index.version == version and time.monotonic() - index.built_at < AUTOCOMPLETE_INDEX_TTL:
+        return index
+
+    with _lock:
+        index = _indexes.get(name)
+        if index is None or index.version != version or time.monotonic() - index.built_at >= AUTOCOMPLETE_INDEX_TTL:
+            index = PrefixIndex(BUILDERS[name](), version=version)
+            _indexes[name] = index
+    return index
+
+
+def suggest(name, q, limit, exclude=(), where=None):
+    """Top `limit` names of list `name` matching `q`, most used first."""
+    return get_index(name).search(q, limit, exclude=exclude, where=where)
@@ -0,0 +1,72 @@
+"""
+workshop/bulk_balances.py
+=========================
+Denormalized BulkPayer Balances
+===============================
+
+The Pending Bills panel used to annotate every bulk payer with four
+correlated subqueries (count, spares, labour, received) joined through the
+M2M table on every open. BulkPayer now stores the result:
+
+  - pending_card_count:  member job cards in PENDING / PARTIAL
+  - outstanding_balance: SUM(total_bill_amount - received_amount) over them
+
+refresh_bulk_payer_balances() recomputes the given payers in ONE UPDATE
+(grouped subqueries over the M2M table). It is called when:
+  - membership changes           (m2m_changed, workshop.signals)
+  - a member card's total, received amount or status changes
+                                 (JobCard post_save / update_totals)
+  - a member card is deleted     (pre_delete/post_delete, workshop.signals)
+  - bulk pay / reversal run      (set-based writes, workshop.views.bulk_payer)
+
+Recomputing (instead of applying deltas) keeps the columns self-healing.
+"""
+
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+PENDING_STATUSES = ['PENDING', 'PARTIAL']
+
+
+def refresh_bulk_payer_balances(payer_ids=None, apps=global_apps):
+    """Recomputes pending_card_count / outstanding_balance for `payer_ids` (None = all payers)."""
+    BulkPayer = apps.get_model('workshop', 'BulkPayer')
+    Membership = BulkPayer.job_cards.through
+
+    pending = (
+        Membership.objects
+        .filter(bulkpayer_id=OuterRef('pk'), jobcard__payment_status__in=PENDING_STATUSES)
+        .values('bulkpayer_id')
+    )
+    count_sq = pending.annotate(n=Count('jobcard_id')).values('n')
+    balance_sq = pending.annotate(
+        s=Sum(F('jobcard__total_bill_amount') - F('jobcard__received_amount'))
+    ).values('s')
+
+    payers = BulkPayer.objects.all()
+    if payer_ids is not None:
+        payer_ids = list(payer_ids)
+        if not payer_ids:
+            return
+        payers = payers.filter(pk__in=payer_ids)
+
+    payers.update(
+        pending_card_count=Coalesce(Subquery(count_sq, output_field=IntegerField()), Value(0)),
+        outstanding_balance=Coalesce(
+            Subquery(balance_sq, output_field=DecimalField()), Value(Decimal('0')), output_field=DecimalField()
+        ),
+    )
+
+
+def payer_ids_for_job_cards(job_card_ids, apps=global_apps):
+    """ONE query: ids of every bulk payer the given job cards belong to."""
+    Membership = apps.get_model('workshop', 'BulkPayer').job_cards.through
+    return set(Membership.objects.filter(jobcard_id__in=job_card_ids).values_list('bulkpayer_id', flat=True))
+
+
+def refresh_for_job_cards(job_card_ids, apps=global_apps):
+    """Refreshes the payers of the given job cards (no-op if they have none)."""
+    refresh_bulk_payer_balances(payer_ids_for_job_cards(job_card_ids, apps=apps), apps=apps)
@@ -1,18 +1,21 @@
 from django.contrib.auth.decorators import user_passes_test
 from django.core.exceptions import PermissionDenied
 
+from .roles import get_user_roles
+
 # -----------------------------------------------------------------------------
 # ROLE-BASED ACCESS CONTROL (RBAC) DECORATORS
 # -----------------------------------------------------------------------------
 
+# Roles are resolved once per request and cached per user (workshop/roles.py)
 def is_owner(user):
-    return user.groups.filter(name='Owner').exists() or user.is_superuser
+    return get_user_roles(user).is_owner
 
 def is_office_or_owner(user):
-    return user.groups.filter(name__in=['Office', 'Owner']).exists() or user.is_superuser
+    return get_user_roles(user).is_office_or_owner
 
 def is_floor_office_owner(user):
-    return user.groups.filter(name__in=['Floor', 'Office', 'Owner']).exists() or user.is_superuser
+    return get_user_roles(user).is_floor_office_owner
 
 # Decorator for views only accessible by the Owner
 def owner_required(function=None, redirect_field_name=None, login_url='/admin-login/'):
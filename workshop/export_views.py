@@ -0,0 +1,45 @@
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import render
+
+from .analysis_views import get_date_range
+from .decorators import office_required
+from .exports import CONTENT_TYPES, EXPORTS, export_filename, stream_export
+
+RANGE_CHOICES = [
+    ('this_month', 'This Month'),
+    ('last_month', 'Last Month'),
+    ('this_year', 'This Year'),
+    ('last_year', 'Last Year'),
+    ('custom', 'Custom'),
+]
+
+
+@office_required
+def export_home(request):
+    """Export page for the accountant: pick a dataset, a date range and CSV or XLSX."""
+    return render(request, 'workshop/manage/exports.html', {
+        'exports': [(name, title) for name, (title, _, _) in EXPORTS.items()],
+        'range_choices': RANGE_CHOICES,
+    })
+
+
+@office_required
+def export_download(request, dataset):
+    """
+    Streams one dataset (?range=... or ?range=custom&start=&end=, ?format=csv|xlsx).
+    Rows are read and encoded chunk by chunk while the response is sent.
+    """
+    if dataset not in EXPORTS:
+        raise Http404(f"Export '{dataset}' does not exist.")
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in CONTENT_TYPES:
+        raise Http404(f"Unknown export format '{file_format}'.")
+
+    start, end, _ = get_date_range(
+        request.GET.get('range', 'this_year'), request.GET.get('start', ''), request.GET.get('end', ''),
+    )
+    response = StreamingHttpResponse(
+        stream_export(dataset, file_format, start, end), content_type=CONTENT_TYPES[file_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(dataset, file_format, start, end)}"'
+    return response
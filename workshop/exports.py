@@ -0,0 +1,361 @@
+"""
+workshop/exports.py
+===================
+Streaming CSV / XLSX Exports
+============================
+
+The accountant had no way to pull the books out of the app (the only export
+was the hand-maintained master_data_export.md). Each dataset in EXPORTS is a
+header row plus a generator of rows for a date range:
+
+  - jobcards        one row per spare / labour line (cards without lines get
+                    one row), by admitted date
+  - spare_shops     spare shop purchases (shop cost) and payments, by date
+  - suppliers       supplier restock bills and payments, by date
+  - cashbook        income and expense entries, by date
+
+Rows come from values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE) — no
+model instances, never more than one chunk in memory — and stream_csv /
+stream_xlsx turn them into bytes as they go. Served through
+StreamingHttpResponse (export_views.py) or written to a file
+(`manage.py export_data`), memory stays flat however many rows a year has.
+
+XLSX is written with the standard library: the workbook is a zip whose sheet
+XML is compressed and yielded batch by batch (zip data descriptors, so
+nothing is seeked back into). Strings are inline, dates are real date cells.
+"""
+
+import csv
+import heapq
+import io
+import re
+import zipfile
+from datetime import date
+from decimal import Decimal
+from itertools import islice
+from xml.sax.saxutils import escape, quoteattr
+
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from inventory.models import SupplierPayment, SupplierRestockBill
+
+from .models import CashbookEntry, JobCard, JobCardLabourItem, JobCardSpareItem, SpareShopPayment
+
+EXPORT_CHUNK_SIZE = 2000     # rows fetched per database round trip
+FLUSH_ROWS = 500             # rows encoded per yielded block
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _local_date(value):
+    return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+
+# -----------------------------------------------------------------------------
+# Datasets
+# -----------------------------------------------------------------------------
+JOBCARD_HEADERS = [
+    'Bill No', 'Admitted', 'Discharged', 'Registration', 'Brand', 'Model', 'Customer', 'Contact',
+    'Mechanic', 'Delivered', 'Payment Status', 'Payment Method', 'Bill Total', 'Received', 'Discount',
+    'Line', 'Description', 'Line Status', 'Shop', 'Qty', 'Shop Cost', 'Amount',
+]
+
+_JOBCARD_FIELDS = (
+    'pk', 'bill_number', 'admitted_date', 'discharged_date', 'registration_number', 'brand_name',
+    'model_name', 'customer_name', 'customer_contact', 'lead_mechanic__name', 'delivered',
+    'payment_status', 'payment_method', 'total_bill_amount', 'received_amount', 'discount_amount',
+)
+
+
+def jobcard_rows(start, end):
+    """Active job cards admitted in [start, end], one row per line."""
+    statuses = dict(JobCard.PAYMENT_STATUS_CHOICES)
+    methods = dict(JobCard.PAYMENT_METHOD_CHOICES)
+    cards = (
+        JobCard.objects.filter(is_deleted=False, admitted_date__range=(start, end))
+        .order_by('admitted_date', 'pk').values_list(*_JOBCARD_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    # Lines are fetched per chunk of cards: two queries per chunk, never per card
+    for chunk in _chunks(cards, EXPORT_CHUNK_SIZE):
+        pks = [card[0] for card in chunk]
+        lines = {}
+        for job_card_id, *line in (
+            JobCardSpareItem.objects.filter(job_card_id__in=pks).order_by('pk')
+            .values_list('job_card_id', 'spare_part_name', 'status', 'shop_name', 'quantity', 'unit_price', 'total_price')
+        ):
+            lines.setdefault(job_card_id, []).append(['Spare', *line])
+        for job_card_id, description, amount in (
+            JobCardLabourItem.objects.filter(job_card_id__in=pks).order_by('pk')
+            .values_list('job_card_id', 'job_description', 'amount')
+        ):
+            lines.setdefault(job_card_id, []).append(['Labour', description, '', '', None, None, amount])
+
+        for pk, *card in chunk:
+            card[9] = 'Yes' if card[9] else 'No'
+            card[10] = statuses.get(card[10], card[10])
+            card[11] = methods.get(card[11], card[11])
+            for line in lines.get(pk) or [[None] * 7]:
+                yield card + line
+
+
+SPARE_SHOP_HEADERS = [
+    'Date', 'Shop', 'Entry', 'Description', 'Bill No', 'Vehicle', 'Qty', 'Purchase', 'Payment', 'Method',
+]
+
+
+def spare_shop_rows(start, end):
+    """
+    Spare shop purchases (shop cost: unit price × quantity, as in
+    SpareShop.update_totals) and payments in [start, end], by date. A
+    purchase is dated like on the shop ledger: received, else ordered, else
+    the job card's admitted date.
+    """
+    purchases = (
+        JobCardSpareItem.objects.filter(shop__isnull=False)
+        .annotate(entry_date=Coalesce('received_date', 'ordered_date', 'job_card__admitted_date'))
+        .filter(entry_date__range=(start, end)).order_by('entry_date', 'pk')
+        .values_list(
+            'entry_date', 'shop__name', 'spare_part_name', 'job_card__bill_number',
+            'job_card__registration_number', 'original_vehicle_info', 'quantity', 'unit_price',
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    payments = (
+        SpareShopPayment.objects.filter(is_trashed=False, created_at__date__range=(start, end))
+        .order_by('created_at', 'pk')
+        .values_list('created_at', 'shop__name', 'note', 'amount', 'payment_method')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+    def purchase_rows():
+        for day, shop, part, bill, registration, vehicle, quantity, unit_price in purchases:
+            cost = (unit_price or Decimal('0')) * (quantity if quantity is not None else Decimal('1'))
+            yield [day, shop, 'Purchase', part, bill, registration or vehicle, quantity, cost, None, '']
+
+    def payment_rows():
+        for created_at, shop, note, amount, method in payments:
+            yield [_local_date(created_at), shop, 'Payment', note, '', '', None, None, amount, method]
+
+    yield from heapq.merge(purchase_rows(), payment_rows(), key=lambda row: row[0])
+
+
+SUPPLIER_HEADERS = [
+    'Date', 'Supplier', 'Entry', 'Reference', 'Bill Total', 'Discount', 'Billed', 'Paid', 'Method',
+]
+
+
+def supplier_rows(start, end):
+    """Supplier restock bills (net of discount) and payments in [start, end], by date."""
+    bills = (
+        SupplierRestockBill.objects.filter(bill_date__range=(start, end)).order_by('bill_date', 'pk')
+        .values_list('bill_date', 'supplier__name', 'pk', 'total_amount', 'discount_amount')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    payments = (
+        SupplierPayment.objects.filter(is_trashed=False, date__range=(start, end)).order_by('date', 'pk')
+        .values_list('date', 'supplier__name', 'note', 'amount', 'payment_method')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+    def bill_rows():
+        for day, supplier, pk, total, discount in bills:
+            yield [day, supplier, 'Bill', f'Bill #{pk}', total, discount, total - discount, None, '']
+
+    def payment_rows():
+        for day, supplier, note, amount, method in payments:
+            yield [day, supplier, 'Payment', note, None, None, None, amount, method]
+
+    yield from heapq.merge(bill_rows(), payment_rows(), key=lambda row: row[0])
+
+
+CASHBOOK_HEADERS = ['Date', 'Type', 'Category', 'Amount', 'Method', 'Description', 'Entered By']
+
+
+def cashbook_rows(start, end):
+    """Cashbook income and expense entries in [start, end], by date."""
+    return (
+        CashbookEntry.objects.filter(date__range=(start, end)).order_by('date', 'created_at', 'pk')
+        .values_list(
+            'date', 'entry_type', 'category', 'amount', 'payment_method', 'description',
+            'created_by__username',
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+# name → (title, headers, rows(start, end))
+EXPORTS = {
+    'jobcards':    ('Job Cards', JOBCARD_HEADERS, jobcard_rows),
+    'spare_shops': ('Spare Shop Ledger', SPARE_SHOP_HEADERS, spare_shop_rows),
+    'suppliers':   ('Supplier Ledger', SUPPLIER_HEADERS, supplier_rows),
+    'cashbook':    ('Cashbook', CASHBOOK_HEADERS, cashbook_rows),
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+# -----------------------------------------------------------------------------
+# CSV
+# -----------------------------------------------------------------------------
+# Spreadsheet apps evaluate a text cell starting with these as a formula
+# (contacts are stored as "+91 ...", and staff-typed text could carry "=HYPERLINK(...)")
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(headers, rows):
+    """
+    UTF-8 CSV (with a BOM, so Excel detects the encoding) in blocks of
+    FLUSH_ROWS rows. Text that would open as a formula is prefixed with '.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    for chunk in _chunks(rows, FLUSH_ROWS):
+        writer.writerows([_csv_cell(value) for value in row] for row in chunk)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+# -----------------------------------------------------------------------------
+# XLSX
+# -----------------------------------------------------------------------------
+_XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+_CONTENT_TYPES_XML = _XML_HEADER + (
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS_XML = _XML_HEADER + (
+    f'<Relationships xmlns="{_PACKAGE_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK_RELS_XML = _XML_HEADER + (
+    f'<Relationships xmlns="{_PACKAGE_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{_REL_NS}/worksheet" Target="worksheets/sheet1.xml"/>'
+    f'<Relationship Id="rId2" Type="{_REL_NS}/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Cell styles: 0 default, 1 date (built-in format 14), 2 bold (header row)
+_STYLES_XML = _XML_HEADER + (
+    f'<styleSheet xmlns="{_MAIN_NS}">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+_SHEET_START = _XML_HEADER + (
+    f'<worksheet xmlns="{_MAIN_NS}"><sheetViews><sheetView workbookViewId="0">'
+    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+    '</sheetView></sheetViews><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+_EXCEL_EPOCH = date(1899, 12, 30)
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_cell(value, style=0):
+    if value is None or value == '':
+        return '<c/>'
+    if isinstance(value, date):
+        return f'<c s="1"><v>{(value - _EXCEL_EPOCH).days}</v></c>'
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML.sub('', str(value)))
+    return f'<c t="inlineStr"{f" s={quoteattr(str(style))}" if style else ""}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values, style=0):
+    return '<row>' + ''.join(_xlsx_cell(value, style) for value in values) + '</row>'
+
+
+class _Drain(io.RawIOBase):
+    """Unseekable sink for ZipFile: collects written bytes until drained."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_xlsx(title, headers, rows):
+    """A one-sheet workbook named `title`, yielded as the zip is written."""
+    sink = _Drain()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr('[Content_Types].xml', _CONTENT_TYPES_XML)
+        workbook.writestr('_rels/.rels', _ROOT_RELS_XML)
+        workbook.writestr('xl/workbook.xml', _XML_HEADER + (
+            f'<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><sheets>'
+            f'<sheet name={quoteattr(title[:31])} sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ))
+        workbook.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS_XML)
+        workbook.writestr('xl/styles.xml', _STYLES_XML)
+        yield sink.drain()
+
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((_SHEET_START + _xlsx_row(headers, style=2)).encode('utf-8'))
+            for chunk in _chunks(rows, FLUSH_ROWS):
+                sheet.write(''.join(_xlsx_row(row) for row in chunk).encode('utf-8'))
+                yield sink.drain()
+            sheet.write(_SHEET_END.encode('utf-8'))
+    yield sink.drain()
+
+
+def stream_export(name, file_format, start, end):
+    """Bytes of export `name` for [start, end] as 'csv' or 'xlsx'."""
+    title, headers, rows = EXPORTS[name]
+    if file_format == 'xlsx':
+        return stream_xlsx(title, headers, rows(start, end))
+    return stream_csv(headers, rows(start, end))
+
+
+def export_filename(name, file_format, start, end):
+    return f'{name}_{start:%Y-%m-%d}_{end:%Y-%m-%d}.{file_format}'
@@ -0,0 +1,194 @@
+"""
+workshop/index_audit.py
+=======================
+Hot Query Index Audit
+=====================
+
+The list pages filter on column combinations that only had single-column
+indexes (or none). The indexes added for them (models' Meta) are the ones
+EXPLAIN showed the planner actually choosing on seeded data:
+
+  - payment_status + is_deleted      hero KPI count, read from the index only
+  - -admitted_date + payment_status  pending list, walked in order with
+                                     payment_status checked in the index
+  - partial -discharged_date WHERE delivered AND NOT is_deleted
+                                     delivered list and delivered-today count
+  - shop + ordered_date              a shop's purchases in a date range
+  - -timestamp                       consumption history
+
+Django writes boolean filters as `"delivered"` / `NOT "is_deleted"`, which
+SQLite cannot use as an equality on an index column — a composite index
+starting with booleans is never chosen; a partial index with the same
+condition is.
+
+HOT_QUERIES registers the querysets those pages run (same filters and
+ordering, first page only) with the index each one should use (by name,
+or by columns for unnamed indexes). `python manage.py audit_indexes` runs EXPLAIN on each and reports:
+
+  - full table scans (SQLite `SCAN t`, PostgreSQL `Seq Scan on t`)
+  - full index scans: the whole index walked (SQLite `SCAN t USING INDEX`,
+    an index scan without Index Cond on PostgreSQL). Fine under a LIMIT —
+    the walk stops after one page — a problem without one
+  - sorts: ORDER BY done in a temporary structure instead of an index
+  - the index used, when it is not the expected one
+
+Planners decide from table statistics, so audit against realistic data
+(`manage.py seed_scale`) with fresh statistics (`audit_indexes --analyze`).
+A new list page or filter belongs in HOT_QUERIES.
+"""
+
+import re
+from datetime import date, timedelta
+
+from django.db import connection
+
+from inventory.models import ConsumptionRecord
+
+from .models import JobCard, JobCardSpareItem, SpareShop
+
+PAGE_SIZE = 45
+UNPAID = ['PENDING', 'PARTIAL']
+
+
+def _any_shop():
+    return SpareShop.objects.values_list('pk', flat=True).order_by('pk').first() or 0
+
+
+# -----------------------------------------------------------------------------
+# Registry: (name, queryset factory, expected index: name, columns or None)
+# -----------------------------------------------------------------------------
+HOT_QUERIES = [
+    ('dashboard_active', lambda: (
+        JobCard.objects.filter(is_deleted=False, delivered=False).order_by('-updated_at')[:PAGE_SIZE]
+    ), ['updated_at']),
+    ('dashboard_pending_bills_count', lambda: (
+        JobCard.objects.filter(is_deleted=False, payment_status__in=UNPAID).values('pk')
+    ), ['payment_status', 'is_deleted']),
+    ('dashboard_delivered_today_count', lambda: (
+        JobCard.objects.filter(delivered=True, is_deleted=False, discharged_date=date.today()).values('pk')
+    ), 'jobcard_delivered_idx'),
+    ('pending_payments_list', lambda: (
+        JobCard.objects.filter(payment_status__in=UNPAID).order_by('-admitted_date')[:PAGE_SIZE]
+    ), ['admitted_date', 'payment_status']),
+    ('delivered_list', lambda: (
+        JobCard.objects.filter(delivered=True, is_deleted=False).order_by('-discharged_date')[:PAGE_SIZE]
+    ), 'jobcard_delivered_idx'),
+    ('spare_shop_detail', lambda: (
+        JobCardSpareItem.objects.filter(shop=_any_shop(), ordered_date__gte=date.today() - timedelta(days=30))
+    ), ['shop_id', 'ordered_date']),
+    # Ordered by the shop's name: the sort cannot come from a spare item index
+    ('unassigned_spares_hub', lambda: (
+        JobCardSpareItem.objects.filter(job_card__isnull=True, shop__isnull=False)
+        .select_related('shop').order_by('shop__name', '-ordered_date')
+    ), ['job_card_id']),
+    ('consumption_history', lambda: (
+        ConsumptionRecord.objects.order_by('-timestamp')[:50]
+    ), ['timestamp']),
+]
+
+
+# -----------------------------------------------------------------------------
+# Plan parsing
+# -----------------------------------------------------------------------------
+_SQLITE_ACCESS = re.compile(
+    r'\b(?P<op>SCAN|SEARCH) (?P<table>\w+)(?: AS \w+)?'
+    r'(?: USING (?:COVERING )?INDEX (?P<index>\w+)| USING (?:INTEGER )?PRIMARY KEY)?'
+)
+_SQLITE_SORT = re.compile(r'\bUSE TEMP B-TREE FOR (?:ORDER BY|RIGHT PART OF ORDER BY|LAST TERM OF ORDER BY)')
+_POSTGRES_SEQ_SCAN = re.compile(r'\bSeq Scan on (\w+)')
+_POSTGRES_INDEX_SCAN = re.compile(r'\bIndex (?:Only )?Scan(?: Backward)? using (\w+) on (\w+)')
+_POSTGRES_BITMAP_SCAN = re.compile(r'\bBitmap Index Scan on (\w+)')
+_POSTGRES_SORT = re.compile(r'(?:^|->\s+)(?:Incremental )?Sort\b', re.MULTILINE)
+
+
+def parse_plan(plan, vendor):
+    """
+    Access paths of an EXPLAIN output:
+    {'full_scans': [table], 'index_scans': [index walked whole],
+     'indexes': [every index used], 'sorts': bool}
+    """
+    found = {'full_scans': [], 'index_scans': [], 'indexes': [], 'sorts': False}
+    if vendor == 'sqlite':
+        for match in _SQLITE_ACCESS.finditer(plan):
+            index = match.group('index')
+            if index:
+                found['indexes'].append(index)
+            if match.group('op') == 'SCAN' and 'PRIMARY KEY' not in match.group(0):
+                if index:
+                    found['index_scans'].append(index)
+                else:
+                    found['full_scans'].append(match.group('table'))
+        found['sorts'] = bool(_SQLITE_SORT.search(plan))
+        return found
+
+    if vendor == 'postgresql':
+        found['full_scans'] = _POSTGRES_SEQ_SCAN.findall(plan)
+        # One plan node per '->'; an index scan without Index Cond reads the whole index
+        for node in re.split(r'\n\s*->', plan):
+            match = _POSTGRES_INDEX_SCAN.search(node)
+            if match:
+                found['indexes'].append(match.group(1))
+                if 'Index Cond:' not in node:
+                    found['index_scans'].append(match.group(1))
+        found['indexes'] += _POSTGRES_BITMAP_SCAN.findall(plan)
+        found['sorts'] = bool(_POSTGRES_SORT.search(plan))
+        return found
+
+    raise NotImplementedError(f'No plan parser for {vendor}')
+
+
+def index_columns(table):
+    """{index name: [columns]} for `table`, from the database itself."""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return {name: info['columns'] for name, info in constraints.items() if info['index'] or info['unique']}
+
+
+def analyze_tables():
+    """Refreshes the planner statistics of the audited tables."""
+    tables = {factory().model._meta.db_table for _, factory, _ in HOT_QUERIES}
+    with connection.cursor() as cursor:
+        for table in sorted(tables):
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+
+
+def audit(only=None):
+    """
+    EXPLAINs every registered hot query on the default database. Returns
+    one dict per query, in registry order: the parse_plan() keys plus
+    'name', 'plan', 'limited' (has a LIMIT), 'expected' (index name or
+    columns), 'expected_used' (that index / an index on exactly those columns
+    was used; True when nothing is expected) and 'problems' (list of
+    strings, empty when fine).
+    """
+    results = []
+    columns = {}
+    for name, factory, expected in HOT_QUERIES:
+        if only and name not in only:
+            continue
+        queryset = factory()
+        plan = queryset.explain()
+        found = parse_plan(plan, connection.vendor)
+        limited = queryset.query.high_mark is not None
+
+        table = queryset.model._meta.db_table
+        if table not in columns:
+            columns[table] = index_columns(table)
+        if isinstance(expected, str):
+            expected_used = expected in found['indexes']
+        else:
+            used = [columns[table].get(index) for index in found['indexes']]
+            expected_used = expected is None or expected in used
+
+        problems = [f"full scan of {table_name}" for table_name in found['full_scans']]
+        if found['index_scans'] and not limited:
+            problems.append(f"full index scan of {', '.join(found['index_scans'])} without a LIMIT")
+        if not expected_used:
+            wanted = expected if isinstance(expected, str) else f"an index on ({', '.join(expected)})"
+            problems.append(f"expected {wanted}, used {', '.join(found['indexes']) or 'none'}")
+
+        results.append({
+            'name': name, 'plan': plan, 'limited': limited, 'expected': expected,
+            'expected_used': expected_used, 'problems': problems, **found,
+        })
+    return results
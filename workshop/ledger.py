@@ -0,0 +1,80 @@
+"""
+workshop/ledger.py
+==================
+Running Ledger (Payment Waterfall)
+==================================
+
+Shop ledgers show, per purchase, whether the shop's lump-sum payments cover
+it: payments are applied oldest purchase first, so a row is
+
+    COVERED  when total_paid >= everything up to and including it
+    UNPAID   when total_paid <= everything before it
+    PARTIAL  otherwise (covered_amount / pending_amount are set)
+
+That needs each row's running sum over the shop's WHOLE history (date
+filters only narrow what is displayed). It used to be a correlated subquery
+summing every older row, per row: quadratic in the shop's history.
+
+running_totals() computes it with ONE window function (cumulative
+SUM() OVER (ORDER BY date, pk)) over the shop's rows, read back for the
+displayed page only — a single ordered pass, however many years of
+purchases the shop has.
+"""
+
+from decimal import Context, Decimal
+
+from django.db import connections
+from django.db.models import F, Sum, Window
+from django.db.models.expressions import RowRange
+
+_float_context = Context(prec=15)
+
+
+def running_totals(queryset, amount, order_by, pks):
+    """
+    {pk: running SUM(amount) up to and including that row} for the rows in
+    `pks`. `queryset` is the full ledger (one shop, unfiltered); `order_by`
+    must be a total order (end with the pk).
+    """
+    pks = list(pks)
+    if not pks:
+        return {}
+
+    ledger = queryset.order_by().annotate(
+        row_id=F('pk'),
+        running_sum=Window(Sum(amount), order_by=order_by, frame=RowRange(start=None, end=0)),
+    ).values_list('row_id', 'running_sum')
+    sql, params = ledger.query.sql_with_params()
+
+    # The window must see every row: restrict to the page OUTSIDE it
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(
+            f'SELECT row_id, running_sum FROM ({sql}) ledger WHERE row_id IN ({placeholders})',
+            tuple(params) + tuple(pks),
+        )
+        rows = cursor.fetchall()
+
+    return {
+        pk: total if isinstance(total, Decimal) else _float_context.create_decimal_from_float(float(total or 0))
+        for pk, total in rows
+    }
+
+
+def apply_waterfall(rows, running, total_paid, amount):
+    """Sets covered_status / pending_amount / covered_amount on each row."""
+    for row in rows:
+        cost = amount(row)
+        older_sum = running.get(row.pk, cost) - cost
+        bulk_pool = total_paid - older_sum
+
+        if bulk_pool >= cost:
+            row.covered_status = 'COVERED'
+            row.pending_amount = Decimal('0')
+        elif bulk_pool <= Decimal('0'):
+            row.covered_status = 'UNPAID'
+            row.pending_amount = cost
+        else:
+            row.covered_status = 'PARTIAL'
+            row.pending_amount = cost - bulk_pool
+            row.covered_amount = bulk_pool
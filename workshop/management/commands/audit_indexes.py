@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from workshop.index_audit import HOT_QUERIES, analyze_tables, audit
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs EXPLAIN on the registered hot queries (workshop/index_audit.py) and reports '
+        'full table / index scans, sorts that no index covers and queries off their expected index'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Refresh the planner statistics (ANALYZE) of the audited tables first',
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Print the full EXPLAIN output of every query',
+        )
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Exit with an error when any query has a problem (full scan, expected index not used)',
+        )
+        parser.add_argument(
+            '--only', nargs='+', metavar='QUERY',
+            help='Audit only these queries (e.g. pending_payments_list delivered_list)',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'EXPLAIN parsing is not implemented for {connection.vendor}')
+        known = {name for name, _, _ in HOT_QUERIES}
+        unknown = set(options['only'] or ()) - known
+        if unknown:
+            raise CommandError(f"Unknown queries: {', '.join(sorted(unknown))} (known: {', '.join(sorted(known))})")
+
+        if options['analyze']:
+            analyze_tables()
+            self.stdout.write('Planner statistics refreshed.')
+
+        results = audit(only=options['only'])
+        flagged = 0
+        for row in results:
+            indexes = ', '.join(dict.fromkeys(row['indexes'])) or 'no index'
+            if row['problems']:
+                flagged += 1
+                self.stdout.write(self.style.ERROR(f"   ❌ {row['name']}: {'; '.join(row['problems'])}"))
+            elif row['sorts']:
+                self.stdout.write(self.style.WARNING(
+                    f"   ⚠️ {row['name']}: {indexes}, but sorted without an index"
+                ))
+            elif row['index_scans']:
+                self.stdout.write(f"   ✓ {row['name']}: {indexes} walked in order, stops at the LIMIT")
+            else:
+                self.stdout.write(f"   ✓ {row['name']}: {indexes}")
+            if options['plans']:
+                for line in row['plan'].splitlines():
+                    self.stdout.write(f'        {line}')
+
+        if flagged and options['strict']:
+            raise CommandError(f'{flagged} hot query(s) scan a whole table or index, or miss their index')
+        if flagged:
+            self.stdout.write(self.style.WARNING(f'⚠️ {flagged} of {len(results)} hot queries need attention'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ No full scans in {len(results)} hot queries, each on its expected index'
+            ))
@@ -0,0 +1,208 @@
+import json
+import math
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from workshop.analysis_cache import bump_zone_cache_version
+from workshop.analysis_views import ZONE_REGISTRY
+from workshop.models import BulkPayer, JobCard, SpareShop
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'bench_baseline.json'
+LATENCY_NOISE_MS = 2.0  # p95 differences below this are never a regression
+
+
+def _first_pk(queryset):
+    return queryset.values_list('pk', flat=True).first()
+
+
+def _search_term():
+    """Last 4 digits of the newest registration (the usual front-desk lookup)."""
+    registration = JobCard.objects.values_list('registration_number', flat=True).order_by('-pk').first()
+    return (registration or '')[-4:]
+
+
+def scenarios():
+    """
+    (name, url, before_each) for every benchmarked page, resolved against the
+    current data. Detail pages without a row to show are left out.
+    """
+    found = [
+        ('home', reverse('home'), None),
+        ('jobcard_list', reverse('jobcard_list'), None),
+        ('jobcard_list_search', f"{reverse('jobcard_list')}?q={_search_term()}", None),
+        ('live_report', reverse('live_report'), None),
+        ('pending_payments_list', reverse('pending_payments_list'), None),
+        ('car_profile_list', reverse('car_profile_list'), None),
+    ]
+
+    payer = _first_pk(BulkPayer.objects.filter(is_trashed=False).order_by('-pending_card_count', 'pk'))
+    if payer:
+        found.append(('bulk_payer_detail', reverse('bulk_payer_detail', args=[payer]), None))
+    shop = _first_pk(SpareShop.objects.filter(is_trashed=False).order_by('-total_purchased_amount', 'pk'))
+    if shop:
+        found.append(('spare_shop_detail', reverse('spare_shop_detail', args=[shop]), None))
+
+    # Zones are measured uncached: the version bump is the same invalidation a write does
+    for zone in ZONE_REGISTRY:
+        url = f"{reverse('analysis_zone', args=[zone])}?range=this_year"
+        found.append((f'analysis_zone:{zone}', url, bump_zone_cache_version))
+
+    for name, q in (('brands', 'm'), ('models', 's'), ('spares', 'b'), ('concerns', 's')):
+        found.append((f'autocomplete_{name}', f"{reverse(f'autocomplete_{name}')}?q={q}", None))
+    return found
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def run_benchmarks(iterations, only=None):
+    """
+    Replays every scenario `iterations` times as a throwaway Owner with the
+    test client. Returns {name: {'p50_ms', 'p95_ms', 'queries'}}.
+    Everything runs in a transaction that is rolled back.
+    """
+    hosts = list(settings.ALLOWED_HOSTS) + ['testserver']
+    results = {}
+    with override_settings(ALLOWED_HOSTS=hosts), transaction.atomic():
+        user = User.objects.create_user(username=f'bench-{time.monotonic_ns()}')
+        user.groups.add(Group.objects.get_or_create(name='Owner')[0])
+        client = Client()
+        client.force_login(user)
+
+        for name, url, before_each in scenarios():
+            if only and name not in only and name.split(':')[0] not in only:
+                continue
+
+            # Warm-up (first-seen session, autocomplete indexes), then one counted request
+            client.get(url)
+            if before_each:
+                before_each()
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(url)
+            # Read now: the next request's request_started clears the query log
+            queries = len(ctx.captured_queries)
+            if response.status_code != 200:
+                raise CommandError(f'{name}: GET {url} returned {response.status_code}')
+
+            timings = []
+            for _ in range(iterations):
+                if before_each:
+                    before_each()
+                started = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            results[name] = {
+                'p50_ms': round(percentile(timings, 50), 2),
+                'p95_ms': round(percentile(timings, 95), 2),
+                'queries': queries,
+            }
+        transaction.set_rollback(True)
+    return results
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Scenarios whose query count grew, or whose p95 grew by more than
+    `threshold` (a fraction) and LATENCY_NOISE_MS. Returns [(name, reason)].
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append((name, f"queries {previous['queries']} → {current['queries']}"))
+        limit = previous['p95_ms'] * (1 + threshold)
+        if current['p95_ms'] > limit and current['p95_ms'] - previous['p95_ms'] > LATENCY_NOISE_MS:
+            regressions.append((name, f"p95 {previous['p95_ms']:.1f}ms → {current['p95_ms']:.1f}ms"))
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the hot pages (p50/p95 latency and SQL queries per view) against the '
+        'current data and fails on regressions versus a stored JSON baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=20,
+            help='Timed requests per view (default: 20)',
+        )
+        parser.add_argument(
+            '--baseline', default=str(DEFAULT_BASELINE),
+            help='Baseline JSON file (default: bench_baseline.json in the project root)',
+        )
+        parser.add_argument(
+            '--save', action='store_true',
+            help='Write the results as the new baseline instead of comparing',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.25,
+            help='Allowed p95 growth as a fraction of the baseline (default: 0.25)',
+        )
+        parser.add_argument(
+            '--only', nargs='+', metavar='VIEW',
+            help='Benchmark only these views (e.g. home analysis_zone autocomplete_spares)',
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be positive')
+        job_cards = JobCard.objects.count()
+        if not job_cards:
+            raise CommandError('No job cards to benchmark against: run `manage.py seed_scale` first')
+
+        baseline_path = Path(options['baseline'])
+        baseline = {}
+        if not options['save']:
+            if not baseline_path.exists():
+                raise CommandError(f'No baseline at {baseline_path}: run with --save first')
+            baseline = json.loads(baseline_path.read_text())
+
+        self.stdout.write(f"Benchmarking against {job_cards} job cards ({options['iterations']} requests per view)...")
+        results = run_benchmarks(options['iterations'], only=options['only'])
+
+        previous = baseline.get('views', {})
+        self.stdout.write(f"   {'view':<30} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8}   baseline p95 / queries")
+        for name, row in results.items():
+            before = previous.get(name)
+            reference = f"{before['p95_ms']:>9.1f} / {before['queries']}" if before else '        -'
+            self.stdout.write(
+                f"   {name:<30} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['queries']:>8}   {reference}"
+            )
+
+        if options['save']:
+            baseline_path.write_text(json.dumps({
+                'created': timezone.now().isoformat(timespec='seconds'),
+                'job_cards': job_cards,
+                'iterations': options['iterations'],
+                'views': results,
+            }, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'✅ Saved baseline for {len(results)} views to {baseline_path}'))
+            return
+
+        if baseline.get('job_cards') != job_cards:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ Baseline was recorded with {baseline.get('job_cards')} job cards, now {job_cards}"
+            ))
+
+        regressions = find_regressions(results, previous, options['threshold'])
+        for name, reason in regressions:
+            self.stdout.write(self.style.ERROR(f'   ❌ {name}: {reason}'))
+        if regressions:
+            raise CommandError(f'{len(regressions)} regression(s) against {baseline_path}')
+        self.stdout.write(self.style.SUCCESS(f'✅ {len(results)} views within budget of the baseline'))
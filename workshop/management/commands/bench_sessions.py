@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+SESSION_MODES = (
+    ('db', 'django.contrib.sessions.backends.db'),
+    ('cache', 'workshop.session_backend'),
+)
+
+
+def measure_session_writes(engine, requests, url_name='spare_shop_list'):
+    """
+    Logs a throwaway Office user in with `engine` and replays `requests` page
+    views. Returns (django_session writes per request, ms per request).
+    Everything runs in a transaction that is rolled back.
+    """
+    hosts = list(settings.ALLOWED_HOSTS) + ['testserver']
+    with override_settings(SESSION_ENGINE=engine, ALLOWED_HOSTS=hosts), transaction.atomic():
+        user = User.objects.create_user(username=f'bench-sessions-{time.monotonic_ns()}')
+        user.groups.add(Group.objects.get_or_create(name='Office')[0])
+        client = Client()
+        client.force_login(user)
+        url = reverse(url_name)
+
+        client.get(url)  # warm-up (first-seen session bookkeeping)
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(requests):
+                client.get(url)
+        elapsed = time.perf_counter() - started
+
+        writes = sum(
+            1 for query in ctx.captured_queries
+            if 'django_session' in query['sql']
+            and query['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))
+        )
+        transaction.set_rollback(True)
+    return writes / requests, elapsed * 1000 / requests
+
+
+class Command(BaseCommand):
+    help = 'Compares django_session writes per request for the db and cache session modes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Page views replayed per mode (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        self.stdout.write(f'Replaying {requests} authenticated page views per session mode...')
+        for mode, engine in SESSION_MODES:
+            writes, ms = measure_session_writes(engine, requests)
+            self.stdout.write(f'  {mode:<6} {writes:6.2f} session writes/request   {ms:8.1f} ms/request')
+        self.stdout.write(self.style.SUCCESS('✅ Session benchmark complete'))
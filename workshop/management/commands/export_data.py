@@ -0,0 +1,57 @@
+from datetime import date
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from workshop.exports import EXPORTS, export_filename, stream_export
+
+
+def _parse_date(value, option):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'{option} must be YYYY-MM-DD, got {value!r}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Streams job cards with lines, spare shop ledgers, supplier bills/payments or cashbook '
+        'entries for a date range to a CSV or XLSX file (constant memory)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(EXPORTS), help='What to export')
+        parser.add_argument(
+            '--format', choices=['csv', 'xlsx'], default='csv',
+            help='File format (default: csv)',
+        )
+        parser.add_argument(
+            '--start', metavar='YYYY-MM-DD',
+            help='First day, inclusive (default: 1 January of the current year)',
+        )
+        parser.add_argument(
+            '--end', metavar='YYYY-MM-DD',
+            help='Last day, inclusive (default: today)',
+        )
+        parser.add_argument(
+            '--output', '-o', metavar='PATH',
+            help='File to write (default: <dataset>_<start>_<end>.<format> in the current directory)',
+        )
+
+    def handle(self, *args, **options):
+        today = date.today()
+        start = _parse_date(options['start'], '--start') if options['start'] else date(today.year, 1, 1)
+        end = _parse_date(options['end'], '--end') if options['end'] else today
+        if start > end:
+            raise CommandError('--start is after --end')
+
+        dataset, file_format = options['dataset'], options['format']
+        path = Path(options['output'] or export_filename(dataset, file_format, start, end))
+        size = 0
+        with path.open('wb') as handle:
+            for block in stream_export(dataset, file_format, start, end):
+                handle.write(block)
+                size += len(block)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Exported {EXPORTS[dataset][0]} {start} → {end} to {path} ({size / 1024:.0f} KB)'
+        ))
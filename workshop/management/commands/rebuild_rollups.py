@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from workshop.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the DailyRollup table used by the Owner Analysis dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows per bulk insert (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding daily rollups from job cards...')
+        written = rebuild_rollups(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {written} daily rollup buckets'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from workshop.models import JobCard
+from workshop.search import search_text_expression, create_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds JobCard.search_text and the job card search index (FTS5 on SQLite, pg_trgm on PostgreSQL)'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding job card search text...')
+        with transaction.atomic():
+            # ONE set-based UPDATE (mechanic names via subquery)
+            updated = JobCard.objects.update(search_text=search_text_expression())
+            indexed = create_search_index(connection)
+
+        if indexed:
+            self.stdout.write(self.style.SUCCESS(f'✅ Indexed {updated} job cards for search'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ Rebuilt search text for {updated} job cards; no search index on '
+                f'{connection.vendor}, searches use LIKE on search_text'
+            ))
@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from workshop.notifications import drain_outbox, purge_finished
+
+PURGE_INTERVAL = 60 * 60  # seconds between deletions of finished rows
+
+
+class Command(BaseCommand):
+    help = 'Delivers queued owner alerts (SMS / Telegram) from the notification outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Drain everything that is currently due, then exit',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Concurrent API calls (default: 4)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=50,
+            help='Rows claimed per batch (default: 50)',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Seconds to wait when the outbox is empty (default: 2)',
+        )
+
+    def handle(self, *args, **options):
+        totals = {}
+        last_purge = None
+        self.stdout.write(f"Notification worker started ({options['workers']} threads)...")
+
+        with ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='outbox') as pool:
+            try:
+                while True:
+                    counts = drain_outbox(pool, batch_size=options['batch_size'])
+                    for outcome, n in counts.items():
+                        totals[outcome] = totals.get(outcome, 0) + n
+                    if counts:
+                        self.stdout.write(', '.join(f'{n} {outcome.lower()}' for outcome, n in sorted(counts.items())))
+                        continue
+                    if last_purge is None or time.monotonic() - last_purge >= PURGE_INTERVAL:
+                        purged = purge_finished()
+                        last_purge = time.monotonic()
+                        if purged:
+                            self.stdout.write(f'{purged} finished notification(s) purged')
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                pass
+
+        summary = ', '.join(f'{n} {outcome.lower()}' for outcome, n in sorted(totals.items())) or 'nothing due'
+        self.stdout.write(self.style.SUCCESS(f'✅ Outbox drained: {summary}'))
@@ -4,10 +4,13 @@ from django.utils import timezone
 from datetime import timedelta
 from django.contrib import messages
 from django.contrib.auth.models import User, Group
-from django.contrib.sessions.models import Session
+from importlib import import_module
+from django.conf import settings
 from django.db import models
-from .decorators import owner_required, office_required
+from .decorators import owner_required, office_required, is_owner
 from .models import Mechanic, UserSession
+from .profiling import recent_slow_requests, view_stats
+from .session_activity import forget_session, merge_buffered_activity
 
 
 @office_required
@@ -45,6 +48,10 @@ def manage_dashboard(request):
     ).filter(
         last_activity__gte=active_window
     ).distinct().order_by('-last_activity')
+
+    # Overlay activity still in this process's write-behind buffer
+    owner_sessions = merge_buffered_activity(owner_sessions)
+    staff_sessions = merge_buffered_activity(staff_sessions)
     
     
     return render(request, 'workshop/manage/manage_dashboard.html', {
@@ -108,7 +115,7 @@ def manage_reset_password(request, user_id):
         user = get_object_or_404(User, pk=user_id)
         
         # Safety: prevent owners from editing other owner/superuser accounts here
-        if user.groups.filter(name='Owner').exists() or user.is_superuser:
+        if is_owner(user):
             messages.error(request, "Cannot modify Owner accounts from this panel.")
             return redirect(reverse('manage_dashboard') + '?section=accounts')
         
@@ -141,7 +148,7 @@ def manage_delete_user(request, user_id):
     if request.method == 'POST':
         user = get_object_or_404(User, pk=user_id)
         
-        if user.groups.filter(name='Owner').exists() or user.is_superuser:
+        if is_owner(user):
             messages.error(request, "Cannot delete Owner accounts from this panel.")
             return redirect(reverse('manage_dashboard') + '?section=accounts')
         
@@ -225,16 +232,32 @@ def manage_terminate_session(request, session_id):
         user_session = get_object_or_404(UserSession, pk=session_id)
         
         # 1. Kill the actual Django session (logs them out)
-        try:
-            django_session = Session.objects.get(session_key=user_session.session_key)
-            django_session.delete()
-        except Session.DoesNotExist:
-            pass # Already gone
+        # Deleted through the configured engine so a cached copy goes too
+        # (no-op if already gone)
+        SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+        SessionStore().delete(user_session.session_key)
             
         # 2. Delete our tracking record
         affected_user = user_session.user.username
+        forget_session(user_session.session_key)
         user_session.delete()
         
         messages.success(request, f"🛑 Access Revoked: Session for '{affected_user}' has been terminated.")
         
     return redirect(reverse('manage_dashboard') + '?section=security')
+
+
+@owner_required
+def manage_performance(request):
+    """
+    Request profiling aggregates per URL name (last PROFILING_WINDOW_MINUTES)
+    and the most recent slow requests. Data is only collected with
+    REQUEST_PROFILING on.
+    """
+    return render(request, 'workshop/manage/performance.html', {
+        'enabled': settings.REQUEST_PROFILING,
+        'slow_request_ms': settings.SLOW_REQUEST_MS,
+        'window': settings.PROFILING_WINDOW_MINUTES,
+        'rows': view_stats(),
+        'slow_requests': recent_slow_requests(),
+    })
@@ -1,10 +1,13 @@
-from .models import UserSession
+from .roles import get_user_roles
+from .session_activity import record_activity
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 
 class SessionTrackingMiddleware:
     """
     Background monitor that tracks which devices are accessing the HQ Portal.
-    Updates the 'Last Active' timestamp and device metadata on every request.
+    Updates the 'Last Active' timestamp and device metadata on every request,
+    through the write-behind buffer in workshop/session_activity.py.
     """
     def __init__(self, get_response):
         self.get_response = get_response
@@ -28,21 +31,28 @@ class SessionTrackingMiddleware:
                 else:
                     ip = request.META.get('REMOTE_ADDR')
 
-                now = timezone.now()
-                from datetime import timedelta
-                cooldown = timedelta(minutes=5)
-                
-                existing = UserSession.objects.filter(session_key=session_key).first()
-                if not existing or (now - existing.last_activity) >= cooldown:
-                    # Update or Create the session record
-                    UserSession.objects.update_or_create(
-                        session_key=session_key,
-                        defaults={
-                            'user': request.user,
-                            'ip_address': ip,
-                            'user_agent': request.META.get('HTTP_USER_AGENT', ''),
-                            'last_activity': now
-                        }
-                    )
+                # Buffered: no query unless this process has not seen the session yet
+                record_activity(
+                    session_key,
+                    user=request.user,
+                    ip_address=ip,
+                    user_agent=request.META.get('HTTP_USER_AGENT', ''),
+                    now=timezone.now(),
+                )
 
         return response
+
+
+class RoleMiddleware:
+    """
+    Exposes the user's cached roles as `request.roles` (resolved lazily, at
+    most once per request). The RBAC decorators and the |has_group filter
+    read the same memo, so templates can use either:
+        {% if request.roles.is_owner %} / {% if request.user|has_group:"Owner" %}
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.roles = SimpleLazyObject(lambda: get_user_roles(getattr(request, 'user', None)))
+        return self.get_response(request)
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+def populate_rollups(apps, schema_editor):
+    from workshop.rollups import rebuild_rollups
+    rebuild_rollups(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshop', '0044_alter_cashbookentry_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('basis', models.CharField(choices=[('ADMITTED', 'Admitted Date'), ('DISCHARGED', 'Discharged Date')], max_length=10)),
+                ('day', models.DateField()),
+                ('delivered', models.BooleanField()),
+                ('payment_status', models.CharField(max_length=20)),
+                ('payment_method', models.CharField(blank=True, default='', max_length=20)),
+                ('job_count', models.PositiveIntegerField(default=0)),
+                ('discounted_jobs', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Sum of total_bill_amount', max_digits=14)),
+                ('collected', models.DecimalField(decimal_places=2, default=0, help_text='Sum of received_amount', max_digits=14)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, help_text='Sum of discount_amount', max_digits=14)),
+                ('spare_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('spare_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('spare_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('labour_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('basis', 'day', 'delivered', 'payment_status', 'payment_method'), name='unique_daily_rollup_bucket')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
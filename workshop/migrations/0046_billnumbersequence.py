@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """One pass over existing JB-YY-NNN numbers: highest suffix per year."""
+    JobCard = apps.get_model('workshop', 'JobCard')
+    BillNumberSequence = apps.get_model('workshop', 'BillNumberSequence')
+
+    highest = {}
+    bill_numbers = JobCard.objects.filter(
+        bill_number__startswith='JB-'
+    ).values_list('bill_number', flat=True).iterator(chunk_size=2000)
+    for bill_number in bill_numbers:
+        try:
+            _, yy, num = bill_number.split('-')
+            year, num = 2000 + int(yy), int(num)
+        except ValueError:
+            continue
+        highest[year] = max(highest.get(year, 0), num)
+
+    BillNumberSequence.objects.bulk_create([
+        BillNumberSequence(year=year, last_number=num) for year, num in highest.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshop', '0045_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(unique=True)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:17
+
+from django.db import migrations, models
+
+
+def build_search_index(apps, schema_editor):
+    from workshop.search import search_text_expression, create_search_index
+    JobCard = apps.get_model('workshop', 'JobCard')
+    JobCard.objects.using(schema_editor.connection.alias).update(search_text=search_text_expression(apps))
+    create_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from workshop.search import drop_search_index
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshop', '0046_billnumbersequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobcard',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Lowercased registration, bill, vehicle, customer and mechanic text'),
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:35
+
+import json
+from decimal import Decimal, InvalidOperation
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def allocations_from_details(apps, schema_editor):
+    """Copies every history's JSON `details` into BulkPaymentAllocation rows."""
+    BulkPaymentHistory = apps.get_model('workshop', 'BulkPaymentHistory')
+    BulkPaymentAllocation = apps.get_model('workshop', 'BulkPaymentAllocation')
+    JobCard = apps.get_model('workshop', 'JobCard')
+
+    existing_jobs = set(JobCard.objects.values_list('pk', flat=True))
+    batch = []
+    for history_id, details in BulkPaymentHistory.objects.values_list('pk', 'details').iterator():
+        try:
+            entries = json.loads(details or '[]')
+        except (ValueError, TypeError):
+            continue
+
+        per_job = {}
+        for entry in entries:
+            try:
+                job_id = int(entry['job_id'])
+                amount = Decimal(str(entry['paid']))
+            except (KeyError, TypeError, ValueError, InvalidOperation):
+                continue
+            if job_id not in existing_jobs:
+                continue
+            paid, _ = per_job.get(job_id, (Decimal('0'), None))
+            per_job[job_id] = (paid + amount, entry.get('status') or 'PARTIAL')
+
+        batch.extend(
+            BulkPaymentAllocation(history_id=history_id, job_card_id=job_id, amount=amount, resulting_status=status)
+            for job_id, (amount, status) in per_job.items()
+        )
+        if len(batch) >= 1000:
+            BulkPaymentAllocation.objects.bulk_create(batch)
+            batch = []
+    BulkPaymentAllocation.objects.bulk_create(batch)
+
+
+def details_from_allocations(apps, schema_editor):
+    """Reverse: rebuilds the JSON snapshot from the allocation rows."""
+    BulkPaymentHistory = apps.get_model('workshop', 'BulkPaymentHistory')
+    BulkPaymentAllocation = apps.get_model('workshop', 'BulkPaymentAllocation')
+
+    details = {}
+    for alloc in BulkPaymentAllocation.objects.select_related('job_card').order_by('pk').iterator():
+        job = alloc.job_card
+        details.setdefault(alloc.history_id, []).append({
+            'job_id': job.pk,
+            'reg': job.registration_number,
+            'car': f"{job.brand_name} {job.model_name}",
+            'paid': str(alloc.amount),
+            'status': alloc.resulting_status,
+        })
+    for history_id, entries in details.items():
+        BulkPaymentHistory.objects.filter(pk=history_id).update(details=json.dumps(entries))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshop', '0047_jobcard_search_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkPaymentAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('resulting_status', models.CharField(choices=[('PENDING', 'Pending (Unpaid)'), ('PAID', 'Fully Paid'), ('PARTIAL', 'Partially Paid'), ('BULK_PAID', 'Bulk Paid')], help_text='Job card status right after this payment', max_length=20)),
+                ('history', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocations', to='workshop.bulkpaymenthistory')),
+                ('job_card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bulk_allocations', to='workshop.jobcard')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job_card', '-history'], name='workshop_bu_job_car_b1e58b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('history', 'job_card'), name='unique_bulk_allocation_per_job')],
+            },
+        ),
+        migrations.RunPython(allocations_from_details, details_from_allocations),
+        migrations.RemoveField(
+            model_name='bulkpaymenthistory',
+            name='details',
+        ),
+    ]
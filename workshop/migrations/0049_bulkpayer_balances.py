@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:41
+
+from django.db import migrations, models
+
+
+def populate_balances(apps, schema_editor):
+    from workshop.bulk_balances import refresh_bulk_payer_balances
+    refresh_bulk_payer_balances(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshop', '0048_bulkpaymentallocation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulkpayer',
+            name='outstanding_balance',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='bulkpayer',
+            name='pending_card_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_balances, migrations.RunPython.noop),
+    ]
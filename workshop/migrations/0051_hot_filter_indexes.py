@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshop', '0050_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=models.Index(fields=['payment_status', 'is_deleted'], name='workshop_jo_payment_0766bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=models.Index(fields=['-admitted_date', 'payment_status'], name='workshop_jo_admitte_906f8c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcard',
+            index=models.Index(condition=models.Q(('delivered', True), ('is_deleted', False)), fields=['-discharged_date'], name='jobcard_delivered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobcardspareitem',
+            index=models.Index(fields=['shop', 'ordered_date'], name='workshop_jo_shop_id_a6b43b_idx'),
+        ),
+    ]
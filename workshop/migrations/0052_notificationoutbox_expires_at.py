@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshop', '0051_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -4,6 +4,11 @@ from django.contrib.auth.signals import user_logged_out
 from django.dispatch import receiver
 from django.utils import timezone
 
+from .rollups import JOB_CARD_SOURCE_FIELDS
+from .search import SEARCH_SOURCE_FIELDS
+from .snapshots import FieldSnapshotMixin
+from .totals import recompute_totals
+
 # -----------------------------------------------------------------------------
 # 0. AUTHENTICATION & USERS
 # -----------------------------------------------------------------------------
@@ -119,6 +124,53 @@ class UserSession(models.Model):
     def device_info(self):
         """Returns the specific device string for the dashboard."""
         return self.get_device_name(self.user_agent)
+
+
+class NotificationOutbox(models.Model):
+    """
+    Persistent outbox for owner alerts (security broadcasts, OTP codes).
+    Login views only enqueue rows; `python manage.py send_notifications`
+    delivers them with retries (see workshop/notifications.py).
+
+    Attributes:
+        channel (CharField): SMS (Twilio) or TELEGRAM (Bot API).
+        recipient (CharField): Mobile number or Telegram chat id.
+        message (TextField): Body; blanked once the row is finished (it may hold an OTP).
+        status (CharField): PENDING → SENDING → SENT / SKIPPED / FAILED.
+        attempts (PositiveSmallIntegerField): Delivery attempts so far.
+        next_attempt_at (DateTimeField): Earliest next try (backoff; lease while SENDING).
+        expires_at (DateTimeField): Optional; undelivered by then → FAILED, never sent (OTPs).
+    """
+    CHANNEL_CHOICES = [
+        ('SMS', 'SMS'),
+        ('TELEGRAM', 'Telegram'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENDING', 'Sending'),
+        ('SENT', 'Sent'),
+        ('SKIPPED', 'Skipped (channel not configured)'),
+        ('FAILED', 'Failed'),
+    ]
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=100)
+    message = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'pk']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} → {self.recipient} ({self.status})"
 # -----------------------------------------------------------------------------
 # 1. STUDY SECTION MODELS
 # These models act as the "Master Lists" for autocomplete suggestions.
@@ -264,7 +316,60 @@ class SpareShop(models.Model):
 # These handle the daily work. loosely coupled to Study models via text fields.
 # -----------------------------------------------------------------------------
 
-class JobCard(models.Model):
+def max_bill_suffix(job_card_model, year):
+    """
+    Highest numeric suffix among existing JB-YY-NNN bill numbers for a year.
+    Compared as integers, so JB-26-1000 correctly beats JB-26-999.
+    One-time scan — only used to seed a BillNumberSequence row.
+    """
+    prefix = f'JB-{str(year)[2:]}-'
+    highest = 0
+    for bill_number in job_card_model.objects.filter(
+        bill_number__startswith=prefix
+    ).values_list('bill_number', flat=True).iterator(chunk_size=2000):
+        try:
+            highest = max(highest, int(bill_number[len(prefix):]))
+        except ValueError:
+            continue
+    return highest
+
+
+class BillNumberSequence(models.Model):
+    """
+    Per-year bill number counter (one row per year).
+    Issuing a number locks and bumps this single row — O(1) regardless of how
+    many job cards exist, instead of locking and sorting every bill of the year.
+    """
+    year = models.PositiveIntegerField(unique=True)
+    last_number = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.year}: {self.last_number}"
+
+    @classmethod
+    def next_number(cls, year):
+        """
+        Atomically reserves and returns the next bill number for `year`.
+        Concurrent callers serialize on the year's row lock (select_for_update).
+        """
+        from django.db import transaction, IntegrityError
+
+        with transaction.atomic():
+            seq = cls.objects.select_for_update().filter(year=year).first()
+            if seq is None:
+                # First bill of a new year (or a year not seeded by the migration)
+                try:
+                    with transaction.atomic():
+                        seq = cls.objects.create(year=year, last_number=max_bill_suffix(JobCard, year))
+                except IntegrityError:
+                    # Another counter created the row first — lock theirs
+                    seq = cls.objects.select_for_update().get(year=year)
+            seq.last_number += 1
+            seq.save(update_fields=['last_number'])
+            return seq.last_number
+
+
+class JobCard(FieldSnapshotMixin, models.Model):
     """
     The Industrial Heart of WorkshopOS. Manages the end-to-end lifecycle 
     of a vehicle service, from admission to billing.
@@ -353,15 +458,32 @@ class JobCard(models.Model):
     ]
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES, blank=True, null=True)
 
+    # Search (FTS5 / trigram indexed, see workshop/search.py)
+    search_text = models.TextField(blank=True, default='', editable=False, help_text="Lowercased registration, bill, vehicle, customer and mechanic text")
+
     # Meta
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
+    # Previous values for the stock / rollup signals (no pre_save re-fetch)
+    # and for deciding whether search_text must be rebuilt
+    snapshot_fields = JOB_CARD_SOURCE_FIELDS + SEARCH_SOURCE_FIELDS + ('lead_mechanic',)
+
     class Meta:
         # High-performance composite index for the dashboard query pattern.
         # Covered: (is_deleted=False, delivered=False) sorted by updated_at DESC.
         indexes = [
             models.Index(fields=['is_deleted', 'delivered', '-updated_at']),
+            # Hero KPI count: payment_status IN (...), is_deleted read from the index
+            models.Index(fields=['payment_status', 'is_deleted']),
+            # Pending payments list: walked newest admitted first, payment_status
+            # checked in the index (a partial index is not matched against IN (?, ?))
+            models.Index(fields=['-admitted_date', 'payment_status']),
+            # Delivered list / delivered-today count
+            models.Index(
+                fields=['-discharged_date'], condition=models.Q(delivered=True, is_deleted=False),
+                name='jobcard_delivered_idx',
+            ),
         ]
         verbose_name = "Job Card"
         verbose_name_plural = "Job Cards"
@@ -369,41 +491,43 @@ class JobCard(models.Model):
     def save(self, *args, **kwargs):
         """
         Auto-generate bill number if not set.
-        Thread-safe implementation to prevent duplicate numbers
-        when multiple users create job cards simultaneously.
+        Thread-safe: numbers come from the per-year BillNumberSequence row,
+        so simultaneous job card creation never issues duplicates.
         """
         from django.db import transaction
-        
-        if not self.bill_number:
-            with transaction.atomic():
-                # Get year (2 digits)
-                year = str(self.admitted_date.year)[2:]  # 2026 → "26"
-                
-                # Lock and count existing bills for this year
-                # select_for_update() prevents race conditions
-                last_job = JobCard.objects.select_for_update().filter(
-                    bill_number__startswith=f'JB-{year}-'
-                ).order_by('-bill_number').first()
-                
-                if last_job and last_job.bill_number:
-                    # Extract number from last bill (e.g., "JB-26-005" → 5)
-                    try:
-                        last_num = int(last_job.bill_number.split('-')[-1])
-                        next_num = last_num + 1
-                    except (ValueError, IndexError):
-                        # Fallback if bill number format is unexpected
-                        next_num = JobCard.objects.filter(
-                            bill_number__startswith=f'JB-{year}-'
-                        ).count() + 1
-                else:
-                    # First bill of the year
-                    next_num = 1
-                
-                # Create bill number (pad with zeros)
-                self.bill_number = f'JB-{year}-{str(next_num).zfill(3)}'
-        
-        super().save(*args, **kwargs)
+
+        if self.bill_number:
+            self._refresh_search_text(kwargs)
+            super().save(*args, **kwargs)
+            return
+
+        # Reserve the number and insert in ONE transaction: if the insert
+        # fails, the counter rolls back too, so the sequence stays gap-free.
+        with transaction.atomic():
+            # Single row lock on the year's counter (see BillNumberSequence)
+            year = self.admitted_date.year
+            next_num = BillNumberSequence.next_number(year)
+
+            # Create bill number (pad with zeros): JB-26-001 … JB-26-1000
+            self.bill_number = f'JB-{str(year)[2:]}-{str(next_num).zfill(3)}'
+            self._refresh_search_text(kwargs)
+            try:
+                super().save(*args, **kwargs)
+            except Exception:
+                self.bill_number = None
+                raise
     
+    def _refresh_search_text(self, save_kwargs):
+        """Rebuilds search_text when one of its source fields changed."""
+        from .search import build_search_text
+
+        if not self.has_changed(*SEARCH_SOURCE_FIELDS, 'lead_mechanic'):
+            return
+        self.search_text = build_search_text(self)
+        update_fields = save_kwargs.get('update_fields')
+        if update_fields is not None and 'search_text' not in update_fields:
+            save_kwargs['update_fields'] = [*update_fields, 'search_text']
+
     def update_totals(self):
         """
         Calculates and saves the denormalized total_bill_amount.
@@ -420,6 +544,28 @@ class JobCard(models.Model):
             self.total_bill_amount = new_total
             # Use update to avoid triggering save() recursion if called from save()
             JobCard.objects.filter(pk=self.pk).update(total_bill_amount=new_total)
+            self._take_snapshot(['total_bill_amount'])
+
+            # Bulk payers holding this card cache its balance
+            from .bulk_balances import refresh_for_job_cards
+            refresh_for_job_cards([self.pk])
+
+        # Line items feed the analysis rollups (spare cost can change without the total changing)
+        self.refresh_rollups()
+
+    def refresh_rollups(self, *extra_days):
+        """
+        Recomputes the DailyRollup buckets for this job card's admitted and
+        discharged days. `extra_days` carries the previous dates when they changed.
+        """
+        from .rollups import refresh_rollups, as_date
+
+        admitted_days = {as_date(self.admitted_date)}
+        discharged_days = {as_date(self.discharged_date)}
+        for day in extra_days:
+            admitted_days.add(as_date(day))
+            discharged_days.add(as_date(day))
+        refresh_rollups(admitted_days=admitted_days, discharged_days=discharged_days)
 
     def __str__(self):
         return f"{self.bill_number or f'#{self.id}'}"
@@ -503,7 +649,7 @@ class JobCardConcern(models.Model):
         return f"{self.concern_text[:50]} ({self.get_status_display()})"
 
 
-class JobCardSpareItem(models.Model):
+class JobCardSpareItem(FieldSnapshotMixin, models.Model):
     """
     Spare parts used in the job.
     Tracks ordering workflow with shop and dates.
@@ -530,23 +676,27 @@ class JobCardSpareItem(models.Model):
     received_date = models.DateField(blank=True, null=True, db_index=True, help_text="Auto-filled when status → RECEIVED")
     original_vehicle_info = models.CharField(max_length=255, blank=True, null=True, help_text="Stores car details if unassigned from a job card")
 
+    # Previous values for the inventory stock delta signals
+    snapshot_fields = ('spare_part_name', 'quantity')
+
+    class Meta:
+        indexes = [
+            # Spare shop ledger: one shop's purchases in a date range
+            models.Index(fields=['shop', 'ordered_date']),
+        ]
+
     def save(self, *args, **kwargs):
         if self.spare_part_name:
             self.spare_part_name = self.spare_part_name.strip()
         super().save(*args, **kwargs)
-        if self.job_card:
-            self.job_card.update_totals()
-        if self.shop:
-            self.shop.update_totals()
+        # Immediate, or once per job card / shop inside deferred_totals()
+        recompute_totals(job_card=self.job_card, shop=self.shop)
 
     def delete(self, *args, **kwargs):
         job_card = self.job_card
         shop = self.shop
         super().delete(*args, **kwargs)
-        if job_card:
-            job_card.update_totals()
-        if shop:
-            shop.update_totals()
+        recompute_totals(job_card=job_card, shop=shop)
 
     def __str__(self):
         return f"{self.spare_part_name} ({self.quantity})"
@@ -562,12 +712,12 @@ class JobCardLabourItem(models.Model):
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        self.job_card.update_totals()
+        recompute_totals(job_card=self.job_card)
 
     def delete(self, *args, **kwargs):
         job_card = self.job_card
         super().delete(*args, **kwargs)
-        job_card.update_totals()
+        recompute_totals(job_card=job_card)
 
     def __str__(self):
         return self.job_description
@@ -585,6 +735,10 @@ class BulkPayer(models.Model):
     job_cards = models.ManyToManyField(JobCard, blank=True, related_name='bulk_payers')
     is_trashed = models.BooleanField(default=False, db_index=True)
 
+    # Denormalized over PENDING/PARTIAL member cards (see workshop/bulk_balances.py)
+    pending_card_count = models.PositiveIntegerField(default=0, editable=False)
+    outstanding_balance = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+
     class Meta:
         ordering = ['customer_name']
 
@@ -608,7 +762,6 @@ class BulkPaymentHistory(models.Model):
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS, default='CASH')
     jobs_affected = models.PositiveIntegerField(default=0)
-    details = models.TextField(blank=True, help_text="JSON snapshot of which jobs got how much")
     is_trashed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -619,6 +772,31 @@ class BulkPaymentHistory(models.Model):
         return f"₹{self.amount} → {self.bulk_payer.customer_name} ({self.created_at:%d %b %Y})"
 
 
+class BulkPaymentAllocation(models.Model):
+    """
+    One job card's share of a bulk payment (which job got how much).
+    Replaces the old JSON `details` snapshot: a payment is reversed with a
+    single set-based UPDATE, and "which payments touched this job card" is
+    an indexed lookup (job_card.bulk_allocations).
+    """
+    history = models.ForeignKey(BulkPaymentHistory, on_delete=models.CASCADE, related_name='allocations')
+    job_card = models.ForeignKey(JobCard, on_delete=models.CASCADE, related_name='bulk_allocations')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    resulting_status = models.CharField(max_length=20, choices=JobCard.PAYMENT_STATUS_CHOICES, help_text="Job card status right after this payment")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['history', 'job_card'], name='unique_bulk_allocation_per_job'),
+        ]
+        indexes = [
+            # Payments that touched a job card, newest first
+            models.Index(fields=['job_card', '-history']),
+        ]
+
+    def __str__(self):
+        return f"₹{self.amount} → {self.job_card} ({self.get_resulting_status_display()})"
+
+
 class SpareShopPayment(models.Model):
     """
     Audit trail for every payment made to a spare shop.
@@ -694,6 +872,58 @@ class CashbookEntry(models.Model):
         return f"{self.get_entry_type_display()} - {self.category}: ₹{self.amount} ({self.get_payment_method_display()})"
 
 
+# -----------------------------------------------------------------------------
+# ANALYSIS ROLLUPS
+# -----------------------------------------------------------------------------
+class DailyRollup(models.Model):
+    """
+    Pre-aggregated daily financials for the Owner Analysis dashboard.
+    One row per (basis, day, delivered, payment_status, payment_method) bucket,
+    so dashboard queries scale with the number of days, not the number of job cards.
+
+    Maintained by workshop.rollups (refreshed per affected day on every job card,
+    spare or labour change) and rebuilt from scratch by `manage.py rebuild_rollups`.
+
+    Attributes:
+        basis (CharField): Which JobCard date the bucket is keyed on.
+          ADMITTED   → admitted_date (revenue, hero KPIs, payment status)
+          DISCHARGED → discharged_date (cashbook collections by payment method)
+        day (DateField): The calendar day of the bucket.
+        payment_method (CharField): '' when the job card has no method recorded.
+    """
+    BASIS_CHOICES = [
+        ('ADMITTED', 'Admitted Date'),
+        ('DISCHARGED', 'Discharged Date'),
+    ]
+
+    basis = models.CharField(max_length=10, choices=BASIS_CHOICES)
+    day = models.DateField()
+    delivered = models.BooleanField()
+    payment_status = models.CharField(max_length=20)
+    payment_method = models.CharField(max_length=20, blank=True, default='')
+
+    job_count = models.PositiveIntegerField(default=0)
+    discounted_jobs = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Sum of total_bill_amount")
+    collected = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Sum of received_amount")
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Sum of discount_amount")
+    spare_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    spare_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    spare_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    labour_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['basis', 'day', 'delivered', 'payment_status', 'payment_method'],
+                name='unique_daily_rollup_bucket',
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.basis} {self.day} ({self.payment_status}/{self.payment_method or '-'}): {self.job_count} jobs"
+
+
 
 @receiver(user_logged_out)
 def on_user_logout(sender, request, user, **kwargs):
@@ -702,4 +932,6 @@ def on_user_logout(sender, request, user, **kwargs):
     so the 'Active Now' dashboard stays 100% accurate.
     """
     if user:
+        from .session_activity import forget_session
+        forget_session(request.session.session_key)
         UserSession.objects.filter(session_key=request.session.session_key).delete()
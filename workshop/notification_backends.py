@@ -0,0 +1,92 @@
+"""
+workshop/notification_backends.py
+=================================
+Notification Transports (lazily loaded)
+=======================================
+
+The Twilio SDK (and requests) used to be imported by workshop.auth_views at
+module load — i.e. by every worker process, management command and test
+run, through workshop/urls.py — although messages are only sent by the
+send_notifications worker.
+
+Each channel is now a backend class named in settings.NOTIFICATION_BACKENDS
+and loaded by workshop.notifications on first delivery. The SDK imports live
+inside the backends and happen only once a channel is actually configured
+and used.
+
+A backend:
+  - is instantiated once per worker thread (it may keep HTTP connections)
+  - send(recipient, message) returns on success, raises NotConfigured when
+    the channel has no credentials, and raises anything else to be retried
+"""
+
+from decouple import config
+from django.conf import settings
+
+HTTP_TIMEOUT = 10  # seconds per API call (worker only)
+
+
+class NotConfigured(Exception):
+    """The channel has no (or placeholder) credentials."""
+
+
+class DeliveryError(Exception):
+    """The provider rejected the message (retried)."""
+
+
+class BaseNotificationBackend:
+    def send(self, recipient, message):
+        raise NotImplementedError
+
+
+class TwilioSMSBackend(BaseNotificationBackend):
+    """SMS via the Twilio REST API (one client per credentials / base URL)."""
+
+    def __init__(self):
+        self.clients = {}
+
+    def _client(self, sid, token):
+        from twilio.http.http_client import TwilioHttpClient
+        from twilio.rest import Client
+
+        key = (sid, token, settings.TWILIO_API_URL)
+        if key not in self.clients:
+            client = Client(sid, token, http_client=TwilioHttpClient(timeout=HTTP_TIMEOUT))
+            client.api.base_url = settings.TWILIO_API_URL
+            self.clients[key] = client
+        return self.clients[key]
+
+    def send(self, recipient, message):
+        sid = config('TWILIO_ACCOUNT_SID', default='your_sid_here').strip()
+        token = config('TWILIO_AUTH_TOKEN', default='your_token_here').strip()
+        from_num = config('TWILIO_FROM_NUMBER', default='your_twilio_number_here').strip()
+
+        # Safety check: Is the user still using placeholders?
+        if 'your_sid_here' in sid or not sid:
+            raise NotConfigured('Twilio credentials are not set')
+
+        self._client(sid, token).messages.create(body=message, from_=from_num, to=recipient)
+
+
+class TelegramBackend(BaseNotificationBackend):
+    """Messages via the Telegram Bot API over a kept-alive requests.Session."""
+
+    def __init__(self):
+        self.http = None
+
+    def send(self, recipient, message):
+        token = config('TELEGRAM_BOT_TOKEN', default='').strip()
+        if not token or 'your_bot_token_here' in token:
+            raise NotConfigured('Telegram bot token is not set')
+
+        if self.http is None:
+            import requests
+            self.http = requests.Session()
+
+        response = self.http.post(
+            f"{settings.TELEGRAM_API_URL}/bot{token}/sendMessage",
+            json={'chat_id': recipient, 'text': message, 'parse_mode': 'HTML'},
+            timeout=HTTP_TIMEOUT,
+        )
+        if response.status_code != 200:
+            raise DeliveryError(f"Telegram HTTP {response.status_code}: {response.text[:200]}")
@@ -0,0 +1,200 @@
+"""
+workshop/notifications.py
+=========================
+Notification Outbox (Twilio SMS + Telegram)
+===========================================
+
+Security broadcasts and OTP codes used to be sent inside the login request:
+Twilio and Telegram were called synchronously, with a 10s timeout per
+channel and per owner — one slow API could stall a login for 40 seconds.
+
+Now the request only ENQUEUES (one bulk INSERT into NotificationOutbox) and
+`python manage.py send_notifications` delivers:
+
+  - due rows are claimed in batches (status SENDING + a lease, so a crashed
+    worker's rows are picked up again once the lease expires)
+  - HTTP calls run on a bounded thread pool; each pool thread keeps its own
+    backend instances (settings.NOTIFICATION_BACKENDS, imported lazily — see
+    workshop/notification_backends.py), so connections are reused
+  - database writes stay on the worker's main thread (one bulk_update per batch)
+  - failures are retried with exponential backoff (RETRY_BASE_DELAY doubling,
+    capped at RETRY_MAX_DELAY) up to MAX_ATTEMPTS, then marked FAILED
+  - rows with an `expires_at` (OTPs: the code's lifetime) still undelivered
+    by then are marked FAILED instead of sent — never a dead or stale code
+  - a channel without credentials is SKIPPED (logged with the recipient only)
+
+Messages can hold OTPs: a row's message is blanked as soon as it is SENT,
+SKIPPED or FAILED, and the worker deletes finished rows after
+FINISHED_RETENTION.
+
+Nothing is delivered without a running worker — not even to the terminal.
+enqueue_notifications() logs an ERROR (errors.log) when due rows have been
+waiting longer than WORKER_STALL_AFTER.
+
+API endpoints come from settings.TWILIO_API_URL / TELEGRAM_API_URL, so the
+worker can be pointed at a local fake server.
+"""
+
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import NotificationOutbox
+from .notification_backends import NotConfigured
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 6
+RETRY_BASE_DELAY = 30             # seconds; doubles per attempt
+RETRY_MAX_DELAY = 60 * 60
+CLAIM_LEASE = timedelta(minutes=5)
+FINISHED_RETENTION = timedelta(days=7)
+WORKER_STALL_AFTER = timedelta(minutes=2)
+
+_local = threading.local()
+
+
+# -----------------------------------------------------------------------------
+# Transports (run on pool threads: no database access here)
+# -----------------------------------------------------------------------------
+def get_backend(channel):
+    """This thread's backend instance for `channel` (imported on first use)."""
+    backends = _local.__dict__.setdefault('backends', {})
+    path = settings.NOTIFICATION_BACKENDS[channel]
+    if backends.get(channel, (None,))[0] != path:
+        backends[channel] = (path, import_string(path)())
+    return backends[channel][1]
+
+
+def deliver(channel, recipient, message):
+    """Sends one message synchronously (worker threads, verify scripts)."""
+    get_backend(channel).send(recipient, message)
+
+
+# -----------------------------------------------------------------------------
+# Enqueue (request side)
+# -----------------------------------------------------------------------------
+def enqueue_notifications(messages, expires_at=None):
+    """
+    Queues (channel, recipient, message) tuples in ONE INSERT. Entries
+    without a recipient are dropped. Rows not delivered by `expires_at`
+    are never sent. Returns the created rows.
+    """
+    rows = [
+        NotificationOutbox(channel=channel, recipient=recipient, message=message, expires_at=expires_at)
+        for channel, recipient, message in messages if recipient
+    ]
+    if not rows:
+        return []
+    warn_if_worker_stalled()
+    return NotificationOutbox.objects.bulk_create(rows)
+
+
+def warn_if_worker_stalled():
+    """Logs an ERROR when due rows wait past WORKER_STALL_AFTER: no worker is draining the outbox."""
+    stalled = NotificationOutbox.objects.filter(
+        status='PENDING', next_attempt_at__lte=timezone.now() - WORKER_STALL_AFTER,
+    ).exists()
+    if stalled:
+        logger.error(
+            "Notification outbox is not being drained: is `manage.py send_notifications` running? "
+            "Queued alerts and OTPs are not delivered without it."
+        )
+    return stalled
+
+
+# -----------------------------------------------------------------------------
+# Worker side
+# -----------------------------------------------------------------------------
+def retry_delay(attempts):
+    """Backoff before attempt number `attempts + 1`."""
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY))
+
+
+def claim_due(batch_size):
+    """
+    Marks up to `batch_size` due rows SENDING under a lease and returns them.
+    Rows whose lease ran out (worker died mid-send) are due again; due rows
+    past their expires_at are marked FAILED instead.
+    """
+    now = timezone.now()
+    due = Q(status='PENDING') | Q(status='SENDING')
+    expired = NotificationOutbox.objects.filter(due, next_attempt_at__lte=now, expires_at__lte=now).update(
+        status='FAILED', message='', last_error='Expired before delivery',
+    )
+    if expired:
+        logger.warning(f"{expired} notification(s) expired before delivery")
+
+    ids = list(
+        NotificationOutbox.objects.filter(due, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'pk').values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+
+    lease_until = now + CLAIM_LEASE
+    # Re-checks the due condition: rows taken by another worker meanwhile are skipped
+    NotificationOutbox.objects.filter(due, pk__in=ids, next_attempt_at__lte=now).update(
+        status='SENDING', next_attempt_at=lease_until,
+    )
+    return list(NotificationOutbox.objects.filter(pk__in=ids, status='SENDING', next_attempt_at=lease_until))
+
+
+def _attempt(row):
+    """Pool thread: one delivery. Returns (row, outcome, error)."""
+    try:
+        deliver(row.channel, row.recipient, row.message)
+    except NotConfigured as e:
+        logger.warning(f"Titan {row.channel} to {row.recipient} skipped: {e}")
+        return row, 'SKIPPED', str(e)
+    except Exception as e:
+        logger.error(f"Titan {row.channel} Failure: {e}")
+        return row, 'RETRY', str(e) or e.__class__.__name__
+    return row, 'SENT', ''
+
+
+def drain_outbox(pool, batch_size=50):
+    """
+    Delivers one batch of due rows on `pool` (a ThreadPoolExecutor).
+    Returns {outcome: count} for the batch — SENT / SKIPPED / RETRY / FAILED
+    ({} when nothing was due).
+    """
+    rows = claim_due(batch_size)
+    if not rows:
+        return {}
+
+    now = timezone.now()
+    counts = {}
+    for row, outcome, error in pool.map(_attempt, rows):
+        row.attempts += 1
+        row.last_error = error
+        if outcome == 'RETRY' and row.attempts >= MAX_ATTEMPTS:
+            outcome = 'FAILED'
+
+        if outcome == 'RETRY':
+            row.status = 'PENDING'
+            row.next_attempt_at = now + retry_delay(row.attempts)
+        else:
+            row.status = outcome
+            row.message = ''
+            if outcome == 'SENT':
+                row.sent_at = now
+        counts[outcome] = counts.get(outcome, 0) + 1
+
+    NotificationOutbox.objects.bulk_update(
+        rows, ['status', 'message', 'attempts', 'last_error', 'next_attempt_at', 'sent_at'], batch_size=500,
+    )
+    return counts
+
+
+def purge_finished(older_than=FINISHED_RETENTION):
+    """Deletes SENT / SKIPPED / FAILED rows created before `older_than` ago. Returns the count."""
+    deleted, _ = NotificationOutbox.objects.filter(
+        status__in=['SENT', 'SKIPPED', 'FAILED'], created_at__lt=timezone.now() - older_than,
+    ).delete()
+    return deleted
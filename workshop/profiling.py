@@ -0,0 +1,361 @@
+"""
+workshop/profiling.py
+=====================
+Per-Request SQL Profiling (opt-in)
+==================================
+
+Only ERROR-level logging existed, so a slow page in production could not be
+traced to a view, let alone a query. With REQUEST_PROFILING=True,
+QueryProfilingMiddleware measures every request:
+
+  - query count and total DB time (an execute_wrapper on each connection)
+  - work a view hands to a thread pool, when each task is wrapped with
+    profiled() (the worker's connections get the same execute_wrapper);
+    DB and template times then add up across threads
+  - the slowest PROFILING_SLOW_QUERIES queries, SQL normalized (literals and
+    IN-lists collapsed) so the same statement groups together
+  - template render time (ProfiledDjangoTemplates, the TEMPLATES backend,
+    times top-level renders while a profile is active)
+
+Responses to Owners carry a `Server-Timing` header (db / tpl / total — shown
+in the browser's network panel); other clients never see the timings. Requests slower than SLOW_REQUEST_MS are
+written as one JSON line to the `workshop.profiling` logger (rotating
+slow_requests.log) and kept in a short "recent slow requests" list.
+
+Rolling aggregates per URL name live in the cache, in PROFILING_BUCKET-second
+buckets: each process accumulates in memory and merges into the shared
+buckets every PROFILING_FLUSH_INTERVAL seconds (no per-request cache or DB
+write). Concurrent flushes of the same bucket can drop a few samples — fine
+for diagnostics. The owner page /manage/performance/ reads the last
+PROFILING_WINDOW_MINUTES of buckets.
+
+When REQUEST_PROFILING is off the middleware removes itself (MiddlewareNotUsed)
+and the template backend only pays one ContextVar lookup per render.
+"""
+
+import heapq
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar, copy_context
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.utils import timezone
+
+from .roles import get_user_roles
+
+logger = logging.getLogger(__name__)
+
+PROFILING_BUCKET = 300              # seconds per aggregate bucket
+STATS_PREFIX = 'profiling:stats'
+RECENT_SLOW_KEY = 'profiling:slow'
+RECENT_SLOW_LIMIT = 20
+
+_current = ContextVar('request_profile', default=None)
+_template_depth = ContextVar('template_render_depth', default=0)
+
+_lock = threading.Lock()
+_pending = {}                       # (bucket, url name) → stats dict
+_last_flush = time.monotonic()
+
+
+def _flush_interval():
+    return getattr(settings, 'PROFILING_FLUSH_INTERVAL', 10)
+
+
+def _slow_query_count():
+    return getattr(settings, 'PROFILING_SLOW_QUERIES', 5)
+
+
+# -----------------------------------------------------------------------------
+# SQL normalization
+# -----------------------------------------------------------------------------
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w."])-?\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """SQL with literals replaced by ? and IN-lists collapsed: `... IN (...)`."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+# -----------------------------------------------------------------------------
+# Per-request collector
+# -----------------------------------------------------------------------------
+class RequestProfile:
+    """
+    Query / template timings for one request (also the execute_wrapper).
+    Thread-safe: profiled() pool workers report into the request's profile.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self._slowest = []  # min-heap of (ms, seq, sql)
+        self._keep = _slow_query_count()
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.queries += 1
+                self.db_ms += ms
+                entry = (ms, self.queries, sql)
+                if len(self._slowest) < self._keep:
+                    heapq.heappush(self._slowest, entry)
+                elif self._keep:
+                    heapq.heappushpop(self._slowest, entry)
+
+    def add_template_time(self, ms):
+        with self._lock:
+            self.template_ms += ms
+
+    def slowest_queries(self):
+        return [
+            {'ms': round(ms, 2), 'sql': normalize_sql(sql)}
+            for ms, _, sql in sorted(self._slowest, reverse=True)
+        ]
+
+    def server_timing(self, total_ms):
+        return (
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries", '
+            f'tpl;dur={self.template_ms:.1f}, total;dur={total_ms:.1f}'
+        )
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return super().render(context, request)
+
+        # Only the outermost render counts (render_to_string inside a render is
+        # nested). The depth is per thread, so pool workers count their own renders.
+        depth = _template_depth.get()
+        token = _template_depth.set(depth + 1)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            _template_depth.reset(token)
+            if not depth:
+                profile.add_template_time((time.perf_counter() - started) * 1000)
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time reported to the active profile."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return ProfiledTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+# -----------------------------------------------------------------------------
+# Thread pools
+# -----------------------------------------------------------------------------
+def _profile_connections(profile):
+    """Context manager: `profile` wraps every connection of the calling thread."""
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(profile))
+    return stack
+
+
+def profiled(fn):
+    """
+    `fn`, to run in a worker thread as part of the current request's profile:
+    it sees the request's context variables and its queries (on the worker's
+    own connections) and template renders are counted. `fn` itself when no
+    profile is active.
+
+        pool.submit(profiled(compute), arg)
+    """
+    profile = _current.get()
+    if profile is None:
+        return fn
+    context = copy_context()
+
+    def run(*args, **kwargs):
+        with _profile_connections(profile):
+            # A context can only be entered by one thread at a time: run in a copy
+            return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+# -----------------------------------------------------------------------------
+# Middleware
+# -----------------------------------------------------------------------------
+class QueryProfilingMiddleware:
+    """Opt-in (REQUEST_PROFILING): profiles every request, see module docstring."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            with _profile_connections(profile):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else '<unresolved>'
+        # Query counts and timings tell an attacker which lookups hit the DB
+        if get_user_roles(getattr(request, 'user', None)).is_owner:
+            response['Server-Timing'] = profile.server_timing(total_ms)
+        record_request(url_name, request, response.status_code, profile, total_ms)
+        return response
+
+
+# -----------------------------------------------------------------------------
+# Slow log + rolling aggregates
+# -----------------------------------------------------------------------------
+def _empty_stats():
+    return {
+        'count': 0, 'slow': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'db_ms': 0.0,
+        'template_ms': 0.0, 'queries': 0, 'max_queries': 0,
+    }
+
+
+def _merge(into, stats):
+    for field in ('count', 'slow', 'total_ms', 'db_ms', 'template_ms', 'queries'):
+        into[field] += stats[field]
+    into['max_ms'] = max(into['max_ms'], stats['max_ms'])
+    into['max_queries'] = max(into['max_queries'], stats['max_queries'])
+
+
+def record_request(url_name, request, status_code, profile, total_ms):
+    """Adds one request to this process's aggregates; logs it if slow."""
+    slow = total_ms >= settings.SLOW_REQUEST_MS
+    sample = {
+        'count': 1, 'slow': int(slow), 'total_ms': total_ms, 'max_ms': total_ms,
+        'db_ms': profile.db_ms, 'template_ms': profile.template_ms,
+        'queries': profile.queries, 'max_queries': profile.queries,
+    }
+    key = (int(time.time() // PROFILING_BUCKET), url_name)
+    with _lock:
+        _merge(_pending.setdefault(key, _empty_stats()), sample)
+        due = time.monotonic() - _last_flush >= _flush_interval()
+    if due:
+        flush_stats()
+
+    if slow:
+        entry = {
+            'ts': timezone.now().isoformat(timespec='seconds'),
+            'url_name': url_name,
+            'method': request.method,
+            'path': request.path,
+            'status': status_code,
+            'total_ms': round(total_ms, 1),
+            'db_ms': round(profile.db_ms, 1),
+            'template_ms': round(profile.template_ms, 1),
+            'queries': profile.queries,
+            'slowest': profile.slowest_queries(),
+        }
+        logger.warning(json.dumps(entry))
+        recent = cache.get(RECENT_SLOW_KEY) or []
+        cache.set(RECENT_SLOW_KEY, [entry] + recent[:RECENT_SLOW_LIMIT - 1], None)
+
+
+def _stats_key(bucket, url_name):
+    return f'{STATS_PREFIX}:{bucket}:{url_name}'
+
+
+def _names_key(bucket):
+    return f'{STATS_PREFIX}:{bucket}:names'
+
+
+def flush_stats():
+    """Merges this process's pending aggregates into the shared cache buckets."""
+    global _last_flush
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+
+    timeout = getattr(settings, 'PROFILING_WINDOW_MINUTES', 60) * 60 + PROFILING_BUCKET
+    buckets = {}
+    for bucket, url_name in pending:
+        buckets.setdefault(bucket, set()).add(url_name)
+
+    for bucket, names in buckets.items():
+        stored = cache.get_many([_stats_key(bucket, name) for name in names])
+        updates = {}
+        for name in names:
+            key = _stats_key(bucket, name)
+            merged = stored.get(key) or _empty_stats()
+            _merge(merged, pending[(bucket, name)])
+            updates[key] = merged
+        updates[_names_key(bucket)] = set(cache.get(_names_key(bucket)) or ()) | names
+        cache.set_many(updates, timeout)
+
+
+def view_stats(window_minutes=None):
+    """
+    Aggregates per URL name over the last `window_minutes`, busiest (total
+    time) first. Includes this process's not-yet-flushed samples.
+    """
+    flush_stats()
+    window_minutes = window_minutes or getattr(settings, 'PROFILING_WINDOW_MINUTES', 60)
+    current = int(time.time() // PROFILING_BUCKET)
+    buckets = range(current - (window_minutes * 60) // PROFILING_BUCKET, current + 1)
+
+    names = cache.get_many([_names_key(bucket) for bucket in buckets])
+    keys = [_stats_key(bucket, name) for bucket in buckets for name in names.get(_names_key(bucket), ())]
+    totals = {}
+    for key, stats in cache.get_many(keys).items():
+        url_name = key.split(':', 3)[3]
+        _merge(totals.setdefault(url_name, _empty_stats()), stats)
+
+    rows = []
+    for url_name, stats in totals.items():
+        count = stats['count']
+        rows.append({
+            'url_name': url_name,
+            'count': count,
+            'slow': stats['slow'],
+            'total_ms': stats['total_ms'],
+            'avg_ms': stats['total_ms'] / count,
+            'max_ms': stats['max_ms'],
+            'avg_db_ms': stats['db_ms'] / count,
+            'avg_template_ms': stats['template_ms'] / count,
+            'avg_queries': stats['queries'] / count,
+            'max_queries': stats['max_queries'],
+        })
+    rows.sort(key=lambda row: row['total_ms'], reverse=True)
+    return rows
+
+
+def recent_slow_requests():
+    return cache.get(RECENT_SLOW_KEY) or []
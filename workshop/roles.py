@@ -0,0 +1,148 @@
+"""
+workshop/roles.py
+=================
+Cached Role Resolution
+======================
+
+Every protected view ran a groups query in its RBAC decorator, and every
+`|has_group` in the templates ran two more (Group lookup + user.groups).
+A page with a dozen role checks cost a dozen-plus queries.
+
+get_user_roles(user) resolves a user's group names ONCE:
+  - per request:  memoized on the user object (request.user is the same
+                  object for the decorator, the view and the templates);
+                  RoleMiddleware exposes it as `request.roles`.
+  - across requests: cached per user under a versioned key, so a page
+                  render normally needs zero role queries. Only with a
+                  cache shared by every worker (Redis, Memcached, ...):
+                  invalidation reaches just the cache of the process that
+                  made the change, so with the per-process LocMemCache a
+                  demoted Owner would keep access in the other workers.
+                  There, roles are read once per request instead.
+
+Freshness: receivers in workshop.signals drop a user's cached roles when
+their group membership changes (m2m_changed, either side of the relation)
+and bump the global version when a Group is renamed or deleted.
+"""
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+ROLES_CACHE_TIMEOUT = 60 * 60  # safety net; invalidation keeps entries fresh
+ROLES_CACHE_PREFIX = 'user_roles'
+
+
+class UserRoles(frozenset):
+    """A user's group names. Superusers pass every role check."""
+
+    def __new__(cls, names=(), superuser=False):
+        roles = super().__new__(cls, names)
+        roles.superuser = superuser
+        return roles
+
+    def has(self, *names):
+        return self.superuser or not self.isdisjoint(names)
+
+    @property
+    def is_owner(self):
+        return self.has('Owner')
+
+    @property
+    def is_office_or_owner(self):
+        return self.has('Office', 'Owner')
+
+    @property
+    def is_floor_office_owner(self):
+        return self.has('Floor', 'Office', 'Owner')
+
+
+NO_ROLES = UserRoles()
+
+
+def _cache_is_shared():
+    """False for the per-process LocMemCache (other workers would never see an invalidation)."""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+# -----------------------------------------------------------------------------
+# Versioning
+# -----------------------------------------------------------------------------
+def _version_key():
+    return f'{ROLES_CACHE_PREFIX}:version'
+
+
+def _user_key(user_id):
+    return f'{ROLES_CACHE_PREFIX}:{user_id}'
+
+
+def invalidate_user_roles(user_ids=None):
+    """Drops cached roles for `user_ids` (None = every user)."""
+    if user_ids is None:
+        key = _version_key()
+        cache.add(key, 1, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+        return
+    version = cache.get_or_set(_version_key(), 1, None)
+    cache.delete_many([_user_key(user_id) for user_id in user_ids], version=version)
+
+
+# -----------------------------------------------------------------------------
+# Resolution
+# -----------------------------------------------------------------------------
+def get_user_roles(user):
+    """The user's UserRoles: memoized on the instance, cached per user (shared caches only)."""
+    if user is None or not user.is_authenticated:
+        return NO_ROLES
+
+    roles = getattr(user, '_cached_roles', None)
+    if roles is not None:
+        return roles
+
+    if _cache_is_shared():
+        version = cache.get_or_set(_version_key(), 1, None)
+        names = cache.get(_user_key(user.pk), version=version)
+        if names is None:
+            names = list(user.groups.values_list('name', flat=True))
+            cache.set(_user_key(user.pk), names, ROLES_CACHE_TIMEOUT, version=version)
+    else:
+        names = list(user.groups.values_list('name', flat=True))
+
+    roles = UserRoles(names, superuser=user.is_superuser)
+    user._cached_roles = roles
+    return roles
+
+
+def forget_user_roles(user):
+    """Clears the per-request memo (e.g. after changing the user's groups in-process)."""
+    user.__dict__.pop('_cached_roles', None)
+
+
+def invalidate_roles_on_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    """m2m_changed receiver for User.groups."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        # instance is a User
+        invalidate_user_roles([instance.pk])
+        forget_user_roles(instance)
+    elif action == 'post_clear':
+        # group.user_set.clear(): the removed users are not known
+        invalidate_user_roles()
+    else:
+        invalidate_user_roles(pk_set or ())
+
+
+def invalidate_roles_on_user_created(sender, instance, created, raw=False, **kwargs):
+    """post_save receiver for User: a reused primary key must not inherit stale roles."""
+    if created:
+        invalidate_user_roles([instance.pk])
+
+
+def invalidate_roles_on_group_change(sender, instance, created=False, raw=False, **kwargs):
+    """post_save / post_delete receiver for Group (renames change every member's roles)."""
+    if created or raw:
+        return
+    invalidate_user_roles()
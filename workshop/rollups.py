@@ -0,0 +1,216 @@
+"""
+workshop/rollups.py
+===================
+Materialized Daily Rollups for the Owner Analysis Dashboard
+============================================================
+
+The analysis dashboard used to aggregate JobCard / JobCardSpareItem /
+JobCardLabourItem rows on every request. With 1M+ job cards that is a full
+range scan (plus two JOINs) per KPI card. DailyRollup stores those aggregates
+once per day bucket, so a 12-month report reads ~365 × (statuses × methods)
+tiny rows instead of every job card in the range.
+
+Maintenance:
+  - refresh_rollups(): Recomputes ONLY the given days from the source tables
+                       (3 grouped queries) and upserts the result. Called
+                       whenever a job card or one of its lines changes.
+  - rebuild_rollups(): Drops and rebuilds every bucket. Used by the
+                       `rebuild_rollups` management command and the migration.
+
+Refreshing a whole day (instead of applying +/- deltas) keeps the table
+self-healing: a missed signal is corrected by the next change on that day.
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum, Count, Q, DecimalField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+ADMITTED = 'ADMITTED'
+DISCHARGED = 'DISCHARGED'
+
+BASIS_DATE_FIELD = {
+    ADMITTED: 'admitted_date',
+    DISCHARGED: 'discharged_date',
+}
+
+BUCKET_FIELDS = ['basis', 'day', 'delivered', 'payment_status', 'payment_method']
+METRIC_FIELDS = [
+    'job_count', 'discounted_jobs', 'revenue', 'collected', 'discount',
+    'spare_revenue', 'spare_cost', 'spare_qty', 'labour_revenue',
+]
+
+ZERO = Decimal('0')
+
+# JobCard fields a bucket is keyed or summed on: a save that changes none of
+# them leaves every rollup row as it was
+JOB_CARD_SOURCE_FIELDS = (
+    'admitted_date', 'discharged_date', 'is_deleted', 'delivered', 'payment_status',
+    'payment_method', 'total_bill_amount', 'received_amount', 'discount_amount',
+)
+
+
+def as_date(value):
+    """Normalizes a DateField value (date, datetime or ISO string) to a date."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        # Same conversion DateField.to_python applies before storing
+        if settings.USE_TZ and timezone.is_aware(value):
+            value = timezone.make_naive(value, timezone.get_default_timezone())
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _dec_sum(field):
+    return Coalesce(Sum(field), ZERO, output_field=DecimalField())
+
+
+def _empty_metrics():
+    return {
+        'job_count': 0, 'discounted_jobs': 0,
+        'revenue': ZERO, 'collected': ZERO, 'discount': ZERO,
+        'spare_revenue': ZERO, 'spare_cost': ZERO, 'spare_qty': ZERO,
+        'labour_revenue': ZERO,
+    }
+
+
+def _collect(basis, days=None, apps=global_apps):
+    """
+    Aggregates the source tables into {bucket_key: metrics} for one basis.
+    `days=None` collects every day; otherwise only the listed days.
+
+    Queries (3 total, all grouped in SQL):
+      1. JobCard totals per bucket
+      2. Spare item revenue/cost/qty per bucket (JOIN JobCard)
+      3. Labour revenue per bucket (JOIN JobCard)
+    """
+    JobCard = apps.get_model('workshop', 'JobCard')
+    JobCardSpareItem = apps.get_model('workshop', 'JobCardSpareItem')
+    JobCardLabourItem = apps.get_model('workshop', 'JobCardLabourItem')
+
+    date_field = BASIS_DATE_FIELD[basis]
+    group_fields = [date_field, 'delivered', 'payment_status', 'payment_method']
+
+    jc_filter = {'is_deleted': False, f'{date_field}__isnull': False}
+    if days is not None:
+        jc_filter[f'{date_field}__in'] = list(days)
+
+    buckets = {}
+
+    def bucket_for(row, prefix=''):
+        # NULL and '' payment methods share the '' bucket
+        key = (
+            basis,
+            row[prefix + date_field],
+            row[prefix + 'delivered'],
+            row[prefix + 'payment_status'],
+            row[prefix + 'payment_method'] or '',
+        )
+        if key not in buckets:
+            buckets[key] = _empty_metrics()
+        return buckets[key]
+
+    # QUERY 1: JobCard totals
+    jc_rows = JobCard.objects.filter(**jc_filter).values(*group_fields).annotate(
+        job_count=Count('id'),
+        discounted_jobs=Count('id', filter=Q(discount_amount__gt=0)),
+        revenue=_dec_sum('total_bill_amount'),
+        collected=_dec_sum('received_amount'),
+        discount=_dec_sum('discount_amount'),
+    ).order_by()
+    for row in jc_rows:
+        metrics = bucket_for(row)
+        for field in ('job_count', 'discounted_jobs', 'revenue', 'collected', 'discount'):
+            metrics[field] += row[field]
+
+    line_filter = {f'job_card__{k}': v for k, v in jc_filter.items()}
+    line_group = [f'job_card__{f}' for f in group_fields]
+
+    # QUERY 2: Spare lines (cost mirrors the dashboard's historical Sum('unit_price'))
+    spare_rows = JobCardSpareItem.objects.filter(**line_filter).values(*line_group).annotate(
+        spare_revenue=_dec_sum('total_price'),
+        spare_cost=_dec_sum('unit_price'),
+        spare_qty=_dec_sum('quantity'),
+    ).order_by()
+    for row in spare_rows:
+        metrics = bucket_for(row, 'job_card__')
+        for field in ('spare_revenue', 'spare_cost', 'spare_qty'):
+            metrics[field] += row[field]
+
+    # QUERY 3: Labour lines
+    labour_rows = JobCardLabourItem.objects.filter(**line_filter).values(*line_group).annotate(
+        labour_revenue=_dec_sum('amount'),
+    ).order_by()
+    for row in labour_rows:
+        bucket_for(row, 'job_card__')['labour_revenue'] += row['labour_revenue']
+
+    return buckets
+
+
+def _build_rows(DailyRollup, buckets):
+    rows = []
+    for (basis, day, delivered, status, method), metrics in buckets.items():
+        rows.append(DailyRollup(
+            basis=basis, day=as_date(day), delivered=delivered,
+            payment_status=status, payment_method=method, **metrics,
+        ))
+    return rows
+
+
+def refresh_rollups(admitted_days=(), discharged_days=(), apps=global_apps):
+    """
+    Recomputes the rollup buckets for the given admitted / discharged days.
+    Buckets that no longer have any job card are deleted; the rest are upserted.
+    """
+    DailyRollup = apps.get_model('workshop', 'DailyRollup')
+
+    with transaction.atomic():
+        for basis, days in ((ADMITTED, admitted_days), (DISCHARGED, discharged_days)):
+            days = {as_date(d) for d in days} - {None}
+            if not days:
+                continue
+
+            buckets = _collect(basis, days, apps=apps)
+            fresh_keys = {(b, as_date(d), dl, s, m) for (b, d, dl, s, m) in buckets}
+
+            # Drop buckets that emptied out (e.g. a status moved from PENDING to PAID)
+            stale_ids = [
+                pk for pk, *key in DailyRollup.objects.filter(basis=basis, day__in=days)
+                .values_list('id', *BUCKET_FIELDS)
+                if tuple(key) not in fresh_keys
+            ]
+            if stale_ids:
+                DailyRollup.objects.filter(id__in=stale_ids).delete()
+
+            if buckets:
+                DailyRollup.objects.bulk_create(
+                    _build_rows(DailyRollup, buckets),
+                    update_conflicts=True,
+                    unique_fields=BUCKET_FIELDS,
+                    update_fields=METRIC_FIELDS,
+                )
+
+
+def rebuild_rollups(apps=global_apps, batch_size=1000):
+    """
+    Drops and rebuilds the whole DailyRollup table from the source tables.
+    Returns the number of buckets written.
+    """
+    DailyRollup = apps.get_model('workshop', 'DailyRollup')
+
+    written = 0
+    with transaction.atomic():
+        DailyRollup.objects.all().delete()
+        for basis in (ADMITTED, DISCHARGED):
+            rows = _build_rows(DailyRollup, _collect(basis, apps=apps))
+            DailyRollup.objects.bulk_create(rows, batch_size=batch_size)
+            written += len(rows)
+    return written
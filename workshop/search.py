@@ -0,0 +1,196 @@
+"""
+workshop/search.py
+==================
+Indexed Job Card Search
+=======================
+
+The job card lists used to AND one `icontains` OR-chain per search word over
+up to seven columns (plus a JOIN to Mechanic): LIKE '%x%' scans that no index
+can serve, getting slower with every year of history.
+
+Every JobCard now carries `search_text`: one lowercased string with the
+registration, bill number, brand, model, customer name/contact and lead
+mechanic name. It is rebuilt on save when one of those changes (and for
+all of a mechanic's job cards when the mechanic is renamed). It is indexed
+per backend:
+
+  - SQLite:     FTS5 table `workshop_jobcard_fts` (trigram tokenizer, so
+                substrings like the last 4 digits of a registration still
+                match), kept in sync by triggers on workshop_jobcard.
+  - PostgreSQL: pg_trgm GIN index on search_text, which serves
+                `LIKE '%x%'` directly.
+
+Every list view searches through search_job_cards(queryset, q). Words shorter
+than a trigram (< 3 chars) — and any backend without an index — fall back
+to a LIKE on the single search_text column.
+
+Django's SQLite schema editor rebuilds workshop_jobcard for many migrations
+(AlterField, RemoveField, ...), which silently drops the FTS triggers: a
+post_migrate handler (ensure_search_index) recreates the index whenever a
+trigger or the table is missing.
+
+`python manage.py rebuild_search_index` backfills search_text and recreates
+the index (e.g. after restoring a database dump).
+"""
+
+from django.apps import apps as global_apps
+from django.db import connections, transaction, DatabaseError
+from django.db.models import OuterRef, Subquery, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Concat, Lower
+
+# JobCard columns copied into search_text (the lead mechanic's name is appended)
+SEARCH_SOURCE_FIELDS = (
+    'registration_number', 'bill_number', 'brand_name', 'model_name',
+    'customer_name', 'customer_contact',
+)
+
+FTS_TABLE = 'workshop_jobcard_fts'
+FTS_TRIGGERS = (f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au')
+TRGM_INDEX = 'workshop_jobcard_search_trgm'
+MIN_TRIGRAM_LENGTH = 3
+
+_fts_ready_cache = {}
+
+
+def build_search_text(job_card):
+    """search_text for an in-memory job card (mirrors search_text_expression)."""
+    mechanic_name = job_card.lead_mechanic.name if job_card.lead_mechanic_id else ''
+    values = [getattr(job_card, field) for field in SEARCH_SOURCE_FIELDS] + [mechanic_name]
+    return ' '.join(str(value or '') for value in values).lower()
+
+
+def search_text_expression(apps=global_apps):
+    """The same string as a SQL expression, for set-based backfills."""
+    Mechanic = apps.get_model('workshop', 'Mechanic')
+    mechanic_name = Subquery(
+        Mechanic.objects.filter(pk=OuterRef('lead_mechanic_id')).values('name')[:1],
+        output_field=TextField(),
+    )
+    parts = []
+    for field in SEARCH_SOURCE_FIELDS:
+        parts += [field, Value(' ')]
+    return Lower(Concat(*parts, mechanic_name, output_field=TextField()))
+
+
+# -----------------------------------------------------------------------------
+# Index management (used by the migration and rebuild_search_index)
+# -----------------------------------------------------------------------------
+def create_search_index(connection):
+    """
+    (Re)creates the backend's search index over workshop_jobcard.search_text.
+    Returns False when the backend has no suitable index (LIKE fallback).
+    """
+    _fts_ready_cache.pop(connection.alias, None)
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {TRGM_INDEX} '
+                f'ON workshop_jobcard USING gin (search_text gin_trgm_ops)'
+            )
+        return True
+
+    if connection.vendor != 'sqlite':
+        return False
+
+    drop_search_index(connection)
+    try:
+        # Savepoint: FTS5 / the trigram tokenizer (SQLite 3.34+) may be missing
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"search_text, content='workshop_jobcard', content_rowid='id', tokenize='trigram')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON workshop_jobcard BEGIN "
+                f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON workshop_jobcard BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) "
+                f"VALUES ('delete', old.id, old.search_text); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF search_text ON workshop_jobcard BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) "
+                f"VALUES ('delete', old.id, old.search_text); "
+                f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END"
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    except DatabaseError:
+        return False
+    return True
+
+
+def drop_search_index(connection):
+    _fts_ready_cache.pop(connection.alias, None)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {TRGM_INDEX}')
+        elif connection.vendor == 'sqlite':
+            for trigger in FTS_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def ensure_search_index(connection):
+    """
+    post_migrate: recreates the SQLite FTS index when its table or one of its
+    sync triggers is missing (a table rebuild by the migration dropped them).
+    Returns True when the index was recreated.
+    """
+    if connection.vendor != 'sqlite' or 'workshop_jobcard' not in connection.introspection.table_names():
+        return False
+    _fts_ready_cache.pop(connection.alias, None)
+    if _fts_ready(connection):
+        return False
+    return create_search_index(connection)
+
+
+def _fts_ready(connection):
+    """
+    True when the FTS5 table AND its sync triggers exist (otherwise search
+    falls back to LIKE). Checked once per process; ensure_search_index and
+    the index management functions reset the check.
+    """
+    if connection.alias not in _fts_ready_cache:
+        names = (FTS_TABLE,) + FTS_TRIGGERS
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(names))})",
+                names,
+            )
+            _fts_ready_cache[connection.alias] = cursor.fetchone()[0] == len(names)
+    return _fts_ready_cache[connection.alias]
+
+
+# -----------------------------------------------------------------------------
+# Shared search helper
+# -----------------------------------------------------------------------------
+def search_job_cards(queryset, q):
+    """
+    Filters a JobCard queryset (or a values()/annotate() queryset over
+    JobCard) to rows matching EVERY word of `q`, anywhere in search_text.
+    """
+    words = [word.lower() for word in q.split()]
+    if not words:
+        return queryset
+
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite' and _fts_ready(connection):
+        indexed = [word for word in words if len(word) >= MIN_TRIGRAM_LENGTH]
+        if indexed:
+            # Quoted phrases, implicitly ANDed: '"kl07" "swift"'
+            match = ' '.join('"%s"' % word.replace('"', '""') for word in indexed)
+            queryset = queryset.filter(pk__in=RawSQL(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]
+            ))
+        words = [word for word in words if len(word) < MIN_TRIGRAM_LENGTH]
+
+    # search_text is stored lowercased: a case-sensitive LIKE is enough
+    # (and is what the PostgreSQL trigram index serves)
+    for word in words:
+        queryset = queryset.filter(search_text__contains=word)
+    return queryset
@@ -0,0 +1,471 @@
+"""
+workshop/seeding.py
+===================
+Synthetic Workshop History at Scale
+===================================
+
+The models and docs talk about "1M+ records" and sub-50ms dashboards, but
+nothing could produce that volume to check it. `python manage.py seed_scale`
+builds a realistic history of any size:
+
+  - job cards spread evenly over `days` of history, bill numbers issued in
+    admission order (continuing each year's BillNumberSequence), with
+    concerns, spares (a few unassigned), labour and payment states
+  - bulk payers holding some of the delivered cards
+  - spare shops with payments, supplier shops with restock bills and
+    payments (stock goes through the StockMovement ledger), and cashbook
+    entries for every day
+
+Rows are written with bulk_create, one transaction per chunk of job cards.
+save() and the signals are bypassed, so denormalized columns (totals,
+search_text) are filled in directly and the derived data — shop / supplier
+totals, bulk payer balances, daily rollups, the search index — is rebuilt
+once at the end. Master rows (mechanics, brands, shops, payers, items) are
+matched by name, so seeding twice appends history instead of duplicating them.
+
+The same seed and end date always produce the same rows.
+"""
+
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+
+from inventory.models import (
+    Category, Item, SupplierPayment, SupplierRestockBill, SupplierRestockItem, SupplierShop,
+)
+from inventory.stock import apply_stock_movements
+from .analysis_cache import bump_zone_cache_version
+from .autocomplete_index import BUILDERS, invalidate_autocomplete
+from .bulk_balances import refresh_bulk_payer_balances
+from .models import (
+    BillNumberSequence, BulkPayer, CarBrand, CarModel, CashbookEntry, JobCard,
+    JobCardConcern, JobCardLabourItem, JobCardSpareItem, Mechanic, SparePart,
+    SpareShop, SpareShopPayment, max_bill_suffix,
+)
+from .rollups import rebuild_rollups
+from .search import build_search_text, create_search_index, drop_search_index
+
+# -----------------------------------------------------------------------------
+# Vocabulary
+# -----------------------------------------------------------------------------
+VEHICLES = {
+    'Maruti Suzuki': ['Swift', 'Baleno', 'Dzire', 'Ertiga', 'Brezza', 'Alto 800', 'Wagon R'],
+    'Hyundai': ['i20', 'Creta', 'Venue', 'Verna', 'Grand i10'],
+    'Tata': ['Nexon', 'Punch', 'Tiago', 'Harrier'],
+    'Mahindra': ['XUV700', 'Scorpio', 'Thar', 'Bolero'],
+    'Toyota': ['Innova Crysta', 'Fortuner', 'Glanza', 'Etios'],
+    'Honda': ['City', 'Amaze', 'Jazz'],
+    'Kia': ['Seltos', 'Sonet', 'Carens'],
+}
+FIRST_NAMES = [
+    'Anil', 'Biju', 'Fathima', 'Rahul', 'Sreeja', 'Mohammed', 'Arjun', 'Nisha',
+    'Joseph', 'Lakshmi', 'Shibu', 'Aswathy', 'Rajeev', 'Divya', 'Noufal', 'Tessa',
+]
+LAST_NAMES = ['Kumar', 'Nair', 'Thomas', 'Varghese', 'Menon', 'Pillai', 'Abdulla', 'George', 'Das', 'Joseph']
+MECHANICS = ['Rajesh', 'Suresh', 'Manoj', 'Shameer', 'Vinod', 'Anoop', 'Jijo', 'Faisal', 'Prasad', 'Sanju']
+TOWNS = ['Kochi', 'Aluva', 'Thrissur', 'Kottayam', 'Kozhikode', 'Palakkad', 'Kollam', 'Kannur']
+COLORS = [value for value, _ in JobCard.COLOR_CHOICES if value != 'Other']
+PAYMENT_METHODS = [value for value, _ in JobCard.PAYMENT_METHOD_CHOICES]
+
+CONCERNS = [
+    'Sound when applying brake', 'AC not cooling', 'Engine check light on',
+    'Steering vibration at speed', 'Periodic service', 'Clutch slipping',
+    'Battery not charging', 'Oil leak under engine', 'Pulling to one side',
+    'Headlight not working', 'Suspension noise over bumps', 'Gear shifting hard',
+]
+# (name, inventory category, shop cost range in ₹)
+SPARES = [
+    ('Brake Pad Set', 'Brakes', 900, 3200), ('Brake Disc', 'Brakes', 1800, 5200),
+    ('Engine Oil 5W30', 'Lubricants', 450, 900), ('Coolant', 'Lubricants', 300, 650),
+    ('Oil Filter', 'Filters', 180, 650), ('Air Filter', 'Filters', 250, 900),
+    ('Cabin Filter', 'Filters', 300, 800), ('Clutch Plate', 'Transmission', 2500, 7500),
+    ('Drive Belt', 'Transmission', 600, 2200), ('Battery 12V', 'Electrical', 4200, 9500),
+    ('Spark Plug', 'Electrical', 150, 600), ('Headlight Bulb', 'Electrical', 200, 900),
+    ('Shock Absorber', 'Suspension', 1800, 6500), ('Tie Rod End', 'Suspension', 700, 2400),
+    ('Wiper Blade', 'Consumables', 250, 700), ('AC Gas Refill', 'Consumables', 1200, 2800),
+]
+LABOUR = [
+    ('General service', 800, 2500), ('Brake service', 500, 1500), ('Clutch overhaul', 2500, 6000),
+    ('AC service', 800, 2000), ('Wheel alignment & balancing', 600, 1200),
+    ('Electrical diagnosis', 400, 1500), ('Suspension work', 1200, 4000),
+    ('Denting & painting', 3000, 15000),
+]
+# (entry_type, category, amount range in ₹)
+CASHBOOK = [
+    ('EXPENSE', 'Electricity', 1500, 6000), ('EXPENSE', 'Staff Tea & Snacks', 80, 400),
+    ('EXPENSE', 'Rent', 15000, 30000), ('EXPENSE', 'Consumables', 200, 2500),
+    ('EXPENSE', 'Salary Advance', 1000, 5000), ('INCOME', 'Scrap Sale', 300, 4000),
+    ('INCOME', 'Towing Charges', 500, 2500),
+]
+
+UNASSIGNED_SPARE_RATE = 0.005   # spares left without a job card (original_vehicle_info kept)
+REPEAT_VEHICLE_RATE = 0.3       # cards for a car seen before (car profiles)
+VEHICLE_POOL_SIZE = 20000
+
+
+def _rupees(low, high, rng, step=10):
+    return Decimal(rng.randrange(low // step, high // step + 1) * step)
+
+
+class ScaleSeeder:
+    """
+    Generates `cards` job cards (plus everything around them) ending on
+    `until`. `log` receives one progress line per chunk.
+    """
+
+    def __init__(self, cards, seed, until, days=1095, chunk_size=5000, log=print):
+        self.cards = cards
+        self.rng = random.Random(seed)
+        self.until = until
+        self.start = until - timedelta(days=days - 1)
+        self.days = days
+        self.chunk_size = chunk_size
+        self.log = log
+
+        self.bill_counters = {}
+        self.vehicles = []
+        self.shop_costs = {}
+        self.payer_members = []
+        self.counts = {}
+
+    # -------------------------------------------------------------------------
+    # Entry point
+    # -------------------------------------------------------------------------
+    def run(self):
+        """Seeds everything and rebuilds the derived data. Returns {model label: rows created}."""
+        self._load_masters()
+
+        # The FTS5 triggers would fire per inserted row; one 'rebuild' at the end is far cheaper
+        indexed = connection.vendor == 'sqlite'
+        if indexed:
+            drop_search_index(connection)
+
+        try:
+            self._seed_rows()
+        except BaseException:
+            # Failed chunk or Ctrl-C: never leave the index dropped — web processes
+            # that already found it would fail every job card search until restarted
+            if indexed:
+                create_search_index(connection)
+            raise
+
+        self.log('  Rebuilding totals, balances, rollups and the search index...')
+        self._rebuild_derived(indexed)
+        return self.counts
+
+    def _seed_rows(self):
+        started = time.monotonic()
+        for offset in range(0, self.cards, self.chunk_size):
+            size = min(self.chunk_size, self.cards - offset)
+            with transaction.atomic():
+                self._seed_job_cards(offset, size)
+            done = offset + size
+            rate = done / max(time.monotonic() - started, 1e-6)
+            self.log(f'  {done}/{self.cards} job cards ({rate:,.0f}/s)')
+
+        with transaction.atomic():
+            self._seed_bulk_payers()
+            self._seed_shop_payments()
+            self._seed_suppliers()
+            self._seed_cashbook()
+
+    def _created(self, model, rows, **kwargs):
+        created = model.objects.bulk_create(rows, **kwargs)
+        self.counts[model._meta.label] = self.counts.get(model._meta.label, 0) + len(rows)
+        return created
+
+    # -------------------------------------------------------------------------
+    # Master lists (matched by name)
+    # -------------------------------------------------------------------------
+    def _load_masters(self):
+        rng = self.rng
+        self.mechanics = [Mechanic.objects.get_or_create(name=name)[0] for name in MECHANICS]
+
+        for brand_name, models in VEHICLES.items():
+            brand = CarBrand.objects.get_or_create(name=brand_name)[0]
+            for model_name in models:
+                CarModel.objects.get_or_create(brand=brand, name=model_name)
+        for name, *_ in SPARES:
+            SparePart.objects.get_or_create(name=name)
+
+        shop_count = min(max(5, self.cards // 2000), 500)
+        self.spare_shops = [
+            SpareShop.objects.get_or_create(
+                name=f'{TOWNS[i % len(TOWNS)]} Auto Spares #{i + 1}',
+                defaults={'phone': f'+91 9{rng.randrange(10 ** 8, 10 ** 9)}'},
+            )[0]
+            for i in range(shop_count)
+        ]
+
+        payer_count = min(max(5, self.cards // 2000), 2000)
+        self.bulk_payers = [
+            BulkPayer.objects.get_or_create(customer_name=f'{TOWNS[i % len(TOWNS)]} Fleet #{i + 1}')[0]
+            for i in range(payer_count)
+        ]
+
+        supplier_count = min(max(3, self.cards // 10000), 200)
+        self.suppliers = [
+            SupplierShop.objects.get_or_create(name=f'{TOWNS[i % len(TOWNS)]} Parts Distributors #{i + 1}')[0]
+            for i in range(supplier_count)
+        ]
+
+        categories = {}
+        self.items = []
+        for name, category_name, low, high in SPARES:
+            if category_name not in categories:
+                categories[category_name] = Category.objects.get_or_create(name=category_name)[0]
+            item, _ = Item.objects.get_or_create(
+                category=categories[category_name], name=name, defaults={'average_stock': 10},
+            )
+            self.items.append((item, low, high))
+
+    # -------------------------------------------------------------------------
+    # Job cards
+    # -------------------------------------------------------------------------
+    def _next_bill_number(self, year):
+        if year not in self.bill_counters:
+            seq = BillNumberSequence.objects.filter(year=year).first()
+            self.bill_counters[year] = max(seq.last_number if seq else 0, max_bill_suffix(JobCard, year))
+        self.bill_counters[year] += 1
+        return f'JB-{str(year)[2:]}-{str(self.bill_counters[year]).zfill(3)}'
+
+    def _vehicle(self):
+        rng = self.rng
+        if self.vehicles and rng.random() < REPEAT_VEHICLE_RATE:
+            return rng.choice(self.vehicles)
+
+        brand = rng.choice(list(VEHICLES))
+        letters = ''.join(rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ') for _ in range(2))
+        vehicle = (
+            f'KL-{rng.randint(1, 86):02d}-{letters}-{rng.randint(1, 9999):04d}',
+            brand, rng.choice(VEHICLES[brand]), rng.choice(COLORS),
+            f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            f'+91 {rng.randint(6, 9)}{rng.randrange(10 ** 9):09d}',
+        )
+        if len(self.vehicles) < VEHICLE_POOL_SIZE:
+            self.vehicles.append(vehicle)
+        else:
+            self.vehicles[rng.randrange(VEHICLE_POOL_SIZE)] = vehicle
+        return vehicle
+
+    def _job_card(self, index):
+        """One job card with its line items: (card, concerns, spares, labours)."""
+        rng = self.rng
+        admitted = self.start + timedelta(days=index * self.days // self.cards)
+        age = (self.until - admitted).days
+        discharged = admitted + timedelta(days=rng.randint(0, 4))
+        delivered = discharged <= self.until and rng.random() < (0.97 if age > 7 else 0.4)
+
+        registration, brand, model, color, customer, contact = self._vehicle()
+        card = JobCard(
+            bill_number=self._next_bill_number(admitted.year),
+            admitted_date=admitted,
+            discharged_date=discharged if delivered else None,
+            delivered=delivered,
+            on_hold=not delivered and rng.random() < 0.1,
+            is_deleted=rng.random() < 0.01,
+            brand_name=brand, model_name=model, registration_number=registration,
+            mileage=str(rng.randrange(5000, 180000, 500)),
+            car_color=color, customer_name=customer, customer_contact=contact,
+            lead_mechanic=rng.choice(self.mechanics),
+        )
+        card.search_text = build_search_text(card)
+
+        concerns = [
+            JobCardConcern(
+                concern_text=text,
+                status='FIXED' if delivered else rng.choice(('PENDING', 'WORKING', 'FIXED')),
+            )
+            for text in rng.sample(CONCERNS, rng.randint(1, 3))
+        ]
+
+        spares, spare_total = [], Decimal('0')
+        for name, _, low, high in rng.sample(SPARES, rng.randint(0, 4)):
+            status = 'RECEIVED' if delivered else rng.choice(('PENDING', 'ORDERED', 'RECEIVED'))
+            quantity = Decimal(rng.choice((1, 1, 1, 2, 4)))
+            unit_price = _rupees(low, high, rng)
+            spare = JobCardSpareItem(
+                spare_part_name=name, status=status, quantity=quantity, unit_price=unit_price,
+                total_price=(unit_price * quantity * Decimal(rng.choice(('1.15', '1.2', '1.25', '1.3')))).quantize(Decimal('1')),
+            )
+            if status != 'PENDING':
+                shop = rng.choice(self.spare_shops)
+                spare.shop, spare.shop_name, spare.ordered_date = shop, shop.name[:100], admitted
+                if status == 'RECEIVED':
+                    spare.received_date = min(admitted + timedelta(days=rng.randint(0, 2)), self.until)
+                self.shop_costs[shop.pk] = self.shop_costs.get(shop.pk, Decimal('0')) + unit_price * quantity
+            if rng.random() < UNASSIGNED_SPARE_RATE:
+                spare.original_vehicle_info = f'{registration} - {brand} {model}'
+            else:
+                spare_total += spare.total_price
+            spares.append(spare)
+
+        labours = [
+            JobCardLabourItem(job_description=description, amount=_rupees(low, high, rng))
+            for description, low, high in rng.sample(LABOUR, rng.randint(1, 3))
+        ]
+
+        total = spare_total + sum(labour.amount for labour in labours)
+        card.total_bill_amount = total
+        self._settle(card, total)
+        return card, concerns, spares, labours
+
+    def _settle(self, card, total):
+        """Payment state, mirroring the billing and bulk pay views."""
+        rng = self.rng
+        roll = rng.random()
+        if not card.delivered:
+            if roll < 0.2:
+                card.payment_status, card.payment_method = 'PARTIAL', rng.choice(PAYMENT_METHODS)
+                card.received_amount = (total * Decimal('0.3')).quantize(Decimal('1'))
+            return
+
+        if roll < 0.78:
+            discount = min(total, rng.choice((Decimal('0'),) * 4 + (Decimal('50'), Decimal('100'), Decimal('200'))))
+            card.payment_status, card.received_amount, card.discount_amount = 'PAID', total - discount, discount
+        elif roll < 0.88:
+            card.payment_status = 'PARTIAL'
+            card.received_amount = (total * Decimal(rng.choice(('0.3', '0.5', '0.8')))).quantize(Decimal('1'))
+        elif roll < 0.95:
+            card.payment_status = 'PENDING'
+        else:
+            card.payment_status, card.received_amount = 'BULK_PAID', total
+        if card.payment_status != 'PENDING':
+            card.payment_method = rng.choice(PAYMENT_METHODS)
+
+    def _seed_job_cards(self, offset, size):
+        built = [self._job_card(index) for index in range(offset, offset + size)]
+        cards = self._created(JobCard, [card for card, *_ in built])
+
+        concerns, spares, labours = [], [], []
+        for card, card_concerns, card_spares, card_labours in built:
+            for concern in card_concerns:
+                concern.job_card = card
+            for spare in card_spares:
+                if not spare.original_vehicle_info:
+                    spare.job_card = card
+            for labour in card_labours:
+                labour.job_card = card
+            concerns += card_concerns
+            spares += card_spares
+            labours += card_labours
+
+            if card.payment_status == 'BULK_PAID' or (
+                card.delivered and card.payment_status != 'PAID' and self.rng.random() < 0.35
+            ):
+                self.payer_members.append((self.rng.choice(self.bulk_payers).pk, card.pk))
+
+        self._created(JobCardConcern, concerns)
+        self._created(JobCardSpareItem, spares)
+        self._created(JobCardLabourItem, labours)
+
+        # Keep the per-year counters in step, so the app continues after the seeded bills
+        for year in {card.admitted_date.year for card in cards}:
+            BillNumberSequence.objects.update_or_create(year=year, defaults={'last_number': self.bill_counters[year]})
+
+    # -------------------------------------------------------------------------
+    # Everything around the job cards
+    # -------------------------------------------------------------------------
+    def _seed_bulk_payers(self):
+        Membership = BulkPayer.job_cards.through
+        self._created(
+            Membership,
+            [Membership(bulkpayer_id=payer_id, jobcard_id=card_id) for payer_id, card_id in self.payer_members],
+            batch_size=5000,
+        )
+
+    def _seed_shop_payments(self):
+        """A few lump sums per spare shop covering most (not all) of what it supplied."""
+        rng = self.rng
+        payments = []
+        for shop in self.spare_shops:
+            owed = self.shop_costs.get(shop.pk, Decimal('0')) * Decimal(rng.choice(('0.6', '0.75', '0.85', '0.95')))
+            instalments = rng.randint(1, 12)
+            for _ in range(instalments):
+                amount = (owed / instalments).quantize(Decimal('1'))
+                if amount > 0:
+                    payments.append(SpareShopPayment(
+                        shop=shop, amount=amount, payment_method=rng.choice(PAYMENT_METHODS), note='Lump-sum payment',
+                    ))
+        self._created(SpareShopPayment, payments, batch_size=5000)
+
+    def _seed_suppliers(self):
+        """Restock bills (one every few days per supplier), their lines, stock movements and payments."""
+        rng = self.rng
+        bill_count = max(10, self.cards // 25)
+        bills, lines = [], []
+        for index in range(bill_count):
+            supplier = rng.choice(self.suppliers)
+            bill_lines = []
+            for item, low, high in rng.sample(self.items, rng.randint(1, 6)):
+                quantity = rng.choice((2, 5, 10, 20, 40))
+                bill_lines.append(SupplierRestockItem(
+                    item=item, quantity=quantity, total_price=_rupees(low, high, rng) * quantity,
+                ))
+            total = sum(line.total_price for line in bill_lines)
+            bills.append(SupplierRestockBill(
+                supplier=supplier, bill_date=self.start + timedelta(days=index * self.days // bill_count),
+                total_amount=total, discount_amount=rng.choice((Decimal('0'), Decimal('0'), (total * Decimal('0.02')).quantize(Decimal('1')))),
+            ))
+            lines.append(bill_lines)
+
+        billed = {}
+        for bill, bill_lines in zip(self._created(SupplierRestockBill, bills, batch_size=5000), lines):
+            for line in bill_lines:
+                line.bill = bill
+            billed[bill.supplier_id] = billed.get(bill.supplier_id, Decimal('0')) + bill.get_effective_amount
+
+        restocked = self._created(SupplierRestockItem, [line for bill_lines in lines for line in bill_lines], batch_size=5000)
+        apply_stock_movements({
+            (('pk', line.item_id), 'RESTOCK', line.pk): float(line.quantity) for line in restocked
+        })
+
+        payments = []
+        for supplier in self.suppliers:
+            owed = billed.get(supplier.pk, Decimal('0')) * Decimal(rng.choice(('0.7', '0.85', '0.95')))
+            instalments = rng.randint(1, 24)
+            for index in range(instalments):
+                amount = (owed / instalments).quantize(Decimal('1'))
+                if amount > 0:
+                    payments.append(SupplierPayment(
+                        supplier=supplier, amount=amount, payment_method=rng.choice(PAYMENT_METHODS),
+                        date=self.start + timedelta(days=(index + 1) * (self.days - 1) // instalments),
+                    ))
+        self._created(SupplierPayment, payments, batch_size=5000)
+
+    def _seed_cashbook(self):
+        rng = self.rng
+        per_day = 1 + self.cards // (self.days * 5)
+        entries = []
+        for offset in range(self.days):
+            day = self.start + timedelta(days=offset)
+            for _ in range(rng.randint(1, per_day)):
+                entry_type, category, low, high = rng.choice(CASHBOOK)
+                entries.append(CashbookEntry(
+                    entry_type=entry_type, category=category, amount=_rupees(low, high, rng),
+                    payment_method=rng.choice(PAYMENT_METHODS), date=day,
+                ))
+            if len(entries) >= 5000:
+                self._created(CashbookEntry, entries)
+                entries = []
+        self._created(CashbookEntry, entries)
+
+    # -------------------------------------------------------------------------
+    # Derived data (one pass, instead of the per-row signals)
+    # -------------------------------------------------------------------------
+    def _rebuild_derived(self, indexed):
+        with transaction.atomic():
+            for shop in self.spare_shops:
+                shop.update_totals()
+            for supplier in self.suppliers:
+                supplier.update_totals()
+            refresh_bulk_payer_balances([payer.pk for payer in self.bulk_payers])
+            rebuild_rollups()
+            if indexed:
+                create_search_index(connection)
+
+        bump_zone_cache_version()
+        invalidate_autocomplete(*BUILDERS)
@@ -0,0 +1,132 @@
+"""
+workshop/session_activity.py
+============================
+Write-Behind Buffer for Session Activity
+========================================
+
+SessionTrackingMiddleware used to SELECT the UserSession row on every
+authenticated request, plus an update_or_create once the 5-minute cooldown
+had passed: session bookkeeping on every page view's latency.
+
+Now each process keeps last-seen activity in memory, keyed by session key:
+
+  - first sight of a session in this process → written immediately
+    (update_or_create), so new logins show up on the HQ monitor at once
+  - every later request → an in-memory update only, no query
+  - the buffer is flushed in bulk (ONE SELECT + ONE bulk_update) when
+    SESSION_ACTIVITY_FLUSH_INTERVAL has passed or SESSION_ACTIVITY_FLUSH_THRESHOLD
+    sessions are pending, at the end of the request that notices it
+
+Rows deleted meanwhile (logout, remote termination, cleanup) are not
+recreated by a flush. The set of sessions known to the process is an LRU
+capped at SESSION_ACTIVITY_KNOWN_LIMIT keys: a long-running worker does not
+grow without bound, and an evicted session costs one update_or_create on
+its next request. The "Active Now" dashboard overlays
+buffered_activity() on the stored rows, so it is never behind this process.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import UserSession
+
+_lock = threading.Lock()
+_known = OrderedDict()  # LRU of session keys with a UserSession row written by this process
+_pending = {}       # session key → {'ip_address', 'user_agent', 'last_activity'}
+_last_flush = time.monotonic()
+
+
+def _flush_interval():
+    return getattr(settings, 'SESSION_ACTIVITY_FLUSH_INTERVAL', 60 * 5)
+
+
+def _flush_threshold():
+    return getattr(settings, 'SESSION_ACTIVITY_FLUSH_THRESHOLD', 200)
+
+
+def _known_limit():
+    return getattr(settings, 'SESSION_ACTIVITY_KNOWN_LIMIT', 5000)
+
+
+def record_activity(session_key, user, ip_address, user_agent, now):
+    """Notes a request for `session_key`; writes only for a session new to this process."""
+    activity = {'ip_address': ip_address, 'user_agent': user_agent, 'last_activity': now}
+
+    with _lock:
+        known = session_key in _known
+        if known:
+            _known.move_to_end(session_key)
+            _pending[session_key] = activity
+
+    if not known:
+        UserSession.objects.update_or_create(session_key=session_key, defaults={'user': user, **activity})
+        with _lock:
+            _known[session_key] = None
+            while len(_known) > _known_limit():
+                _known.popitem(last=False)
+
+    if flush_due():
+        flush_session_activity()
+
+
+def flush_due():
+    with _lock:
+        return bool(_pending) and (
+            len(_pending) >= _flush_threshold() or time.monotonic() - _last_flush >= _flush_interval()
+        )
+
+
+def flush_session_activity():
+    """Writes the buffered activity in bulk. Returns the number of rows updated."""
+    global _last_flush
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return 0
+
+    rows = list(UserSession.objects.filter(session_key__in=pending).only('pk', 'session_key'))
+    for row in rows:
+        for field, value in pending[row.session_key].items():
+            setattr(row, field, value)
+    UserSession.objects.bulk_update(rows, ['ip_address', 'user_agent', 'last_activity'], batch_size=500)
+
+    # Rows that are gone were revoked: stop tracking them
+    missing = set(pending) - {row.session_key for row in rows}
+    if missing:
+        with _lock:
+            for session_key in missing:
+                _known.pop(session_key, None)
+    return len(rows)
+
+
+def forget_session(session_key):
+    """Drops a revoked / logged-out session from the buffer."""
+    with _lock:
+        _known.pop(session_key, None)
+        _pending.pop(session_key, None)
+
+
+def buffered_activity():
+    """{session key: last_activity} not yet flushed by this process."""
+    with _lock:
+        return {key: activity['last_activity'] for key, activity in _pending.items()}
+
+
+def merge_buffered_activity(sessions):
+    """
+    UserSession rows with this process's buffered last_activity applied,
+    most recently active first (for the HQ "Active Now" monitor).
+    """
+    buffered = buffered_activity()
+    sessions = list(sessions)
+    for session in sessions:
+        last_seen = buffered.get(session.session_key)
+        if last_seen is not None and last_seen > session.last_activity:
+            session.last_activity = last_seen
+    sessions.sort(key=lambda session: session.last_activity, reverse=True)
+    return sessions
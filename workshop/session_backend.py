@@ -0,0 +1,77 @@
+"""
+workshop/session_backend.py
+===========================
+Cache-Backed Sessions with Lazy Persistence
+===========================================
+
+With SESSION_SAVE_EVERY_REQUEST (sliding 40-day expiry), the default DB
+session engine rewrites the django_session row on EVERY request — a write
+that serializes every other writer on SQLite.
+
+This engine (SESSION_MODE=cache → SESSION_ENGINE='workshop.session_backend')
+keeps sessions in the cache, like Django's cached_db, but only writes the
+database when it matters:
+
+  - session created / key cycled (login)            → DB write
+  - session data changed (request.session modified) → DB write
+  - logout / flush / remote revoke                  → row + cache entry deleted
+  - otherwise, at most once per SESSION_PERSIST_INTERVAL (expiry refresh);
+    requests in between only refresh the cache entry
+
+Remote revoke (manage_terminate_session) deletes through the configured
+engine, so the cached copy goes too. A per-process cache (LocMemCache) only
+loses the copy of the process that handled the revoke, so there every
+request loads the session from its django_session row (a read — writes stay
+lazy): a revoke ends the session immediately with either kind of cache.
+
+`python manage.py bench_sessions` compares session writes per request for
+both modes.
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db, db
+from django.core.cache.backends.locmem import LocMemCache
+from django.contrib.sessions.backends.base import UpdateError
+
+KEY_PREFIX = 'workshop.session_backend'
+
+
+class SessionStore(cached_db.SessionStore):
+    cache_key_prefix = KEY_PREFIX
+
+    @property
+    def persisted_key(self):
+        return f'{self.cache_key}:persisted'
+
+    def load(self):
+        if isinstance(self._cache, LocMemCache):
+            # Other workers' revokes never reach this process's cache: the row decides
+            return db.SessionStore.load(self)
+        return super().load()
+
+    def _persist_due(self):
+        persisted_at = self._cache.get(self.persisted_key)
+        interval = getattr(settings, 'SESSION_PERSIST_INTERVAL', 60 * 15)
+        return persisted_at is None or time.time() - persisted_at >= interval
+
+    def save(self, must_create=False):
+        if must_create or self.session_key is None or self.modified or self._persist_due():
+            try:
+                super().save(must_create=must_create)
+            except UpdateError:
+                # The row was deleted (revoked / expired): drop the cached copy too
+                self._cache.delete(self.cache_key)
+                raise
+            self._cache.set(self.persisted_key, time.time(), self.get_expiry_age())
+            return
+
+        # Unchanged since the last persist: refresh the cached copy's expiry only
+        self._cache.set(self.cache_key, self._session, self.get_expiry_age())
+
+    def delete(self, session_key=None):
+        key = session_key or self.session_key
+        super().delete(session_key)
+        if key:
+            self._cache.delete(f'{self.cache_key_prefix}{key}:persisted')
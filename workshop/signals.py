@@ -0,0 +1,113 @@
+# workshop/signals.py
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.contrib.auth.models import Group, User
+from django.dispatch import receiver
+from .analysis_cache import invalidate_zone_cache
+from .autocomplete_index import invalidate_autocomplete_index
+from .bulk_balances import refresh_bulk_payer_balances, refresh_for_job_cards, payer_ids_for_job_cards
+from .rollups import JOB_CARD_SOURCE_FIELDS
+from .roles import invalidate_roles_on_group_change, invalidate_roles_on_membership, invalidate_roles_on_user_created
+from .search import search_text_expression
+from .models import (
+    JobCard, JobCardSpareItem, JobCardLabourItem, CashbookEntry,
+    SpareShop, SpareShopPayment, Mechanic,
+    CarBrand, CarModel, SparePart, ConcernSolution, BulkPayer,
+)
+
+
+@receiver(pre_save, sender=JobCard)
+def track_old_rollup_days(sender, instance, **kwargs):
+    """
+    Snapshots the dates a job card was bucketed under before the save.
+    If admitted_date / discharged_date change, the OLD day buckets must be
+    refreshed as well, otherwise they keep counting this job card.
+    Read from the load-time snapshot (FieldSnapshotMixin), no extra query.
+    """
+    instance._old_rollup_days = ()
+    if instance.get_original('admitted_date') is not None:
+        instance._old_rollup_days = (
+            instance.get_original('admitted_date'), instance.get_original('discharged_date'),
+        )
+
+
+@receiver(post_save, sender=JobCard)
+def refresh_rollups_on_save(sender, instance, raw=False, **kwargs):
+    """Keeps DailyRollup in sync with the saved job card (status, amounts, dates)."""
+    if raw:
+        return
+    # e.g. on_hold / mechanic / contact edits: no bucket changes
+    if not kwargs.get('created') and not instance.has_changed(*JOB_CARD_SOURCE_FIELDS):
+        return
+    instance.refresh_rollups(*getattr(instance, '_old_rollup_days', ()))
+
+
+@receiver(post_delete, sender=JobCard)
+def refresh_rollups_on_delete(sender, instance, **kwargs):
+    """Removes a hard-deleted job card from its day buckets."""
+    instance.refresh_rollups()
+
+
+# -----------------------------------------------------------------------------
+# BulkPayer denormalized balances (see workshop/bulk_balances.py)
+# -----------------------------------------------------------------------------
+@receiver(post_save, sender=JobCard)
+def refresh_bulk_payers_on_save(sender, instance, created, raw=False, **kwargs):
+    """A member card's total, received amount or status moved its payers' balances."""
+    if created or raw:
+        return
+    if instance.has_changed('total_bill_amount', 'received_amount', 'payment_status'):
+        refresh_for_job_cards([instance.pk])
+
+
+@receiver(pre_delete, sender=JobCard)
+def track_bulk_payers_on_delete(sender, instance, **kwargs):
+    # The M2M rows are gone by post_delete
+    instance._bulk_payer_ids = payer_ids_for_job_cards([instance.pk])
+
+
+@receiver(post_delete, sender=JobCard)
+def refresh_bulk_payers_on_delete(sender, instance, **kwargs):
+    refresh_bulk_payer_balances(getattr(instance, '_bulk_payer_ids', ()))
+
+
+@receiver(m2m_changed, sender=BulkPayer.job_cards.through)
+def refresh_bulk_payers_on_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    """Cards added to / removed from a payer (from either side of the relation)."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_bulk_payer_balances([instance.pk])
+        return
+
+    # instance is a JobCard; pk_set holds payer ids
+    if action == 'pre_clear':
+        instance._bulk_payer_ids = payer_ids_for_job_cards([instance.pk])
+    elif action == 'post_clear':
+        refresh_bulk_payer_balances(getattr(instance, '_bulk_payer_ids', ()))
+    elif action in ('post_add', 'post_remove'):
+        refresh_bulk_payer_balances(pk_set or ())
+
+
+@receiver(post_save, sender=Mechanic)
+def refresh_search_text_on_mechanic_save(sender, instance, created, raw=False, **kwargs):
+    """A renamed mechanic is searchable under the new name: ONE UPDATE over their job cards."""
+    if created or raw:
+        return
+    JobCard.objects.filter(lead_mechanic=instance).update(search_text=search_text_expression())
+
+
+# Every workshop model an analysis zone reads from invalidates the zone cache
+for _model in (JobCard, JobCardSpareItem, JobCardLabourItem, CashbookEntry,
+               SpareShop, SpareShopPayment, Mechanic):
+    post_save.connect(invalidate_zone_cache, sender=_model, dispatch_uid=f'zone_cache_save_{_model.__name__}')
+    post_delete.connect(invalidate_zone_cache, sender=_model, dispatch_uid=f'zone_cache_delete_{_model.__name__}')
+
+# Master lists behind the in-memory autocomplete index
+for _model in (CarBrand, CarModel, SparePart, ConcernSolution):
+    post_save.connect(invalidate_autocomplete_index, sender=_model, dispatch_uid=f'autocomplete_save_{_model.__name__}')
+    post_delete.connect(invalidate_autocomplete_index, sender=_model, dispatch_uid=f'autocomplete_delete_{_model.__name__}')
+
+# Cached user roles (see workshop/roles.py)
+m2m_changed.connect(invalidate_roles_on_membership, sender=User.groups.through, dispatch_uid='user_roles_membership')
+post_save.connect(invalidate_roles_on_user_created, sender=User, dispatch_uid='user_roles_user_created')
+post_save.connect(invalidate_roles_on_group_change, sender=Group, dispatch_uid='user_roles_group_save')
+post_delete.connect(invalidate_roles_on_group_change, sender=Group, dispatch_uid='user_roles_group_delete')
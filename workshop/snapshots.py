@@ -0,0 +1,87 @@
+"""
+workshop/snapshots.py
+=====================
+Loaded-Value Snapshots for Change-Tracking Signals
+===================================================
+
+The stock and rollup signals need the *previous* value of a few fields
+(quantity, part name, is_deleted, dates). They used to re-read the row in
+pre_save — one extra SELECT per save, on the hottest write paths (formsets,
+bulk pay cascades).
+
+FieldSnapshotMixin records `snapshot_fields` when the instance is loaded
+(from_db) and again after every save / refresh_from_db, so the previous
+values are already in memory:
+
+    class JobCardSpareItem(FieldSnapshotMixin, models.Model):
+        snapshot_fields = ('spare_part_name', 'quantity')
+
+    spare.get_original('quantity')              # value as stored in the DB
+    spare.has_changed('quantity', 'spare_part_name')
+
+An instance that was never loaded (built with an explicit pk) or that was
+loaded with the field deferred falls back to ONE query, as before.
+"""
+
+
+class FieldSnapshotMixin:
+    """Keeps the last loaded/saved value of `snapshot_fields` on the instance."""
+
+    snapshot_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._take_snapshot()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._take_snapshot(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._take_snapshot(fields)
+
+    def _take_snapshot(self, fields=None):
+        """Records the current value of the snapshot fields (deferred ones are skipped)."""
+        snapshot = self.__dict__.setdefault('_snapshot', {})
+        for name in self.snapshot_fields:
+            attname = self._meta.get_field(name).attname
+            if fields is not None and name not in fields and attname not in fields:
+                continue
+            if attname in self.__dict__:
+                snapshot[name] = self.__dict__[attname]
+
+    def _load_snapshot(self):
+        """Fallback for instances without a snapshot: ONE query for all snapshot fields."""
+        snapshot = self.__dict__.setdefault('_snapshot', {})
+        attnames = [self._meta.get_field(name).attname for name in self.snapshot_fields]
+        row = type(self)._base_manager.filter(pk=self.pk).values_list(*attnames).first()
+        if row is None:
+            return False
+        snapshot.update(zip(self.snapshot_fields, row))
+        return True
+
+    def get_original(self, name, default=None):
+        """
+        Value of `name` as currently stored in the database, or `default`
+        for a row that does not exist yet.
+        """
+        if self.pk is None:
+            return default
+        snapshot = self.__dict__.get('_snapshot', {})
+        if name not in snapshot and not self._load_snapshot():
+            return default
+        return self._snapshot[name]
+
+    def has_changed(self, *names):
+        """True if any of the fields differs from its stored value (always True for new rows)."""
+        if self.pk is None:
+            return True
+        for name in names:
+            missing = object()
+            original = self.get_original(name, missing)
+            if original is missing or original != getattr(self, self._meta.get_field(name).attname):
+                return True
+        return False
@@ -1,5 +1,5 @@
 from django import template
-from django.contrib.auth.models import Group
+from workshop.roles import get_user_roles
 from datetime import date, timedelta
 
 register = template.Library()
@@ -17,20 +17,10 @@ def has_group(user, group_name):
     """
     Checks if a user belongs to a specific group.
     Usage in template: {% if request.user|has_group:"Owner" %}
+    Superusers pass every check. Served from the user's cached roles
+    (workshop/roles.py): no query after the first check of the request.
     """
-    if not user.is_authenticated:
-        return False
-        
-    # Handling superusers (treat them as having all roles for convenience)
-    if user.is_superuser:
-        return True
-        
-    try:
-        group = Group.objects.get(name=group_name)
-    except Group.DoesNotExist:
-        return False
-        
-    return group in user.groups.all()
+    return get_user_roles(user).has(group_name)
 
 @register.filter
 def divide(value, arg):
@@ -1,4 +1,5 @@
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.utils import timezone
@@ -231,3 +232,56 @@ class AnalysisDashboardTests(TestCase):
         self.client.login(username='owner', password='pw')
         response = self.client.get(self.analysis_url, {'range': 'all_time'})
         self.assertEqual(response.status_code, 200)
+
+    # 19. test_batch_zones_all
+    def test_batch_zones_all(self):
+        self.client.login(username='owner', password='pw')
+        response = self.client.get(reverse('analysis_zones_batch'), {'range': 'all_time'})
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(set(payload['zones']), {'revenue', 'mechanic', 'spares', 'customer', 'inventory', 'cashbook', 'workshop'})
+        for zone in payload['zones'].values():
+            self.assertTrue(zone['html'])
+            self.assertGreaterEqual(zone['ms'], 0)
+        self.assertIn('total_ms', payload)
+
+    # 20. test_batch_zones_subset
+    def test_batch_zones_subset(self):
+        self.client.login(username='owner', password='pw')
+        url = reverse('analysis_zones_batch')
+        response = self.client.get(url, {'range': 'all_time', 'zones': 'revenue,cashbook'})
+        self.assertEqual(set(response.json()['zones']), {'revenue', 'cashbook'})
+
+        response = self.client.get(url, {'zones': 'revenue,nonexistentzone'})
+        self.assertEqual(response.status_code, 404)
+
+    # 21. test_batch_zones_owner_only
+    def test_batch_zones_owner_only(self):
+        self.client.login(username='office', password='pw')
+        response = self.client.get(reverse('analysis_zones_batch'))
+        self.assertNotEqual(response.status_code, 200)
+
+
+class AnalysisBatchThreadPoolTests(TransactionTestCase):
+    """Outside a transaction the batch endpoint fans zones out to worker threads."""
+
+    def setUp(self):
+        cache.clear()
+        owner_group, _ = Group.objects.get_or_create(name='Owner')
+        self.owner = User.objects.create_user(username='owner', password='pw')
+        self.owner.groups.add(owner_group)
+        JobCard.objects.create(
+            customer_name='Thread Test', brand_name='Honda', model_name='City',
+            registration_number='KL07TT0001', admitted_date=timezone.localdate(),
+            delivered=True, payment_status='PAID',
+            total_bill_amount=Decimal('2500.00'), received_amount=Decimal('2500.00'),
+        )
+
+    def test_zones_computed_on_worker_threads(self):
+        self.client.login(username='owner', password='pw')
+        response = self.client.get(reverse('analysis_zones_batch'), {'range': 'this_month'})
+        self.assertEqual(response.status_code, 200)
+        zones = response.json()['zones']
+        self.assertEqual(len(zones), 7)
+        # Worker connections see the committed job card
+        self.assertIn('₹2,500', zones['revenue']['html'])
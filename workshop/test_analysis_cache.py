@@ -0,0 +1,61 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from workshop.analysis_cache import get_zone_data
+from workshop.models import JobCard, CashbookEntry
+
+
+class ZoneCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.calls = []
+
+    def handler(self, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        return {'calls': len(self.calls)}
+
+    def _open_range(self):
+        return get_zone_data('revenue', self.handler, self.today - timedelta(days=7), self.today)
+
+    def _closed_range(self, zone='revenue'):
+        end = self.today - timedelta(days=30)
+        return get_zone_data(zone, self.handler, end - timedelta(days=30), end)
+
+    def test_repeat_request_served_from_cache(self):
+        self.assertEqual(self._open_range(), {'calls': 1})
+        self.assertEqual(self._open_range(), {'calls': 1})
+        self.assertEqual(len(self.calls), 1)
+
+    def test_todays_write_keeps_closed_ranges_cached(self):
+        self._open_range()
+        self._closed_range()
+
+        CashbookEntry.objects.create(entry_type='INCOME', category='Misc', amount=Decimal('100'))
+
+        self._open_range()
+        self._closed_range()
+        # Only the open range was recomputed
+        self.assertEqual(len(self.calls), 3)
+
+    def test_backdated_write_invalidates_closed_ranges(self):
+        self._closed_range()
+
+        JobCard.objects.create(
+            customer_name='Old', brand_name='Honda', model_name='City',
+            registration_number='KL01CC3333',
+            admitted_date=self.today - timedelta(days=40),
+        )
+
+        self._closed_range()
+        self.assertEqual(len(self.calls), 2)
+
+    def test_live_zones_never_use_history_version(self):
+        self._closed_range(zone='inventory')
+        CashbookEntry.objects.create(entry_type='INCOME', category='Misc', amount=Decimal('100'))
+        self._closed_range(zone='inventory')
+        self.assertEqual(len(self.calls), 2)
@@ -1,7 +1,12 @@
+from datetime import date
+
 from django.test import TestCase, Client
 from django.contrib.auth.models import User, Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from workshop.models import CarBrand, CarModel, SparePart, ConcernSolution
+from workshop.autocomplete_index import invalidate_autocomplete
+from workshop.models import CarBrand, CarModel, SparePart, ConcernSolution, JobCard
 from inventory.models import Category, Item
 
 
@@ -123,3 +128,35 @@ class APIViewsTestCase(TestCase):
         url = reverse('autocomplete_concerns')
         response = self.client.get(url, {'q': ''})
         self.assertEqual(response.json(), [])
+
+    # ------------------------------------------------------------------
+    # In-memory index (workshop/autocomplete_index.py)
+    # ------------------------------------------------------------------
+    def test_keystrokes_served_without_queries(self):
+        url = reverse('autocomplete_spares')
+        self.client.get(url, {'q': 'Br'})  # warms the index
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {'q': 'Brak'})
+        self.assertEqual(len(response.json()), 2)
+        tables = ('workshop_sparepart', 'inventory_item', 'workshop_carbrand')
+        self.assertFalse([q for q in ctx.captured_queries if any(t in q['sql'] for t in tables)])
+
+    def test_results_ranked_by_usage(self):
+        CarBrand.objects.create(name='Tata')
+        for reg in ('KL01T1', 'KL01T2'):
+            JobCard.objects.create(admitted_date=date.today(), brand_name='Tata', model_name='Nexon', registration_number=reg)
+
+        invalidate_autocomplete('brands')
+        response = self.client.get(reverse('autocomplete_brands'), {'q': 'T'})
+        self.assertEqual(response.json(), ['Tata', 'Toyota'])
+
+    def test_save_and_delete_invalidate_index(self):
+        url = reverse('autocomplete_concerns')
+        self.assertEqual(self.client.get(url, {'q': 'wiper'}).json(), [])
+
+        ConcernSolution.objects.create(concern='Wiper not working')
+        self.assertEqual(self.client.get(url, {'q': 'wiper'}).json(), ['Wiper not working'])
+
+        self.concern.delete()
+        self.assertEqual(self.client.get(url, {'q': 'noise'}).json(), [])
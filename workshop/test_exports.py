@@ -0,0 +1,131 @@
+import csv
+import io
+import shutil
+import tempfile
+import zipfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from xml.etree import ElementTree
+
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.db.models import Sum
+from django.http import StreamingHttpResponse
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .exports import stream_export
+from .models import JobCard, JobCardLabourItem, JobCardSpareItem, SpareShop
+
+START, END = date(2000, 1, 1), date(2100, 12, 31)
+SHEET_NS = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+
+def _csv_rows(content):
+    return list(csv.reader(io.StringIO(content.decode('utf-8-sig'))))
+
+
+class ExportTests(TestCase):
+    """
+    Tests the streaming CSV / XLSX exports (workshop/exports.py).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_scale', '--cards', '40', '--days', '30', stdout=StringIO())
+        JobCard.objects.create(
+            admitted_date=date.today(), brand_name='Kia', model_name='Seltos', registration_number='KL-01-ZZ-0001',
+        )
+        cls.office = User.objects.create_user(username='office-export')
+        cls.office.groups.add(Group.objects.get_or_create(name='Office')[0])
+        cls.floor = User.objects.create_user(username='floor-export')
+        cls.floor.groups.add(Group.objects.get_or_create(name='Floor')[0])
+
+    def _download(self, dataset, file_format):
+        client = Client()
+        client.force_login(self.office)
+        response = client.get(reverse('export_download', args=[dataset]), {
+            'range': 'custom', 'start': START.isoformat(), 'end': END.isoformat(), 'format': file_format,
+        })
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertIn(f'{dataset}_2000-01-01_2100-12-31.{file_format}', response['Content-Disposition'])
+        return b''.join(response.streaming_content)
+
+    def test_access_is_office_only(self):
+        client = Client()
+        client.force_login(self.floor)
+        self.assertEqual(client.get(reverse('export_download', args=['cashbook'])).status_code, 302)
+        client.force_login(self.office)
+        self.assertEqual(client.get(reverse('export_home')).status_code, 200)
+        self.assertEqual(client.get(reverse('export_download', args=['nope'])).status_code, 404)
+
+    def test_jobcards_csv_has_one_row_per_line(self):
+        rows = _csv_rows(self._download('jobcards', 'csv'))
+        active = JobCard.objects.filter(is_deleted=False)
+        lines = (
+            JobCardSpareItem.objects.filter(job_card__is_deleted=False).count()
+            + JobCardLabourItem.objects.filter(job_card__is_deleted=False).count()
+        )
+        without_lines = active.filter(spares__isnull=True, labours__isnull=True).count()
+        self.assertGreater(without_lines, 0)
+        self.assertEqual(rows[0][0], 'Bill No')
+        self.assertEqual(len(rows) - 1, lines + without_lines)
+        self.assertEqual({row[0] for row in rows[1:]}, set(active.values_list('bill_number', flat=True)))
+
+    def test_jobcards_queries_do_not_grow_with_rows(self):
+        # One query for the cards, two per chunk of cards for their lines
+        with self.assertNumQueries(3):
+            for _ in stream_export('jobcards', 'csv', START, END):
+                pass
+
+    def test_xlsx_matches_csv(self):
+        csv_rows = _csv_rows(self._download('spare_shops', 'csv'))
+        workbook = zipfile.ZipFile(io.BytesIO(self._download('spare_shops', 'xlsx')))
+        self.assertIsNone(workbook.testzip())
+        sheet = ElementTree.fromstring(workbook.read('xl/worksheets/sheet1.xml'))
+        rows = sheet.findall('.//m:sheetData/m:row', SHEET_NS)
+        self.assertEqual(len(rows), len(csv_rows))
+
+        # Dates are date cells (style 1, Excel serial), not text
+        first_date = rows[1].find('m:c', SHEET_NS)
+        self.assertEqual(first_date.get('s'), '1')
+        serial = int(first_date.find('m:v', SHEET_NS).text)
+        self.assertEqual(date.fromordinal(date(1899, 12, 30).toordinal() + serial).isoformat(), csv_rows[1][0])
+
+    def test_spare_shop_ledger_matches_shop_totals(self):
+        rows = _csv_rows(self._download('spare_shops', 'csv'))[1:]
+        self.assertEqual([row[0] for row in rows], sorted(row[0] for row in rows))
+        totals = SpareShop.objects.aggregate(purchased=Sum('total_purchased_amount'), paid=Sum('total_paid_amount'))
+        purchased = sum(Decimal(row[7]) for row in rows if row[2] == 'Purchase')
+        paid = sum(Decimal(row[8]) for row in rows if row[2] == 'Payment')
+        self.assertEqual(purchased, totals['purchased'])
+        self.assertEqual(paid, totals['paid'])
+
+    def test_command_writes_file(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        path = directory / 'cashbook.xlsx'
+        out = StringIO()
+        call_command(
+            'export_data', 'cashbook', '--format', 'xlsx', '--start', '2000-01-01', '--end', '2100-12-31',
+            '--output', str(path), stdout=out,
+        )
+        self.assertIn('✅ Exported Cashbook', out.getvalue())
+        self.assertIn('xl/worksheets/sheet1.xml', zipfile.ZipFile(path).namelist())
+
+    def test_csv_text_never_opens_as_a_formula(self):
+        JobCard.objects.create(
+            admitted_date=date.today(), brand_name='Kia', model_name='Sonet', registration_number='KL-01-ZZ-0002',
+            customer_name='=HYPERLINK("http://example.com","x")', customer_contact='+91 7526387245',
+        )
+        rows = _csv_rows(self._download('jobcards', 'csv'))
+        row = next(row for row in rows if row[3] == 'KL-01-ZZ-0002')
+        self.assertEqual(row[6], '\'=HYPERLINK("http://example.com","x")')
+        self.assertEqual(row[7], "'+91 7526387245")
+        self.assertEqual(row[12], '0.00')  # numbers are left alone
+
+        # XLSX keeps the value as typed: inline strings are never evaluated
+        workbook = zipfile.ZipFile(io.BytesIO(self._download('jobcards', 'xlsx')))
+        self.assertIn(b'>+91 7526387245<', workbook.read('xl/worksheets/sheet1.xml'))
@@ -5,18 +5,23 @@ invoice totals, delivered date filters.
 """
 from decimal import Decimal
 from datetime import date, timedelta
+from unittest.mock import patch
 
+from django.db import connection
+from django.db.models import Sum
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User, Group
 from django.urls import reverse
 
 from .models import (
     JobCard, Mechanic, CarBrand, SparePart,
     JobCardSpareItem, JobCardLabourItem,
-    BulkPayer, BulkPaymentHistory,
+    BulkPayer, BulkPaymentHistory, DailyRollup,
     SpareShop, SpareShopPayment,
     FailedAttempt,
 )
+from .totals import deferred_totals
 
 
 class FinancialIntegrationTests(TestCase):
@@ -191,6 +196,103 @@ class FinancialIntegrationTests(TestCase):
         self.assertEqual(history.amount, Decimal('2000'))
         self.assertEqual(history.jobs_affected, 2)
 
+    def test_bulk_payer_cascade_is_set_based(self):
+        """Query count does not grow with the number of paid cards; rollups follow."""
+        bp = BulkPayer.objects.create(customer_name='Big Fleet')
+
+        def pay_fleet(count, prefix):
+            cards = []
+            for i in range(count):
+                jc = self._create_jobcard(f'KL01{prefix}{i:04d}', admitted_date=date.today() - timedelta(days=30 - i))
+                JobCardLabourItem.objects.create(job_card=jc, job_description='Service', amount=Decimal('100'))
+                cards.append(jc)
+            bp.job_cards.set(cards)
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(reverse('bulk_payer_pay', args=[bp.pk]), {'lump_sum': str(100 * count), 'payment_method': 'UPI'})
+            # Job card reads/writes only (session tracking differs per request)
+            return len([q for q in ctx.captured_queries if '"workshop_jobcard"' in q['sql']])
+
+        few = pay_fleet(2, 'SA')
+        many = pay_fleet(12, 'SB')
+        self.assertEqual(few, many)
+        self.assertEqual(JobCard.objects.filter(payment_status='BULK_PAID').count(), 14)
+
+        rollup_paid = DailyRollup.objects.filter(basis='ADMITTED', payment_status='BULK_PAID').aggregate(
+            jobs=Sum('job_count'), collected=Sum('collected'))
+        self.assertEqual(rollup_paid, {'jobs': 14, 'collected': Decimal('1400.00')})
+
+    def test_bulk_payment_allocations_and_reversal(self):
+        """Allocations are stored per job; deleting the history reverses them in one UPDATE."""
+        jc1 = self._create_jobcard('KL01RV0001', admitted_date=date.today() - timedelta(days=5))
+        jc2 = self._create_jobcard('KL01RV0002', admitted_date=date.today() - timedelta(days=2))
+        JobCardLabourItem.objects.create(job_card=jc1, job_description='Service', amount=Decimal('1000'))
+        JobCardLabourItem.objects.create(job_card=jc2, job_description='Service', amount=Decimal('1000'))
+        JobCard.objects.filter(pk=jc2.pk).update(received_amount=Decimal('200'), payment_status='PARTIAL')
+
+        bp = BulkPayer.objects.create(customer_name='Reversal Fleet')
+        bp.job_cards.add(jc1, jc2)
+        self.client.post(reverse('bulk_payer_pay', args=[bp.pk]), {'lump_sum': '1300', 'payment_method': 'CASH'})
+
+        history = BulkPaymentHistory.objects.get(bulk_payer=bp)
+        self.assertEqual(
+            list(jc2.bulk_allocations.values_list('history', 'amount', 'resulting_status')),
+            [(history.pk, Decimal('300.00'), 'PARTIAL')],
+        )
+        self.assertEqual(
+            list(history.allocations.order_by('job_card').values_list('amount', 'resulting_status')),
+            [(Decimal('1000.00'), 'BULK_PAID'), (Decimal('300.00'), 'PARTIAL')],
+        )
+
+        self.client.force_login(self.owner)
+        url = reverse('bulk_payment_history_delete', args=[bp.pk, history.pk])
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(url)
+        job_updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "workshop_jobcard"')]
+        self.assertEqual(len(job_updates), 1)
+
+        jc1.refresh_from_db()
+        jc2.refresh_from_db()
+        self.assertEqual((jc1.received_amount, jc1.payment_status), (Decimal('0.00'), 'PENDING'))
+        self.assertEqual((jc2.received_amount, jc2.payment_status), (Decimal('200.00'), 'PARTIAL'))
+
+        # A trashed payment cannot be reversed a second time
+        self.assertEqual(self.client.post(url).status_code, 404)
+        jc2.refresh_from_db()
+        self.assertEqual(jc2.received_amount, Decimal('200.00'))
+
+    def test_bulk_payer_balances_stay_denormalized(self):
+        """pending_card_count / outstanding_balance follow totals, payments and membership."""
+        jc1 = self._create_jobcard('KL01DN0001', admitted_date=date.today() - timedelta(days=3))
+        jc2 = self._create_jobcard('KL01DN0002')
+        labour = JobCardLabourItem.objects.create(job_card=jc1, job_description='Service', amount=Decimal('700'))
+        JobCardLabourItem.objects.create(job_card=jc2, job_description='Service', amount=Decimal('300'))
+
+        bp = BulkPayer.objects.create(customer_name='Denorm Fleet')
+        bp.job_cards.add(jc1, jc2)
+
+        def balances():
+            bp.refresh_from_db()
+            return bp.pending_card_count, bp.outstanding_balance
+
+        self.assertEqual(balances(), (2, Decimal('1000.00')))
+
+        labour.amount = Decimal('900')
+        labour.save()
+        self.assertEqual(balances(), (2, Decimal('1200.00')))
+
+        self.client.post(reverse('bulk_payer_pay', args=[bp.pk]), {'lump_sum': '1000', 'payment_method': 'CASH'})
+        self.assertEqual(balances(), (1, Decimal('200.00')))
+
+        jc2.bulk_payers.remove(bp)
+        self.assertEqual(balances(), (0, Decimal('0.00')))
+
+        bp.job_cards.add(jc2)
+        jc2.delete()
+        self.assertEqual(balances(), (0, Decimal('0.00')))
+
+        response = self.client.get(reverse('bulk_payer_list'))
+        self.assertContains(response, 'Denorm Fleet')
+
     # -------------------------------------------------------------------------
     # Invoice: Total = spares + labours
     # -------------------------------------------------------------------------
@@ -302,3 +404,54 @@ class DeliveredDateFilterTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         # Only 1 matching registration
         self.assertEqual(resp.context['page_obj'].paginator.count, 1)
+
+
+class DeferredTotalsTests(TestCase):
+    """
+    TEST-2: deferred_totals() coalesces line-item total refreshes.
+    """
+
+    def setUp(self):
+        self.shop = SpareShop.objects.create(name='Coalesce Shop')
+        self.job = JobCard.objects.create(
+            registration_number='KL01EE1234', brand_name='Honda', model_name='City',
+            admitted_date=date.today(),
+        )
+
+    def test_lines_recompute_once_per_job_and_shop(self):
+        with patch.object(JobCard, 'update_totals', autospec=True, side_effect=JobCard.update_totals) as job_totals, \
+             patch.object(SpareShop, 'update_totals', autospec=True, side_effect=SpareShop.update_totals) as shop_totals:
+            with deferred_totals():
+                for i in range(5):
+                    JobCardSpareItem.objects.create(
+                        job_card=self.job, shop=self.shop, spare_part_name=f'Part {i}',
+                        quantity=Decimal('1'), unit_price=Decimal('100'), total_price=Decimal('150'),
+                    )
+                    JobCardLabourItem.objects.create(job_card=self.job, job_description=f'Work {i}', amount=Decimal('50'))
+                # Nothing recomputed until the block exits
+                self.assertEqual(job_totals.call_count, 0)
+
+        self.assertEqual(job_totals.call_count, 1)
+        self.assertEqual(shop_totals.call_count, 1)
+        self.job.refresh_from_db()
+        self.shop.refresh_from_db()
+        self.assertEqual(self.job.total_bill_amount, Decimal('1000.00'))
+        self.assertEqual(self.shop.total_purchased_amount, Decimal('500.00'))
+
+    def test_default_is_immediate(self):
+        item = JobCardLabourItem.objects.create(job_card=self.job, job_description='Wash', amount=Decimal('300'))
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.total_bill_amount, Decimal('300.00'))
+
+        item.delete()
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.total_bill_amount, Decimal('0.00'))
+
+    def test_error_rolls_back_without_recompute(self):
+        with self.assertRaises(ValueError):
+            with deferred_totals():
+                JobCardLabourItem.objects.create(job_card=self.job, job_description='Wash', amount=Decimal('300'))
+                raise ValueError('boom')
+        self.assertFalse(JobCardLabourItem.objects.exists())
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.total_bill_amount, Decimal('0.00'))
@@ -1,9 +1,30 @@
-from django.test import TestCase, Client
+import json
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User, Group
+from django.core.management import call_command, CommandError
+from django.db import connection, transaction
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.utils import timezone
-from .models import Mechanic, UserSession
+from .models import (
+    BillNumberSequence, DailyRollup, JobCard, JobCardLabourItem, JobCardSpareItem, Mechanic, SpareShop, UserSession,
+)
+from .search import FTS_TABLE, FTS_TRIGGERS, search_job_cards
+from .seeding import ScaleSeeder
 from django.contrib.sessions.models import Session
+from .management.commands.bench import find_regressions
+from .management.commands.bench_sessions import measure_session_writes
+from .index_audit import HOT_QUERIES, audit, parse_plan
 
 class ManagementViewTests(TestCase):
     """
@@ -204,3 +225,249 @@ class ManagementViewTests(TestCase):
         self.assertRedirects(response, reverse('manage_dashboard') + '?section=accounts')
         mech2.refresh_from_db()
         self.assertEqual(mech2.name, 'Bilal')  # Name unchanged
+
+
+@override_settings(SESSION_ENGINE='workshop.session_backend', SESSION_PERSIST_INTERVAL=3600)
+class CacheSessionModeTests(TestCase):
+    """
+    Tests the cache-backed session engine (SESSION_MODE=cache).
+    """
+
+    def setUp(self):
+        owner_group, _ = Group.objects.get_or_create(name='Owner')
+        office_group, _ = Group.objects.get_or_create(name='Office')
+        self.owner = User.objects.create_user(username='cache_owner', password='password')
+        self.owner.groups.add(owner_group)
+        self.staff = User.objects.create_user(username='cache_staff', password='password')
+        self.staff.groups.add(office_group)
+
+        self.staff_client = Client()
+        self.staff_client.login(username='cache_staff', password='password')
+
+    def _session_writes(self, client, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        writes = [
+            q['sql'] for q in ctx.captured_queries
+            if 'django_session' in q['sql'] and q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ]
+        return response, writes
+
+    def test_unchanged_sessions_skip_the_database(self):
+        session_key = self.staff_client.session.session_key
+        self.assertTrue(Session.objects.filter(session_key=session_key).exists())
+
+        url = reverse('spare_shop_list')
+        for _ in range(3):
+            response, writes = self._session_writes(self.staff_client, url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(writes, [])
+
+        with override_settings(SESSION_PERSIST_INTERVAL=0):
+            _, writes = self._session_writes(self.staff_client, url)
+        self.assertEqual(len(writes), 1)
+
+    def test_remote_revoke_ends_cached_session(self):
+        session_key = self.staff_client.session.session_key
+        self.staff_client.get(reverse('spare_shop_list'))
+        user_session = UserSession.objects.get(session_key=session_key)
+
+        owner_client = Client()
+        owner_client.force_login(self.owner)
+        owner_client.post(reverse('manage_terminate_session', args=[user_session.pk]))
+
+        self.assertFalse(Session.objects.filter(session_key=session_key).exists())
+        response = self.staff_client.get(reverse('spare_shop_list'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_revoke_by_another_process_ends_session(self):
+        session_key = self.staff_client.session.session_key
+        self.assertEqual(self.staff_client.get(reverse('spare_shop_list')).status_code, 200)
+
+        # Another worker deleted the row: this process's cached copy is untouched
+        Session.objects.filter(session_key=session_key).delete()
+        response = self.staff_client.get(reverse('spare_shop_list'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_bench_sessions_command(self):
+        out = StringIO()
+        call_command('bench_sessions', '--requests', '3', stdout=out)
+        output = out.getvalue()
+        self.assertIn('db', output)
+        self.assertIn('cache', output)
+        self.assertIn('✅', output)
+
+        db_writes, _ = measure_session_writes('django.contrib.sessions.backends.db', 3)
+        cache_writes, _ = measure_session_writes('workshop.session_backend', 3)
+        self.assertGreaterEqual(db_writes, 1)
+        self.assertEqual(cache_writes, 0)
+
+
+class SeedScaleTests(TestCase):
+    """
+    Tests the synthetic data generator (seed_scale).
+    """
+
+    def _seed(self, *args):
+        out = StringIO()
+        call_command('seed_scale', '--cards', '300', '--days', '60', '--until', '2026-03-31',
+                     '--chunk-size', '120', *args, stdout=out)
+        return out.getvalue()
+
+    def _fingerprint(self):
+        return list(JobCard.objects.order_by('pk').values_list(
+            'bill_number', 'registration_number', 'admitted_date', 'payment_status', 'total_bill_amount',
+        ))
+
+    def test_seeded_data_is_consistent(self):
+        output = self._seed()
+        self.assertIn('✅', output)
+        self.assertEqual(JobCard.objects.count(), 300)
+
+        # Denormalized totals match the line items
+        line_totals = JobCard.objects.annotate(
+            spares_sum=Coalesce(Subquery(
+                JobCardSpareItem.objects.filter(job_card=OuterRef('pk')).values('job_card')
+                .annotate(s=Sum('total_price')).values('s'), output_field=DecimalField(),
+            ), Value(Decimal('0'))),
+            labour_sum=Subquery(
+                JobCardLabourItem.objects.filter(job_card=OuterRef('pk')).values('job_card')
+                .annotate(s=Sum('amount')).values('s'), output_field=DecimalField(),
+            ),
+        )
+        for card in line_totals:
+            self.assertEqual(card.total_bill_amount, card.spares_sum + card.labour_sum)
+
+        shop = SpareShop.objects.filter(spare_items__isnull=False).first()
+        purchased, paid = shop.total_purchased_amount, shop.total_paid_amount
+        shop.update_totals()
+        self.assertEqual((shop.total_purchased_amount, shop.total_paid_amount), (purchased, paid))
+        self.assertTrue(DailyRollup.objects.exists())
+
+        # Search index rebuilt; bill numbers continue after the seeded ones
+        card = JobCard.objects.order_by('?').first()
+        self.assertIn(card, search_job_cards(JobCard.objects.all(), card.registration_number))
+        last_seeded = BillNumberSequence.objects.get(year=2026).last_number
+        new_card = JobCard.objects.create(
+            admitted_date=date(2026, 4, 1), brand_name='Tata', model_name='Nexon', registration_number='KL-07-ZZ-1',
+        )
+        self.assertEqual(new_card.bill_number, f'JB-26-{last_seeded + 1:03d}')
+
+    def test_failed_seed_restores_search_index(self):
+        with patch.object(ScaleSeeder, '_seed_cashbook', side_effect=RuntimeError('disk full')):
+            with self.assertRaisesMessage(RuntimeError, 'disk full'):
+                self._seed()
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)", [FTS_TABLE, *FTS_TRIGGERS])
+            self.assertEqual(len(cursor.fetchall()), 1 + len(FTS_TRIGGERS))
+        card = JobCard.objects.order_by('?').first()
+        self.assertIn(card, search_job_cards(JobCard.objects.all(), card.registration_number))
+
+    def test_same_seed_same_data(self):
+        fingerprints = []
+        for _ in range(2):
+            with transaction.atomic():
+                self._seed('--seed', '42')
+                fingerprints.append(self._fingerprint())
+                transaction.set_rollback(True)
+        self.assertEqual(fingerprints[0], fingerprints[1])
+        self.assertEqual(len(fingerprints[0]), 300)
+
+
+class BenchCommandTests(TestCase):
+    """
+    Tests the view benchmark (bench) and its baseline comparison.
+    """
+
+    def setUp(self):
+        call_command('seed_scale', '--cards', '60', '--days', '30', stdout=StringIO())
+        self.baseline = Path(tempfile.mkdtemp()) / 'baseline.json'
+        self.addCleanup(shutil.rmtree, self.baseline.parent)
+
+    def _bench(self, *args):
+        out = StringIO()
+        call_command('bench', '--iterations', '2', '--baseline', str(self.baseline), *args, stdout=out)
+        return out.getvalue()
+
+    def test_baseline_round_trip_and_query_regression(self):
+        self.assertIn('✅ Saved baseline', self._bench('--save'))
+        views = json.loads(self.baseline.read_text())['views']
+        for name in ('home', 'jobcard_list', 'bulk_payer_detail', 'spare_shop_detail',
+                     'analysis_zone:revenue', 'autocomplete_spares'):
+            self.assertGreater(views[name]['queries'], 0)
+
+        # Generous latency budget: only the (deterministic) query counts can regress here
+        self.assertIn('within budget', self._bench('--threshold', '100'))
+
+        baseline = json.loads(self.baseline.read_text())
+        baseline['views']['home']['queries'] -= 1
+        self.baseline.write_text(json.dumps(baseline))
+        with self.assertRaisesMessage(CommandError, '1 regression(s)'):
+            self._bench('--threshold', '100', '--only', 'home')
+
+    def test_latency_regressions_respect_threshold_and_noise(self):
+        baseline = {'a': {'p95_ms': 10.0, 'queries': 3}, 'b': {'p95_ms': 100.0, 'queries': 3}}
+        results = {
+            'a': {'p95_ms': 11.9, 'queries': 3},   # +19%, but under the noise floor
+            'b': {'p95_ms': 140.0, 'queries': 3},  # +40%
+            'new': {'p95_ms': 500.0, 'queries': 50},
+        }
+        self.assertEqual([name for name, _ in find_regressions(results, baseline, 0.25)], ['b'])
+
+
+class AuditIndexesTests(TestCase):
+    """
+    Tests the hot query EXPLAIN audit (audit_indexes).
+    """
+
+    def test_hot_queries_use_their_expected_index(self):
+        call_command('seed_scale', '--cards', '400', '--days', '90', stdout=StringIO())
+        out = StringIO()
+        call_command('audit_indexes', '--analyze', '--strict', stdout=out)
+        self.assertIn('each on its expected index', out.getvalue())
+
+        results = {row['name']: row for row in audit()}
+        for name, _, _ in HOT_QUERIES:
+            self.assertTrue(results[name]['expected_used'], f"{name}: {results[name]['plan']}")
+            self.assertEqual(results[name]['full_scans'], [], name)
+        self.assertIn('jobcard_delivered_idx', results['delivered_list']['indexes'])
+        # Ordered walks of a whole index are only acceptable under a LIMIT
+        self.assertTrue(results['pending_payments_list']['index_scans'])
+        self.assertTrue(results['pending_payments_list']['limited'])
+
+    def test_unindexed_filter_is_reported(self):
+        plan = JobCard.objects.filter(customer_contact='9999').explain()
+        self.assertEqual(parse_plan(plan, connection.vendor)['full_scans'], ['workshop_jobcard'])
+
+    def test_parse_plan(self):
+        sqlite_plan = (
+            '5 0 0 SCAN workshop_jobcard USING INDEX workshop_jobcard_updated_at_104196b8\n'
+            '8 0 0 SEARCH workshop_spareshop USING INTEGER PRIMARY KEY (rowid=?)\n'
+            '13 0 0 SCAN workshop_mechanic\n'
+            '39 0 0 USE TEMP B-TREE FOR ORDER BY'
+        )
+        found = parse_plan(sqlite_plan, 'sqlite')
+        self.assertEqual(found['full_scans'], ['workshop_mechanic'])
+        self.assertEqual(found['index_scans'], ['workshop_jobcard_updated_at_104196b8'])
+        self.assertTrue(found['sorts'])
+
+        postgres_plan = (
+            'Limit  (cost=0.29..9.87 rows=45 width=412)\n'
+            '  ->  Index Scan Backward using jobcard_delivered_idx on workshop_jobcard\n'
+            '  ->  Index Scan using workshop_jobcard_lead_mechanic_id on workshop_jobcard\n'
+            '        Index Cond: (lead_mechanic_id = 3)'
+        )
+        found = parse_plan(postgres_plan, 'postgresql')
+        self.assertEqual(found['indexes'], ['jobcard_delivered_idx', 'workshop_jobcard_lead_mechanic_id'])
+        self.assertEqual(found['index_scans'], ['jobcard_delivered_idx'])
+        self.assertEqual((found['full_scans'], found['sorts']), ([], False))
+        found = parse_plan('Sort  (cost=1.0..1.1)\n  Sort Key: name\n  ->  Seq Scan on workshop_spareshop', 'postgresql')
+        self.assertEqual((found['full_scans'], found['sorts']), (['workshop_spareshop'], True))
+
+    def test_full_index_scan_without_limit_is_a_problem(self):
+        hot_queries = [('all_cards_by_update', lambda: JobCard.objects.order_by('-updated_at'), ['updated_at'])]
+        with patch('workshop.index_audit.HOT_QUERIES', hot_queries):
+            row, = audit()
+        self.assertFalse(row['limited'])
+        self.assertIn('full index scan', ' '.join(row['problems']))
@@ -1,8 +1,23 @@
-from django.test import TestCase, Client, RequestFactory
-from django.contrib.auth.models import User
+import json
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User, Group
+from django.db import connection
+from django.template import engines
+from django.urls import reverse
 from .models import UserSession
-from .middleware import SessionTrackingMiddleware
+from .middleware import SessionTrackingMiddleware, RoleMiddleware
+from .decorators import is_owner, is_office_or_owner
+from .roles import get_user_roles
+from . import profiling, session_activity
+from .templatetags.custom_filters import has_group
 from django.utils import timezone
+from datetime import timedelta
 
 class MiddlewareSecurityTests(TestCase):
     """
@@ -54,3 +69,247 @@ class MiddlewareSecurityTests(TestCase):
         
         session_record = UserSession.objects.get(session_key=request.session.session_key)
         self.assertEqual(session_record.ip_address, '203.0.113.1')
+
+
+class RoleCacheTests(TestCase):
+    """
+    Tests the cached role resolution shared by RoleMiddleware, the RBAC
+    decorators and the |has_group filter.
+    """
+
+    def setUp(self):
+        self.owner_group, _ = Group.objects.get_or_create(name='Owner')
+        self.office_group, _ = Group.objects.get_or_create(name='Office')
+        self.user = User.objects.create_user(username='role_office', password='password123')
+        self.user.groups.add(self.office_group)
+        self.client = Client()
+        self.client.login(username='role_office', password='password123')
+
+    def _role_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in ctx.captured_queries if 'auth_user_groups' in q['sql']]
+
+    def test_page_render_needs_no_role_queries_once_cached(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir}}
+        url = reverse('spare_shop_list')
+        with override_settings(CACHES=shared):
+            self.assertLessEqual(len(self._role_queries(url)), 1)
+            self.assertEqual(self._role_queries(url), [])
+
+    def test_per_process_cache_reads_roles_once_per_request(self):
+        # LocMemCache: another worker's invalidation could never reach this one
+        url = reverse('spare_shop_list')
+        self._role_queries(url)
+        self.assertEqual(len(self._role_queries(url)), 1)
+
+        # A change made elsewhere (no receiver ran in this process) applies on the next request
+        self.user.groups.through.objects.filter(user=self.user).delete()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_request_roles_attribute(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        RoleMiddleware(lambda req: None)(request)
+        self.assertTrue(request.roles.is_office_or_owner)
+        self.assertFalse(request.roles.is_owner)
+        self.assertIn('Office', request.roles)
+        self.assertIs(get_user_roles(self.user), get_user_roles(self.user))
+
+    def test_membership_and_group_changes_invalidate(self):
+        self.assertFalse(has_group(User.objects.get(pk=self.user.pk), 'Owner'))
+
+        self.user.groups.add(self.owner_group)
+        self.assertTrue(is_owner(User.objects.get(pk=self.user.pk)))
+
+        self.owner_group.user_set.remove(self.user)
+        self.assertFalse(is_owner(User.objects.get(pk=self.user.pk)))
+
+        self.office_group.name = 'Front Desk'
+        self.office_group.save()
+        fresh = User.objects.get(pk=self.user.pk)
+        self.assertFalse(is_office_or_owner(fresh))
+        self.assertTrue(has_group(fresh, 'Front Desk'))
+
+    def test_superuser_passes_every_check(self):
+        admin = User.objects.create_superuser(username='root_admin', password='password123')
+        self.assertTrue(is_owner(admin))
+        self.assertTrue(has_group(admin, 'Floor'))
+
+
+@override_settings(SESSION_ACTIVITY_FLUSH_INTERVAL=3600, SESSION_ACTIVITY_FLUSH_THRESHOLD=100)
+class SessionActivityBufferTests(TestCase):
+    """
+    Tests the write-behind buffer behind SessionTrackingMiddleware.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='buffer_owner', password='password123')
+        self.owner.groups.add(Group.objects.get_or_create(name='Owner')[0])
+        self.client = Client()
+        self.client.force_login(self.owner)
+        session_activity.flush_session_activity()
+
+    def _session_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        return [q['sql'] for q in ctx.captured_queries if 'workshop_usersession' in q['sql']]
+
+    def test_repeat_requests_are_buffered_then_flushed_in_bulk(self):
+        url = reverse('spare_shop_list')
+        self.assertTrue(self._session_queries(url))  # first sight: written immediately
+        session_key = self.client.session.session_key
+        stored = UserSession.objects.get(session_key=session_key).last_activity
+
+        self.assertEqual(self._session_queries(url), [])
+        self.assertEqual(UserSession.objects.get(session_key=session_key).last_activity, stored)
+        self.assertIn(session_key, session_activity.buffered_activity())
+
+        self.assertEqual(session_activity.flush_session_activity(), 1)
+        self.assertGreater(UserSession.objects.get(session_key=session_key).last_activity, stored)
+        self.assertEqual(session_activity.buffered_activity(), {})
+
+    def test_threshold_triggers_flush(self):
+        url = reverse('spare_shop_list')
+        self.client.get(url)
+        with override_settings(SESSION_ACTIVITY_FLUSH_THRESHOLD=1):
+            self.client.get(url)
+        self.assertEqual(session_activity.buffered_activity(), {})
+
+    def test_dashboard_merges_buffer_and_flush_skips_revoked_rows(self):
+        self.client.get(reverse('spare_shop_list'))
+        session_key = self.client.session.session_key
+        UserSession.objects.filter(session_key=session_key).update(
+            last_activity=timezone.now() - timedelta(hours=2)
+        )
+        self.client.get(reverse('spare_shop_list'))
+
+        response = self.client.get(reverse('manage_dashboard'), {'section': 'security'})
+        merged = {s.session_key: s for s in response.context['owner_sessions']}
+        self.assertLess(timezone.now() - merged[session_key].last_activity, timedelta(minutes=1))
+
+        UserSession.objects.filter(session_key=session_key).delete()
+        self.assertEqual(session_activity.flush_session_activity(), 0)
+        self.assertFalse(UserSession.objects.filter(session_key=session_key).exists())
+
+    @override_settings(SESSION_ACTIVITY_KNOWN_LIMIT=3)
+    def test_known_sessions_are_bounded(self):
+        now = timezone.now()
+        keys = [f'bounded-session-{n}' for n in range(5)]
+        for key in keys:
+            session_activity.record_activity(key, self.owner, '127.0.0.1', 'test', now)
+        self.assertEqual(list(session_activity._known)[-3:], keys[-3:])
+        self.assertLessEqual(len(session_activity._known), 3)
+
+        # Evicted: the next request writes its row again instead of buffering
+        with CaptureQueriesContext(connection) as ctx:
+            session_activity.record_activity(keys[0], self.owner, '127.0.0.1', 'test', now)
+        self.assertTrue(ctx.captured_queries)
+        self.assertNotIn(keys[0], session_activity.buffered_activity())
+
+
+class RequestProfilingTests(TestCase):
+    """
+    Tests the opt-in QueryProfilingMiddleware, the slow request log and the
+    owner performance page.
+    """
+
+    def setUp(self):
+        cache.clear()
+        profiling._pending.clear()
+        self.owner = User.objects.create_user(username='profile_owner', password='password123')
+        self.owner.groups.add(Group.objects.get_or_create(name='Owner')[0])
+
+    def _client(self):
+        client = Client()
+        client.force_login(self.owner)
+        return client
+
+    def test_off_by_default(self):
+        response = self._client().get(reverse('spare_shop_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_PROFILING=True, SLOW_REQUEST_MS=0, PROFILING_FLUSH_INTERVAL=0)
+    def test_slow_request_is_logged_and_aggregated(self):
+        client = self._client()
+        with self.assertLogs('workshop.profiling', 'WARNING') as logs:
+            response = client.get(reverse('spare_shop_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total;dur=')
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['url_name'], 'spare_shop_list')
+        self.assertGreater(entry['queries'], 0)
+        self.assertGreater(entry['template_ms'], 0)
+        self.assertLessEqual(len(entry['slowest']), 5)
+        self.assertTrue(all(query['sql'] for query in entry['slowest']))
+
+        with self.assertLogs('workshop.profiling', 'WARNING'):
+            page = client.get(reverse('manage_performance'))
+        self.assertEqual(page.status_code, 200)
+        rows = {row['url_name']: row for row in page.context['rows']}
+        self.assertEqual(rows['spare_shop_list']['count'], 1)
+        self.assertEqual(rows['spare_shop_list']['slow'], 1)
+        self.assertEqual(page.context['slow_requests'][0]['path'], reverse('spare_shop_list'))
+
+    @override_settings(REQUEST_PROFILING=True, SLOW_REQUEST_MS=60_000)
+    def test_server_timing_only_for_owners(self):
+        self.assertIn('Server-Timing', self._client().get(reverse('spare_shop_list')))
+
+        staff = User.objects.create_user(username='timing_staff', password='password123')
+        staff.groups.add(Group.objects.get_or_create(name='Office')[0])
+        client = Client()
+        client.force_login(staff)
+        response = client.get(reverse('spare_shop_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+        self.assertNotIn('Server-Timing', Client().get(reverse('login')))
+
+    def test_pool_work_counts_towards_the_request(self):
+        def zone():
+            # The worker's own connection (closed after, like analysis_zones_batch)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                return engines.all()[0].from_string('{{ value }}').render({'value': 1})
+            finally:
+                connection.close()
+
+        profile = profiling.RequestProfile()
+        token = profiling._current.set(profile)
+        try:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                results = [pool.submit(profiling.profiled(zone)) for _ in range(2)]
+                self.assertEqual([future.result() for future in results], ['1', '1'])
+        finally:
+            profiling._current.reset(token)
+        self.assertEqual(profile.queries, 2)
+        self.assertGreater(profile.template_ms, 0)
+
+        # No active profile: the function runs unwrapped
+        self.assertIs(profiling.profiled(zone), zone)
+
+    def test_performance_page_is_owner_only(self):
+        staff = User.objects.create_user(username='profile_staff', password='password123')
+        staff.groups.add(Group.objects.get_or_create(name='Office')[0])
+        client = Client()
+        client.force_login(staff)
+        self.assertNotEqual(client.get(reverse('manage_performance')).status_code, 200)
+
+        page = self._client().get(reverse('manage_performance'))
+        self.assertContains(page, 'Profiling is off')
+
+    def test_normalize_sql(self):
+        sql = (
+            'SELECT "a"."id" FROM "workshop_jobcard" "a" WHERE "a"."id" IN (%s, %s, %s) '
+            "AND \"a\".\"bill_number\" = 'JB-26-001'\n  AND \"a\".\"total\" > 10.5 LIMIT 21"
+        )
+        self.assertEqual(
+            profiling.normalize_sql(sql),
+            'SELECT "a"."id" FROM "workshop_jobcard" "a" WHERE "a"."id" IN (...) '
+            'AND "a"."bill_number" = ? AND "a"."total" > ? LIMIT ?',
+        )
@@ -0,0 +1,234 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User, Group
+from django.core.management import call_command
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import NotificationOutbox
+from .notifications import FINISHED_RETENTION, MAX_ATTEMPTS, WORKER_STALL_AFTER, enqueue_notifications
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    """Answers like Telegram (sendMessage) and Twilio (Messages.json)."""
+    protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse is observable
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        with server.lock:
+            server.received.append((self.path, body, self.client_address[1]))
+            failing = server.fail_next > 0
+            server.fail_next -= failing
+
+        if failing:
+            status, payload = 500, {'ok': False}
+        elif self.path.endswith('/Messages.json'):
+            status, payload = 201, {'sid': 'SM0001', 'status': 'queued'}
+        else:
+            status, payload = 200, {'ok': True}
+
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+PROVIDER_ENV = {
+    'TELEGRAM_BOT_TOKEN': 'test-token',
+    'TWILIO_ACCOUNT_SID': 'ACtest',
+    'TWILIO_AUTH_TOKEN': 'secret',
+    'TWILIO_FROM_NUMBER': '+15550000000',
+}
+
+
+class NotificationOutboxTests(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeProviderHandler)
+        self.server.received, self.server.fail_next, self.server.lock = [], 0, threading.Lock()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        api_urls = override_settings(TELEGRAM_API_URL=base_url, TWILIO_API_URL=base_url)
+        api_urls.enable()
+        self.addCleanup(api_urls.disable)
+        credentials = patch.dict(os.environ, PROVIDER_ENV)
+        credentials.start()
+        self.addCleanup(credentials.stop)
+
+    def _drain(self, *args):
+        out = StringIO()
+        call_command('send_notifications', '--once', *args, stdout=out)
+        return out.getvalue()
+
+    def test_login_only_enqueues(self):
+        Group.objects.get_or_create(name='Office')
+        User.objects.create_user(username='outbox_staff', password='password123')
+        client = Client()
+        with patch('workshop.notifications.deliver') as deliver:
+            response = client.post(reverse('login'), {'username': 'outbox_staff', 'password': 'password123'})
+        self.assertEqual(response.status_code, 302)
+        deliver.assert_not_called()
+        self.assertTrue(NotificationOutbox.objects.filter(status='PENDING', channel='SMS').exists())
+        self.assertEqual(self.server.received, [])
+
+    def test_worker_delivers_and_reuses_connections(self):
+        enqueue_notifications([
+            ('TELEGRAM', '1001', 'alert one'),
+            ('TELEGRAM', '1002', 'alert two'),
+            ('SMS', '+919000000001', 'alert one'),
+            ('SMS', '+919000000002', 'alert two'),
+        ])
+        output = self._drain('--workers', '1')
+
+        self.assertIn('4 sent', output)
+        self.assertEqual(NotificationOutbox.objects.filter(status='SENT').count(), 4)
+        paths = [path for path, _, _ in self.server.received]
+        self.assertEqual(paths.count('/bottest-token/sendMessage'), 2)
+        self.assertEqual(paths.count('/2010-04-01/Accounts/ACtest/Messages.json'), 2)
+        # One pool thread → one kept-alive connection per provider client
+        self.assertLessEqual(len({port for _, _, port in self.server.received}), 2)
+
+    def test_failures_back_off_then_fail(self):
+        row, = enqueue_notifications([('TELEGRAM', '1001', 'alert')])
+        self.server.fail_next = 1
+        with self.assertLogs('workshop.notifications', 'ERROR'):
+            self._drain()
+
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), ('PENDING', 1))
+        self.assertIn('500', row.last_error)
+        self.assertGreater(row.next_attempt_at, timezone.now() + timedelta(seconds=20))
+
+        # Not due yet: a second drain leaves it alone
+        self._drain()
+        row.refresh_from_db()
+        self.assertEqual(row.attempts, 1)
+
+        NotificationOutbox.objects.filter(pk=row.pk).update(
+            attempts=MAX_ATTEMPTS - 1, next_attempt_at=timezone.now(),
+        )
+        self.server.fail_next = 1
+        with self.assertLogs('workshop.notifications', 'ERROR'):
+            self._drain()
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), ('FAILED', MAX_ATTEMPTS))
+
+    def test_unconfigured_channel_is_skipped(self):
+        row, = enqueue_notifications([('TELEGRAM', '1001', 'Your WorkshopOS Login Code: 482913')])
+        with patch.dict(os.environ, {'TELEGRAM_BOT_TOKEN': ''}):
+            with self.assertLogs('workshop.notifications', 'WARNING') as logs:
+                self._drain()
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.message), ('SKIPPED', ''))
+        self.assertEqual(self.server.received, [])
+        self.assertIn('1001', logs.output[0])
+        self.assertNotIn('482913', '\n'.join(logs.output))
+
+    def test_password_reset_otp_is_never_sent_after_it_expires(self):
+        owner = User.objects.create_user(username='Sahad', password='password123')
+        owner.groups.add(Group.objects.get_or_create(name='Owner')[0])
+        Client().post(reverse('owner_forgot_password'), {'username': 'Sahad'})
+        row = NotificationOutbox.objects.get(channel='SMS')
+        self.assertAlmostEqual(
+            row.expires_at, timezone.now() + timedelta(minutes=5), delta=timedelta(seconds=30),
+        )
+
+        # Still failing its retries when the code runs out
+        NotificationOutbox.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('workshop.notifications', 'WARNING'):
+            self._drain()
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.message, row.attempts), ('FAILED', '', 0))
+        self.assertEqual(self.server.received, [])
+
+    def test_finished_rows_are_blanked_then_purged(self):
+        sent, pending = enqueue_notifications([('SMS', '+919000000001', 'code 1'), ('SMS', '+919000000002', 'code 2')])
+        NotificationOutbox.objects.filter(pk=pending.pk).update(next_attempt_at=timezone.now() + timedelta(minutes=1))
+        self._drain()
+        sent.refresh_from_db()
+        self.assertEqual((sent.status, sent.message), ('SENT', ''))
+
+        NotificationOutbox.objects.update(created_at=timezone.now() - FINISHED_RETENTION - timedelta(hours=1))
+        output = self._drain()
+        self.assertIn('1 finished notification(s) purged', output)
+        self.assertQuerySetEqual(NotificationOutbox.objects.values_list('pk', flat=True), [pending.pk])
+
+    def test_enqueue_reports_a_stalled_worker(self):
+        enqueue_notifications([('SMS', '+919000000001', 'alert')])
+        NotificationOutbox.objects.update(next_attempt_at=timezone.now() - WORKER_STALL_AFTER - timedelta(seconds=1))
+        with self.assertLogs('workshop.notifications', 'ERROR') as logs:
+            enqueue_notifications([('SMS', '+919000000001', 'alert')])
+        self.assertIn('send_notifications', logs.output[0])
+
+    def test_expired_lease_is_reclaimed(self):
+        row, = enqueue_notifications([('SMS', '+919000000001', 'alert')])
+        NotificationOutbox.objects.filter(pk=row.pk).update(
+            status='SENDING', next_attempt_at=timezone.now() - timedelta(seconds=1),
+        )
+        self._drain()
+        row.refresh_from_db()
+        self.assertEqual(row.status, 'SENT')
+
+
+def importtime_report(statement):
+    """
+    Runs `statement` in a fresh interpreter under `python -X importtime` and
+    returns {module: cumulative microseconds} for every module it imported.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=120,
+    )
+    if result.returncode:
+        raise AssertionError(result.stderr[-2000:])
+
+    report = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        report[module.strip()] = int(cumulative)
+    return report
+
+
+class ColdStartImportTests(SimpleTestCase):
+    """Worker / manage.py cold start must not pay for the provider SDKs."""
+
+    def test_url_conf_does_not_import_provider_sdks(self):
+        report = importtime_report(
+            'import django; django.setup(); '
+            'from django.urls import get_resolver; get_resolver().url_patterns'
+        )
+        self.assertIn('workshop.auth_views', report)
+        self.assertIn('workshop.notifications', report)
+        sdk_modules = sorted(
+            module for module in report
+            if module.split('.')[0] in ('twilio', 'requests', 'aiohttp')
+        )
+        self.assertEqual(sdk_modules, [])
+
+    def test_backends_load_their_sdk_on_first_use(self):
+        report = importtime_report(
+            'import django; django.setup(); '
+            'from workshop.notifications import get_backend; '
+            'get_backend("SMS")._client("ACtest", "secret")'
+        )
+        self.assertIn('twilio.rest', report)
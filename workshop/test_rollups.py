@@ -0,0 +1,135 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from workshop.models import (
+    JobCard, JobCardSpareItem, JobCardLabourItem, SpareShop, DailyRollup
+)
+from workshop.analysis_views import _get_hero_kpis, _zone_revenue, _zone_cashbook
+
+
+class DailyRollupTests(TestCase):
+    def setUp(self):
+        self.today = date(2026, 3, 10)
+        self.shop = SpareShop.objects.create(name='Rollup Shop')
+        self.job = JobCard.objects.create(
+            customer_name='Alpha', brand_name='Honda', model_name='City',
+            registration_number='KL01AA1111',
+            admitted_date=self.today, discharged_date=self.today + timedelta(days=1),
+            delivered=True, payment_status='PARTIAL', payment_method='CASH',
+            received_amount=Decimal('300.00'),
+        )
+        JobCardSpareItem.objects.create(
+            job_card=self.job, shop=self.shop, spare_part_name='Oil Filter',
+            quantity=Decimal('2'), unit_price=Decimal('200.00'), total_price=Decimal('500.00'),
+        )
+        self.labour = JobCardLabourItem.objects.create(
+            job_card=self.job, job_description='Service', amount=Decimal('400.00'),
+        )
+
+    def _admitted(self, **filters):
+        return DailyRollup.objects.filter(basis='ADMITTED', **filters).aggregate(
+            revenue=Sum('revenue'), collected=Sum('collected'), jobs=Sum('job_count'),
+            spare_revenue=Sum('spare_revenue'), labour_revenue=Sum('labour_revenue'),
+        )
+
+    def test_rollup_tracks_line_items(self):
+        agg = self._admitted(day=self.today)
+        self.assertEqual(agg['revenue'], Decimal('900.00'))
+        self.assertEqual(agg['collected'], Decimal('300.00'))
+        self.assertEqual(agg['jobs'], 1)
+        self.assertEqual(agg['spare_revenue'], Decimal('500.00'))
+        self.assertEqual(agg['labour_revenue'], Decimal('400.00'))
+
+        self.labour.delete()
+        self.assertEqual(self._admitted(day=self.today)['labour_revenue'], Decimal('0.00'))
+
+    def test_status_and_date_changes_move_buckets(self):
+        self.job.payment_status = 'PAID'
+        self.job.admitted_date = self.today - timedelta(days=3)
+        self.job.save()
+
+        self.assertFalse(DailyRollup.objects.filter(basis='ADMITTED', day=self.today).exists())
+        rows = DailyRollup.objects.filter(basis='ADMITTED', day=self.today - timedelta(days=3))
+        self.assertEqual([r.payment_status for r in rows], ['PAID'])
+        self.assertEqual(rows[0].revenue, Decimal('900.00'))
+
+    def test_soft_and_hard_delete_remove_job(self):
+        self.job.is_deleted = True
+        self.job.save()
+        self.assertFalse(DailyRollup.objects.exists())
+
+        self.job.is_deleted = False
+        self.job.save()
+        self.assertTrue(DailyRollup.objects.exists())
+
+        JobCard.objects.all().delete()
+        self.assertFalse(DailyRollup.objects.exists())
+
+    def test_loaded_job_card_save_uses_snapshot(self):
+        job = JobCard.objects.get(pk=self.job.pk)
+
+        # Not a bucket field: nothing to refresh, and no pre_save re-fetch
+        job.on_hold = True
+        with CaptureQueriesContext(connection) as ctx:
+            job.save()
+        self.assertEqual(len(ctx.captured_queries), 1)  # the UPDATE itself
+
+        job.admitted_date = self.today - timedelta(days=1)
+        job.save()
+        self.assertFalse(DailyRollup.objects.filter(basis='ADMITTED', day=self.today).exists())
+        self.assertEqual(self._admitted(day=self.today - timedelta(days=1))['jobs'], 1)
+
+    def test_dashboard_reads_match_source_tables(self):
+        JobCard.objects.create(
+            customer_name='Beta', brand_name='Maruti', model_name='Swift',
+            registration_number='KL01BB2222', admitted_date=self.today,
+            delivered=False, payment_status='PENDING', total_bill_amount=Decimal('1000.00'),
+        )
+        start, end = self.today - timedelta(days=5), self.today + timedelta(days=5)
+
+        kpis = _get_hero_kpis(start, end)
+        self.assertEqual(kpis['revenue_raw'], 900)
+        self.assertEqual(kpis['collected_raw'], 300)
+        self.assertEqual(kpis['cars_completed'], 1)
+        self.assertEqual(kpis['outstanding_raw'], 1600)
+
+        revenue = _zone_revenue(start, end)
+        self.assertEqual(revenue['total_jobs'], 1)
+        self.assertEqual(revenue['spare_cost'], '₹200')
+        self.assertEqual(revenue['payment_labels'], '["Cash"]')
+
+        cashbook = _zone_cashbook(start, end)
+        self.assertEqual(cashbook['pm_labels'], '["CASH"]')
+
+        # A delivered card without a payment method is charted as 'Unknown'
+        JobCard.objects.create(
+            customer_name='Gamma', brand_name='Tata', model_name='Nexon',
+            registration_number='KL01CC3333', admitted_date=self.today, discharged_date=self.today,
+            delivered=True, payment_status='PAID', payment_method='', received_amount=Decimal('50.00'),
+        )
+        cashbook = _zone_cashbook(start, end)
+        self.assertEqual(cashbook['pm_labels'], '["CASH", "Unknown"]')
+        self.assertEqual(cashbook['pm_revenue'], '[300, 50]')
+        self.assertEqual(cashbook['ps_partial'], 1)
+        self.assertEqual(cashbook['ps_pending'], 1)
+
+    def test_rebuild_command_restores_table(self):
+        expected = list(DailyRollup.objects.order_by('basis', 'day').values_list(
+            'basis', 'day', 'payment_status', 'revenue', 'spare_revenue', 'labour_revenue'
+        ))
+        DailyRollup.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_rollups', stdout=out)
+
+        self.assertIn('Rebuilt 2 daily rollup buckets', out.getvalue())
+        self.assertEqual(expected, list(DailyRollup.objects.order_by('basis', 'day').values_list(
+            'basis', 'day', 'payment_status', 'revenue', 'spare_revenue', 'labour_revenue'
+        )))
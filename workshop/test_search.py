@@ -0,0 +1,118 @@
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth.models import User, Group
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from workshop.models import JobCard, Mechanic
+from workshop.search import FTS_TABLE, FTS_TRIGGERS, build_search_text, search_job_cards, search_text_expression
+
+
+class JobCardSearchTests(TestCase):
+    def setUp(self):
+        self.mechanic = Mechanic.objects.create(name='Ravi')
+        self.swift = JobCard.objects.create(
+            admitted_date=date.today(), brand_name='Maruti', model_name='Swift',
+            registration_number='KL07AB1234', customer_name='Anil Kumar',
+            customer_contact='9847055555', lead_mechanic=self.mechanic,
+        )
+        self.city = JobCard.objects.create(
+            admitted_date=date.today(), brand_name='Honda', model_name='City',
+            registration_number='KL01CD5678', customer_name='Beena',
+        )
+
+    def _search(self, q):
+        return set(search_job_cards(JobCard.objects.all(), q))
+
+    def test_substring_and_multi_word_match(self):
+        self.assertEqual(self._search('1234'), {self.swift})
+        self.assertEqual(self._search('kl0'), {self.swift, self.city})
+        self.assertEqual(self._search('KL0 honda'), {self.city})
+        self.assertEqual(self._search(self.swift.bill_number), {self.swift})
+        self.assertEqual(self._search('ravi'), {self.swift})
+        self.assertEqual(self._search('swift beena'), set())
+
+    def test_short_words_fall_back_to_like(self):
+        self.assertEqual(self._search('ci'), {self.city})
+        self.assertEqual(self._search('kl ab'), {self.swift})
+
+    def test_uses_fts_index_on_sqlite(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 index is SQLite only')
+        with CaptureQueriesContext(connection) as ctx:
+            list(search_job_cards(JobCard.objects.all(), 'swift'))
+        self.assertIn(FTS_TABLE, ctx.captured_queries[-1]['sql'])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.swift.registration_number = 'KL09ZZ0001'
+        self.swift.save()
+        self.assertEqual(self._search('1234'), set())
+        self.assertEqual(self._search('zz0001'), {self.swift})
+
+        self.mechanic.name = 'Suresh'
+        self.mechanic.save()
+        self.assertEqual(self._search('suresh'), {self.swift})
+        self.assertEqual(self._search('ravi'), set())
+
+        self.city.delete()
+        self.assertEqual(self._search('honda'), set())
+
+    def test_sql_expression_matches_python_builder(self):
+        row = JobCard.objects.annotate(expected=search_text_expression()).get(pk=self.swift.pk)
+        self.assertEqual(row.expected, build_search_text(self.swift))
+        self.assertEqual(row.search_text, row.expected)
+
+    def test_rebuild_command(self):
+        JobCard.objects.update(search_text='')
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('✅', out.getvalue())
+        self.assertEqual(self._search('anil'), {self.swift})
+
+    def test_list_views_use_shared_search(self):
+        office, _ = Group.objects.get_or_create(name='Office')
+        user = User.objects.create_user(username='office', password='password')
+        user.groups.add(office)
+        client = Client()
+        client.login(username='office', password='password')
+        ajax = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+        response = client.get(reverse('jobcard_list'), {'q': 'ravi'}, **ajax)
+        self.assertEqual(list(response.context['jobcards']), [self.swift])
+
+        response = client.get(reverse('car_profile_list'), {'q': '5678'}, **ajax)
+        self.assertEqual([c['registration'] for c in response.context['car_profiles']], ['KL01CD5678'])
+
+
+class SearchIndexMigrationTests(TransactionTestCase):
+    """A migration that rebuilds workshop_jobcard must not leave search stale."""
+
+    def test_table_rebuild_then_search(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 index is SQLite only')
+        card = JobCard.objects.create(
+            admitted_date=date.today(), brand_name='Maruti', model_name='Swift',
+            registration_number='KL07AB1234',
+        )
+        self.assertEqual(set(search_job_cards(JobCard.objects.all(), '1234')), {card})
+
+        # What AlterField / RemoveField do on SQLite: copy into a new table, drop the old one
+        with connection.schema_editor() as editor:
+            editor._remake_table(JobCard)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)", FTS_TRIGGERS)
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+        emit_post_migrate_signal(verbosity=0, interactive=False, db=connection.alias)
+
+        card.registration_number = 'KL09ZZ0001'
+        card.save()
+        other = JobCard.objects.create(admitted_date=date.today(), registration_number='KL01CD5678')
+        self.assertEqual(set(search_job_cards(JobCard.objects.all(), 'zz0001')), {card})
+        self.assertEqual(set(search_job_cards(JobCard.objects.all(), '1234')), set())
+        self.assertEqual(set(search_job_cards(JobCard.objects.all(), 'cd5678')), {other})
@@ -1,7 +1,9 @@
 from decimal import Decimal
-from datetime import date
+from datetime import date, timedelta
 
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User, Group
 from django.urls import reverse
 
@@ -128,6 +130,40 @@ class SpareShopViewsExhaustiveTests(TestCase):
         res3 = self.client.get(base_url + '?filter=custom&start_date=2026-01-01&end_date=2026-12-31')
         self.assertEqual(res3.status_code, 200)
 
+    def test_spare_shop_detail_waterfall(self):
+        """Payments cover the oldest purchases first, across the whole history."""
+        def spare(name, price, days_ago):
+            jc = JobCard.objects.create(
+                registration_number='KL01AB1111', brand_name='Honda', model_name='City',
+                admitted_date=date.today() - timedelta(days=days_ago), lead_mechanic=self.mechanic,
+            )
+            return JobCardSpareItem.objects.create(
+                job_card=jc, shop=self.shop, spare_part_name=name, unit_price=Decimal(price),
+                quantity=Decimal('1'), ordered_date=date.today() - timedelta(days=days_ago),
+            )
+
+        oldest = spare('Clutch Plate', '600', 400)
+        middle = spare('Brake Pad', '400', 10)
+        newest = spare('Oil Filter', '300', 1)
+        SpareShopPayment.objects.create(shop=self.shop, amount=Decimal('800'), payment_method='CASH')
+
+        url = reverse('spare_shop_detail', args=[self.shop.pk])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertTrue(any(' OVER ' in q['sql'] for q in ctx.captured_queries))
+        items = {item.pk: item for item in response.context['items']}
+        self.assertEqual(items[oldest.pk].covered_status, 'COVERED')
+        self.assertEqual(items[middle.pk].covered_status, 'PARTIAL')
+        self.assertEqual(items[middle.pk].pending_amount, Decimal('200'))
+        self.assertEqual(items[newest.pk].covered_status, 'UNPAID')
+
+        # The oldest purchase is filtered out of the page but still absorbs payments
+        response = self.client.get(url + '?filter=month')
+        items = {item.pk: item for item in response.context['items']}
+        self.assertNotIn(oldest.pk, items)
+        self.assertEqual(items[middle.pk].covered_status, 'PARTIAL')
+        self.assertEqual(items[newest.pk].covered_status, 'UNPAID')
+
     # -------------------------------------------------------------------------
     # 5. Shop Trashing & Restoring
     # -------------------------------------------------------------------------
@@ -3,7 +3,7 @@ from django.contrib.auth.models import User, Group
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
-from .models import UserSession, FailedAttempt, JobCard, CarBrand, CarModel, SpareShop, SpareShopPayment, JobCardSpareItem
+from .models import UserSession, FailedAttempt, JobCard, CarBrand, CarModel, SpareShop, SpareShopPayment, JobCardSpareItem, BillNumberSequence
 from .auth_views import (
     normalize_phone, mask_phone, get_client_ip, 
     get_owner_mobile, get_owner_username_by_mobile
@@ -146,6 +146,40 @@ class JobCardModelTests(TestCase):
         # TITAN STRICTNESS: Exact representation check
         self.assertEqual(str(job), job.bill_number)
 
+    def test_bill_sequence_past_999(self):
+        """Numbering compares numerically: JB-YY-999 is followed by JB-YY-1000, then 1001."""
+        today = timezone.now().date()
+        year_str = str(today.year)[2:]
+        BillNumberSequence.objects.update_or_create(year=today.year, defaults={'last_number': 999})
+
+        numbers = [
+            JobCard.objects.create(
+                registration_number=f'KA01AB{i}', brand_name='Toyota',
+                model_name='Camry', admitted_date=today,
+            ).bill_number
+            for i in range(2)
+        ]
+        self.assertEqual(numbers, [f'JB-{year_str}-1000', f'JB-{year_str}-1001'])
+
+    def test_bill_sequence_seeds_from_existing_bills(self):
+        """A year without a counter row continues after the highest existing bill."""
+        year = 2019
+        JobCard.objects.create(
+            registration_number='KA01AB0001', brand_name='Toyota', model_name='Camry',
+            admitted_date=timezone.now().date(), bill_number='JB-19-1005',
+        )
+        JobCard.objects.create(
+            registration_number='KA01AB0002', brand_name='Toyota', model_name='Camry',
+            admitted_date=timezone.now().date(), bill_number='JB-19-998',
+        )
+        BillNumberSequence.objects.filter(year=year).delete()
+
+        job = JobCard.objects.create(
+            registration_number='KA01AB0003', brand_name='Toyota', model_name='Camry',
+            admitted_date=timezone.now().date().replace(year=year, month=6, day=1),
+        )
+        self.assertEqual(job.bill_number, 'JB-19-1006')
+
     def test_job_card_soft_delete(self):
         """Verify the soft-delete/trash state."""
         job = JobCard.objects.create(
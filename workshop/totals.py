@@ -0,0 +1,97 @@
+"""
+workshop/totals.py
+==================
+Deferred, Coalesced Total Recomputation
+=======================================
+
+Every JobCardSpareItem / JobCardLabourItem save or delete refreshes the
+denormalized totals of its JobCard (and SpareShop). That is right for a
+single edit, but a formset with 20 lines would run ~40 aggregate queries
+plus updates for the SAME job card and a handful of shops.
+
+Inside `deferred_totals()` those refreshes are only *recorded*; each dirty
+job card and shop is recomputed ONCE when the block exits, still inside the
+block's transaction (so totals commit together with the lines):
+
+    with deferred_totals():
+        spare_formset.save()
+        labour_formset.save()
+    # → job_card.update_totals() ×1, shop.update_totals() ×N distinct shops
+
+Outside the context, recompute_totals() runs immediately (the default).
+
+Other per-line side effects (e.g. inventory stock deltas) can join the same
+block through block_buffer(): they accumulate into a shared buffer that is
+flushed once, before the totals, when the block exits.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+_state = threading.local()
+
+
+def _pending():
+    return getattr(_state, 'pending', None)
+
+
+def recompute_totals(job_card=None, shop=None):
+    """
+    Refreshes the denormalized totals of `job_card` and/or `shop` — now, or
+    once at the end of the enclosing deferred_totals() block.
+    """
+    pending = _pending()
+    if pending is None:
+        if job_card is not None:
+            job_card.update_totals()
+        if shop is not None:
+            shop.update_totals()
+        return
+
+    # Latest instance wins: it carries the freshest dates for the rollups
+    if job_card is not None:
+        pending['job_cards'][job_card.pk] = job_card
+    if shop is not None:
+        pending['shops'][shop.pk] = shop
+
+
+def block_buffer(name, flush):
+    """
+    Returns a dict shared by every caller in the current deferred_totals()
+    block, or None outside a block (callers then apply their change now).
+    `flush(buffer)` is called once when the block exits.
+    """
+    pending = _pending()
+    if pending is None:
+        return None
+    if name not in pending['buffers']:
+        pending['buffers'][name] = ({}, flush)
+    return pending['buffers'][name][0]
+
+
+@contextmanager
+def deferred_totals():
+    """
+    Collects dirty job cards and shops and recomputes each one once on exit.
+    Nested blocks join the outermost one. Nothing is recomputed on error
+    (the transaction is rolled back anyway).
+    """
+    if _pending() is not None:
+        yield
+        return
+
+    _state.pending = {'job_cards': {}, 'shops': {}, 'buffers': {}}
+    try:
+        with transaction.atomic():
+            yield
+            pending, _state.pending = _state.pending, None
+            for buffer, flush in pending['buffers'].values():
+                flush(buffer)
+            for job_card in pending['job_cards'].values():
+                job_card.update_totals()
+            for shop in pending['shops'].values():
+                shop.update_totals()
+    finally:
+        _state.pending = None
@@ -5,6 +5,7 @@ from . import auth_views
 from . import management_views
 from . import cashbook_views
 from . import cleanup_views
+from . import export_views
 from . import analysis_views
 
 urlpatterns = [
@@ -138,6 +139,7 @@ urlpatterns = [
     path('manage/mechanics/<int:mechanic_id>/toggle/', management_views.manage_toggle_mechanic, name='manage_toggle_mechanic'),
     path('manage/mechanics/<int:mechanic_id>/edit/', management_views.manage_edit_mechanic, name='manage_edit_mechanic'),
     path('manage/sessions/<int:session_id>/terminate/', management_views.manage_terminate_session, name='manage_terminate_session'),
+    path('manage/performance/', management_views.manage_performance, name='manage_performance'),
 
     # ------------------
     # CASHBOOK (Office/Owner) — Standalone ledger, NOT part of Manage Accounts
@@ -147,11 +149,16 @@ urlpatterns = [
     path('cashbook/<int:pk>/delete/', cashbook_views.delete_cashbook_entry, name='manage_delete_cashbook_entry'),
     path('cashbook/<int:pk>/edit/',   cashbook_views.edit_cashbook_entry,   name='manage_edit_cashbook_entry'),
 
+    # Streaming CSV / XLSX exports (Office / Owner)
+    path('exports/', export_views.export_home, name='export_home'),
+    path('exports/<str:dataset>/', export_views.export_download, name='export_download'),
+
     # ------------------
     # ANALYSIS & REPORTS (Owner Only)
     # ------------------
     path('analysis/', analysis_views.analysis_dashboard, name='analysis_dashboard'),
     path('analysis/zone/<str:zone_name>/', analysis_views.analysis_zone, name='analysis_zone'),
+    path('analysis/zones/', analysis_views.analysis_zones_batch, name='analysis_zones_batch'),
 
     # ------------------
     # DATA CLEANUP TOOL
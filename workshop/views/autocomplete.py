@@ -1,8 +1,11 @@
 from django.http import JsonResponse
 
-from ..models import CarBrand, CarModel, SparePart, ConcernSolution
+from ..autocomplete_index import suggest
 from ..decorators import staff_required
 
+# Every endpoint below is answered from the in-memory index (no DB query per
+# keystroke), ranked by usage. See workshop/autocomplete_index.py.
+
 
 @staff_required
 def autocomplete_brands(request):
@@ -10,8 +13,7 @@ def autocomplete_brands(request):
     q = request.GET.get('q', '')
     if len(q) < 1:
         return JsonResponse([], safe=False)
-    brands = CarBrand.objects.filter(name__icontains=q).values_list('name', flat=True)[:10]
-    return JsonResponse(list(brands), safe=False)
+    return JsonResponse(suggest('brands', q, 10), safe=False)
 
 
 @staff_required
@@ -21,14 +23,10 @@ def autocomplete_models(request):
     Optional 'brand' param filters by brand name.
     """
     q = request.GET.get('q', '')
-    brand = request.GET.get('brand', '')
-    
-    qs = CarModel.objects.filter(name__icontains=q)
-    if brand:
-        qs = qs.filter(brand__name__icontains=brand)
-        
-    models = qs.values_list('name', flat=True)[:10]
-    return JsonResponse(list(models), safe=False)
+    brand = request.GET.get('brand', '').lower()
+
+    where = (lambda brand_name: brand in brand_name) if brand else None
+    return JsonResponse(suggest('models', q, 10, where=where), safe=False)
 
 
 @staff_required
@@ -41,13 +39,12 @@ def autocomplete_spares(request):
     results = []
     
     # 1. Search Inventory Items (Highest priority, styled in yellow on frontend)
-    from inventory.models import Item
-    inventory_items = Item.objects.filter(name__icontains=q).values_list('name', flat=True)[:5]
+    inventory_items = suggest('inventory', q, 5)
     for name in inventory_items:
         results.append({"name": name, "source": "inventory"})
         
-    # 2. Search Master List Spares
-    master_spares = SparePart.objects.filter(name__icontains=q).exclude(name__in=inventory_items).values_list('name', flat=True)[:10]
+    # 2. Search Master List Spares (skipping names already offered from inventory)
+    master_spares = suggest('spares', q, 10, exclude={name.lower() for name in inventory_items})
     for name in master_spares:
         results.append({"name": name, "source": "master"})
         
@@ -60,5 +57,4 @@ def autocomplete_concerns(request):
     q = request.GET.get('q', '')
     if len(q) < 1:
         return JsonResponse([], safe=False)
-    concerns = ConcernSolution.objects.filter(concern__icontains=q).values_list('concern', flat=True)[:10]
-    return JsonResponse(list(concerns), safe=False)
+    return JsonResponse(suggest('concerns', q, 10), safe=False)
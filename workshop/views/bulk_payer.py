@@ -1,21 +1,23 @@
-import json
 from decimal import Decimal
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.db.models import (
-    Sum, Count, Value, F, OuterRef, Subquery, Max,
-    DecimalField, ExpressionWrapper, IntegerField,
+    Sum, Count, Value, F, OuterRef, Subquery, Case, When,
+    DecimalField, ExpressionWrapper,
 )
-from django.db.models.functions import Coalesce
+from django.db.models.functions import Greatest
 from django.db import transaction
 from django.core.paginator import Paginator
+from django.utils import timezone
 
 from ..models import (
-    JobCard, JobCardSpareItem, JobCardLabourItem,
-    BulkPayer, BulkPaymentHistory,
+    JobCard, BulkPayer, BulkPaymentHistory, BulkPaymentAllocation,
 )
+from ..analysis_cache import bump_zone_cache_version
+from ..bulk_balances import refresh_for_job_cards
 from ..decorators import office_required, owner_required
+from ..rollups import refresh_rollups
 
 
 @office_required
@@ -23,73 +25,10 @@ def bulk_payer_list(request):
     """
     Returns the list of all bulk payers as an AJAX partial.
     Called from the Pending Bills page.
-    Million-data safe: all aggregation done in SQL, zero Python loops.
+    Million-data safe: pending_card_count / outstanding_balance are stored
+    on BulkPayer (workshop/bulk_balances.py) — ONE plain query, no subqueries.
     """
-    # SQL subquery: count of PENDING/PARTIAL job cards per payer
-    pending_count_sq = (
-        BulkPayer.job_cards.through.objects
-        .filter(
-            bulkpayer_id=OuterRef('pk'),
-            jobcard__payment_status__in=['PENDING', 'PARTIAL'],
-        )
-        .values('bulkpayer_id')
-        .annotate(n=Count('jobcard_id'))
-        .values('n')
-    )
-
-    # SQL subquery: sum of received_amount for PENDING/PARTIAL job cards
-    received_sq = (
-        BulkPayer.job_cards.through.objects
-        .filter(
-            bulkpayer_id=OuterRef('pk'),
-            jobcard__payment_status__in=['PENDING', 'PARTIAL'],
-        )
-        .values('bulkpayer_id')
-        .annotate(s=Sum('jobcard__received_amount'))
-        .values('s')
-    )
-
-    # SQL subquery: sum of spares for PENDING/PARTIAL job cards
-    spares_sq = (
-        JobCardSpareItem.objects
-        .filter(
-            job_card__bulk_payers=OuterRef('pk'),
-            job_card__payment_status__in=['PENDING', 'PARTIAL'],
-        )
-        .values('job_card__bulk_payers')
-        .annotate(s=Sum('total_price'))
-        .values('s')
-    )
-
-    # SQL subquery: sum of labour for PENDING/PARTIAL job cards
-    labour_sq = (
-        JobCardLabourItem.objects
-        .filter(
-            job_card__bulk_payers=OuterRef('pk'),
-            job_card__payment_status__in=['PENDING', 'PARTIAL'],
-        )
-        .values('job_card__bulk_payers')
-        .annotate(s=Sum('amount'))
-        .values('s')
-    )
-
-    bulk_payers = (
-        BulkPayer.objects
-        .filter(is_trashed=False)
-        .annotate(
-            card_count=Coalesce(Subquery(pending_count_sq, output_field=IntegerField()), Value(0)),
-            total_spares=Coalesce(Subquery(spares_sq, output_field=DecimalField()), Value(0, output_field=DecimalField())),
-            total_labour=Coalesce(Subquery(labour_sq, output_field=DecimalField()), Value(0, output_field=DecimalField())),
-            total_received=Coalesce(Subquery(received_sq, output_field=DecimalField()), Value(0, output_field=DecimalField())),
-        )
-        .annotate(
-            total_balance=ExpressionWrapper(
-                F('total_spares') + F('total_labour') - F('total_received'),
-                output_field=DecimalField()
-            )
-        )
-        .order_by('customer_name')
-    )
+    bulk_payers = BulkPayer.objects.filter(is_trashed=False).order_by('customer_name')
 
     return render(request, 'workshop/jobcard/bulk_payer_panel.html', {
         'bulk_payers': bulk_payers,
@@ -143,15 +82,12 @@ def bulk_payer_detail(request, pk):
     )
     
     # -------------------------------------------------------------------------
-    # 1. Grand totals (Calculated efficiently in SQL without Python loops)
+    # 1. Grand totals (count and balance are precomputed on BulkPayer)
     # -------------------------------------------------------------------------
     total_received_all = base_cards_query.aggregate(s=Sum('received_amount'))['s'] or Decimal('0.0')
-    total_spares = JobCardSpareItem.objects.filter(job_card__in=base_cards_query).aggregate(s=Sum('total_price'))['s'] or Decimal('0.0')
-    total_labour = JobCardLabourItem.objects.filter(job_card__in=base_cards_query).aggregate(s=Sum('amount'))['s'] or Decimal('0.0')
-    
-    total_bill_all = total_spares + total_labour
-    total_balance_all = max(Decimal('0.0'), total_bill_all - total_received_all)
-    card_count = base_cards_query.count()
+    total_bill_all = bulk_payer.outstanding_balance + total_received_all
+    total_balance_all = max(Decimal('0.0'), bulk_payer.outstanding_balance)
+    card_count = bulk_payer.pending_card_count
 
     # -------------------------------------------------------------------------
     # 2. Per-row Financial Annotations
@@ -280,6 +216,8 @@ def bulk_payer_pay(request, pk):
     POST: Process a lump sum payment via the Cascade Algorithm.
     Distributes payment oldest-first. Fully paid cards get BULK_PAID status.
     Thread-safe with select_for_update.
+    Set-based: one streamed locked read, the allocation in memory, one
+    bulk_update — a constant number of queries however many cards are paid.
     """
     if request.method != 'POST':
         return redirect('bulk_payer_detail', pk=pk)
@@ -299,23 +237,26 @@ def bulk_payer_pay(request, pk):
     
 
     with transaction.atomic():
+        # QUERY 1 (the only read): pending cards oldest-first, locked as they
+        # are streamed. The loop stops once the funds run out, so only the
+        # cards that actually receive money are fetched and locked.
         pending_cards = bulk_payer.job_cards.select_for_update().filter(
             payment_status__in=['PENDING', 'PARTIAL']
         ).annotate(
             balance_amount=ExpressionWrapper(F('total_bill_amount') - F('received_amount'), output_field=DecimalField())
+        ).filter(balance_amount__gt=0).only(
+            'pk', 'admitted_date', 'discharged_date', 'registration_number', 'brand_name', 'model_name',
+            'received_amount', 'total_bill_amount', 'payment_status', 'payment_method', 'discount_amount',
         ).order_by('admitted_date', 'pk')  # Oldest first
         
         remaining_funds = lump_sum
-        jobs_updated = 0
-        history_details = []  # Track per-job breakdown for history
+        now = timezone.now()
+        paid_jobs = []
+        allocations = []  # Per-job breakdown for history (BulkPaymentAllocation)
         
-        for job in pending_cards:
-            if remaining_funds <= 0:
-                break
-            
+        # In-memory cascade allocation (no per-card save / signals)
+        for job in pending_cards.iterator(chunk_size=200):
             balance = job.balance_amount
-            if balance <= 0:
-                continue
             
             if remaining_funds >= balance:
                 # Fully pay this card
@@ -333,24 +274,39 @@ def bulk_payer_pay(request, pk):
                 job.payment_method = payment_method
                 remaining_funds = Decimal('0')
             
-            job.save()
-            jobs_updated += 1
-            history_details.append({
-                'job_id': job.pk,
-                'reg': job.registration_number,
-                'car': f"{job.brand_name} {job.model_name}",
-                'paid': str(paid_amount),
-                'status': job.payment_status,
-            })
+            job.updated_at = now
+            paid_jobs.append(job)
+            allocations.append(BulkPaymentAllocation(
+                job_card=job, amount=paid_amount, resulting_status=job.payment_status,
+            ))
+            if remaining_funds <= 0:
+                break
+        
+        # QUERY 2: one batched UPDATE for every paid card
+        JobCard.objects.bulk_update(
+            paid_jobs,
+            ['received_amount', 'payment_status', 'payment_method', 'discount_amount', 'updated_at'],
+            batch_size=500,
+        )
+        jobs_updated = len(paid_jobs)
         
-        # Create payment history record
-        BulkPaymentHistory.objects.create(
+        # QUERY 3 + 4: payment history record and its allocation rows
+        history = BulkPaymentHistory.objects.create(
             bulk_payer=bulk_payer,
             amount=lump_sum,
             payment_method=payment_method,
             jobs_affected=jobs_updated,
-            details=json.dumps(history_details),
         )
+        for allocation in allocations:
+            allocation.history = history
+        BulkPaymentAllocation.objects.bulk_create(allocations, batch_size=500)
+        
+        # bulk_update sends no post_save: refresh the affected rollup days
+        # analysis caches and payer balances once for the whole cascade
+        touched_days = [d for job in paid_jobs for d in (job.admitted_date, job.discharged_date)]
+        refresh_rollups(admitted_days=touched_days, discharged_days=touched_days)
+        bump_zone_cache_version(*touched_days)
+        refresh_for_job_cards([job.pk for job in paid_jobs])
     
     messages.success(request, f"₹{lump_sum:,.0f} distributed across {jobs_updated} job(s) for {bulk_payer.customer_name}.")
     return redirect('bulk_payer_detail', pk=pk)
@@ -417,33 +373,38 @@ def bulk_payment_history_delete(request, pk, history_pk):
         return redirect('bulk_payer_detail', pk=pk)
     
     bulk_payer = get_object_or_404(BulkPayer, pk=pk)
-    history = get_object_or_404(BulkPaymentHistory, pk=history_pk, bulk_payer=bulk_payer)
+    # Already-trashed entries were reversed once; never reverse twice
+    history = get_object_or_404(BulkPaymentHistory, pk=history_pk, bulk_payer=bulk_payer, is_trashed=False)
     
     with transaction.atomic():
-        # Reverse payments from the history snapshot
-        try:
-            details = json.loads(history.details)
-        except (json.JSONDecodeError, TypeError):
-            details = []
+        affected = JobCard.objects.filter(bulk_allocations__history=history)
+        affected_rows = list(affected.values_list('pk', 'admitted_date', 'discharged_date'))
+        touched_days = [d for _, admitted, discharged in affected_rows for d in (admitted, discharged)]
         
-        for entry in details:
-            try:
-                job = JobCard.objects.select_for_update().get(pk=entry['job_id'])
-                reversed_amount = Decimal(str(entry['paid']))
-                job.received_amount = max(Decimal('0'), job.received_amount - reversed_amount)
-                
-                # Recalculate status
-                if job.received_amount <= 0:
-                    job.payment_status = 'PENDING'
-                else:
-                    job.payment_status = 'PARTIAL'
-                
-                job.save()
-            except (JobCard.DoesNotExist, KeyError, Exception):
-                continue
+        # ONE set-based UPDATE: subtract each job's allocation (floored at 0)
+        # and recalculate the status from what is left
+        allocated = Subquery(
+            BulkPaymentAllocation.objects.filter(history=history, job_card=OuterRef('pk')).values('amount')[:1],
+            output_field=DecimalField(),
+        )
+        remaining = Greatest(F('received_amount') - allocated, Value(Decimal('0')), output_field=DecimalField())
+        affected.update(
+            received_amount=remaining,
+            payment_status=Case(
+                When(received_amount__lte=allocated, then=Value('PENDING')),
+                default=Value('PARTIAL'),
+            ),
+            updated_at=timezone.now(),
+        )
         
         history.is_trashed = True
         history.save()
+        
+        # update() sends no post_save: refresh rollups, analysis caches and
+        # payer balances once
+        refresh_rollups(admitted_days=touched_days, discharged_days=touched_days)
+        bump_zone_cache_version(*touched_days)
+        refresh_for_job_cards([pk for pk, _, _ in affected_rows])
     
     messages.success(request, f"Payment of ₹{history.amount:,.0f} reversed and moved to Trash.")
     return redirect('bulk_payer_detail', pk=pk)
@@ -1,10 +1,11 @@
 from django.shortcuts import render
 from django.http import Http404
-from django.db.models import Count, Max, Q
+from django.db.models import Count, Max
 from django.core.paginator import Paginator
 
 from ..models import JobCard
 from ..decorators import office_required
+from ..search import search_job_cards
 
 
 @office_required
@@ -21,15 +22,9 @@ def car_profile_list(request):
     is_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest'
     q = request.GET.get('q', '').strip() if is_ajax else ''
 
-    # 3. Apply Multi-Field Search (Database Level)
+    # 3. Apply Multi-Field Search (Indexed, see workshop/search.py)
     if q:
-        for word in q.split():
-            cars_query = cars_query.filter(
-                Q(registration_number__icontains=word) |
-                Q(customer_name__icontains=word) |
-                Q(brand_name__icontains=word) |
-                Q(model_name__icontains=word)
-            )
+        cars_query = search_job_cards(cars_query, q)
 
     # 4. Pagination (Pro-Active Scaling)
     paginator = Paginator(cars_query, 45)
@@ -6,6 +6,7 @@ from django.core.paginator import Paginator
 
 from ..models import JobCard
 from ..decorators import staff_required
+from ..search import search_job_cards
 
 
 @staff_required
@@ -65,13 +66,7 @@ def live_report(request):
     )
 
     if q:
-        for word in q.split():
-            active_jobs = active_jobs.filter(
-                Q(registration_number__icontains=word) |
-                Q(bill_number__icontains=word) |
-                Q(brand_name__icontains=word) |
-                Q(model_name__icontains=word)
-            )
+        active_jobs = search_job_cards(active_jobs, q)
             
     if status == 'PAID':
         active_jobs = active_jobs.filter(payment_status='PAID')
@@ -1,11 +1,11 @@
 from datetime import date, timedelta
 
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Q
 from django.core.paginator import Paginator
 
 from ..models import JobCard
 from ..decorators import office_required
+from ..search import search_job_cards
 
 
 @office_required
@@ -26,15 +26,9 @@ def delivered_list(request):
         filter_type = request.GET.get('filter', 'today')
         q = request.GET.get('q', '').strip()
 
-    # 3. Apply Search Filters (Registration, Customer, Brand, Model)
+    # 3. Apply Search Filters (Registration, Bill, Customer, Vehicle, Mechanic — indexed)
     if q:
-        for word in q.split():
-            delivered_jobcards = delivered_jobcards.filter(
-                Q(registration_number__icontains=word) |
-                Q(customer_name__icontains=word) |
-                Q(brand_name__icontains=word) |
-                Q(model_name__icontains=word)
-            )
+        delivered_jobcards = search_job_cards(delivered_jobcards, q)
     
     # 4. Apply Date Filters (initialize variables to prevent NameError)
     start_date = ''
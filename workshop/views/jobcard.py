@@ -2,7 +2,6 @@ from datetime import date
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Q
 from django.core.paginator import Paginator
 
 from ..models import (
@@ -13,7 +12,10 @@ from ..models import (
 from ..forms import (
     JobCardForm, JobCardConcernFormSet, JobCardSpareFormSet, JobCardLabourFormSet
 )
+from ..autocomplete_index import invalidate_autocomplete
 from ..decorators import staff_required, office_required
+from ..search import search_job_cards
+from ..totals import deferred_totals, recompute_totals
 
 
 @staff_required
@@ -80,62 +82,68 @@ def jobcard_create(request):
             labour_formset = JobCardLabourFormSet(request.POST, prefix='labours')
 
             if concern_formset.is_valid() and spare_formset.is_valid() and labour_formset.is_valid():
-                jobcard.save()
+                # One totals recompute per job card / shop for the whole formset save
+                with deferred_totals():
+                    jobcard.save()
 
-                # Associate instances with jobcard before saving
-                concern_formset.instance = jobcard
-                spare_formset.instance = jobcard
-                labour_formset.instance = jobcard
+                    # Associate instances with jobcard before saving
+                    concern_formset.instance = jobcard
+                    spare_formset.instance = jobcard
+                    labour_formset.instance = jobcard
 
-                saved_concerns = concern_formset.save()
-                saved_spares = spare_formset.save()
-                labour_formset.save()
+                    saved_concerns = concern_formset.save()
+                    saved_spares = spare_formset.save()
+                    labour_formset.save()
                 
-                # FIX-4E: Auto-learn Batch Optimization
-                new_concern_texts = [c.concern_text.strip() for c in saved_concerns if c.concern_text and c.concern_text.strip()]
-                if new_concern_texts:
-                    existing_concerns = set(ConcernSolution.objects.filter(
-                        concern__in=new_concern_texts
-                    ).values_list('concern', flat=True))
-                    new_concerns = [ConcernSolution(concern=t) for t in new_concern_texts if t not in existing_concerns]
-                    ConcernSolution.objects.bulk_create(new_concerns, ignore_conflicts=True)
+                    # FIX-4E: Auto-learn Batch Optimization
+                    new_concern_texts = [c.concern_text.strip() for c in saved_concerns if c.concern_text and c.concern_text.strip()]
+                    if new_concern_texts:
+                        existing_concerns = set(ConcernSolution.objects.filter(
+                            concern__in=new_concern_texts
+                        ).values_list('concern', flat=True))
+                        new_concerns = [ConcernSolution(concern=t) for t in new_concern_texts if t not in existing_concerns]
+                        ConcernSolution.objects.bulk_create(new_concerns, ignore_conflicts=True)
+                        if new_concerns:
+                            invalidate_autocomplete('concerns')  # bulk_create sends no signals
                 
-                new_spare_names = [s.spare_part_name.strip() for s in saved_spares if s.spare_part_name and s.spare_part_name.strip()]
-                if new_spare_names:
-                    existing_spares = set(SparePart.objects.filter(
-                        name__in=new_spare_names
-                    ).values_list('name', flat=True))
-                    new_spare_parts = [SparePart(name=n) for n in new_spare_names if n not in existing_spares]
-                    SparePart.objects.bulk_create(new_spare_parts, ignore_conflicts=True)
+                    new_spare_names = [s.spare_part_name.strip() for s in saved_spares if s.spare_part_name and s.spare_part_name.strip()]
+                    if new_spare_names:
+                        existing_spares = set(SparePart.objects.filter(
+                            name__in=new_spare_names
+                        ).values_list('name', flat=True))
+                        new_spare_parts = [SparePart(name=n) for n in new_spare_names if n not in existing_spares]
+                        SparePart.objects.bulk_create(new_spare_parts, ignore_conflicts=True)
+                        if new_spare_parts:
+                            invalidate_autocomplete('spares')
 
-                # FIX-4C: Batch shop lookup
-                all_spares = list(jobcard.spares.all())
-                shop_names = {s.shop_name.strip().lower() for s in all_spares if s.shop_name and s.shop_name.strip()}
-                shops_map = {}
-                if shop_names:
-                    for shop in SpareShop.objects.filter(is_trashed=False):
-                        shops_map[shop.name.lower()] = shop
+                    # FIX-4C: Batch shop lookup
+                    all_spares = list(jobcard.spares.all())
+                    shop_names = {s.shop_name.strip().lower() for s in all_spares if s.shop_name and s.shop_name.strip()}
+                    shops_map = {}
+                    if shop_names:
+                        for shop in SpareShop.objects.filter(is_trashed=False):
+                            shops_map[shop.name.lower()] = shop
                 
-                shops_to_update = set()
-                for spare in all_spares:
-                    key = spare.shop_name.strip().lower() if spare.shop_name else None
-                    shop_obj = shops_map.get(key) if key else None
-                    JobCardSpareItem.objects.filter(pk=spare.pk).update(shop=shop_obj)
-                    if shop_obj:
-                        shops_to_update.add(shop_obj)
+                    shops_to_update = set()
+                    for spare in all_spares:
+                        key = spare.shop_name.strip().lower() if spare.shop_name else None
+                        shop_obj = shops_map.get(key) if key else None
+                        JobCardSpareItem.objects.filter(pk=spare.pk).update(shop=shop_obj)
+                        if shop_obj:
+                            shops_to_update.add(shop_obj)
 
-                # Delete imported unassigned spares to prevent duplicates
-                imported_ids = request.POST.getlist('imported_unassigned_ids')
-                if imported_ids:
-                    old_items = JobCardSpareItem.objects.filter(pk__in=imported_ids, job_card__isnull=True)
-                    for old_item in old_items.select_related('shop'):
-                        if old_item.shop:
-                            shops_to_update.add(old_item.shop)
-                    old_items.delete()
+                    # Delete imported unassigned spares to prevent duplicates
+                    imported_ids = request.POST.getlist('imported_unassigned_ids')
+                    if imported_ids:
+                        old_items = JobCardSpareItem.objects.filter(pk__in=imported_ids, job_card__isnull=True)
+                        for old_item in old_items.select_related('shop'):
+                            if old_item.shop:
+                                shops_to_update.add(old_item.shop)
+                        old_items.delete()
 
-                # Update totals for all affected shops
-                for shop in shops_to_update:
-                    shop.update_totals()
+                    # Update totals for all affected shops
+                    for shop in shops_to_update:
+                        recompute_totals(shop=shop)
 
                 messages.success(request, f'Job card for {jobcard.registration_number} created successfully!')
                 return redirect('jobcard_edit', pk=jobcard.pk)
@@ -183,16 +191,7 @@ def jobcard_list(request):
     q = request.GET.get('q', '').strip() if is_ajax else ''
     
     if q:
-        for word in q.split():
-            jobcard_list_query = jobcard_list_query.filter(
-                Q(registration_number__icontains=word) |
-                Q(bill_number__icontains=word) |
-                Q(brand_name__icontains=word) |
-                Q(model_name__icontains=word) |
-                Q(customer_name__icontains=word) |
-                Q(customer_contact__icontains=word) |
-                Q(lead_mechanic__name__icontains=word)
-            )
+        jobcard_list_query = search_job_cards(jobcard_list_query, q)
         
     paginator = Paginator(jobcard_list_query, 45)  # Show 45 jobs per page
     
@@ -236,56 +235,62 @@ def jobcard_edit(request, pk):
         labour_formset = JobCardLabourFormSet(request.POST, instance=jobcard, prefix='labours')
 
         if form.is_valid() and concern_formset.is_valid() and spare_formset.is_valid() and labour_formset.is_valid():
-            form.save()
-            saved_concerns = concern_formset.save()
-            saved_spares = spare_formset.save()
-            labour_formset.save()
+            # One totals recompute per job card / shop for the whole formset save
+            with deferred_totals():
+                form.save()
+                saved_concerns = concern_formset.save()
+                saved_spares = spare_formset.save()
+                labour_formset.save()
             
-            # FIX-4E: Auto-learn Batch Optimization
-            new_concern_texts = [c.concern_text.strip() for c in saved_concerns if c.concern_text and c.concern_text.strip()]
-            if new_concern_texts:
-                existing_concerns = set(ConcernSolution.objects.filter(
-                    concern__in=new_concern_texts
-                ).values_list('concern', flat=True))
-                new_concerns = [ConcernSolution(concern=t) for t in new_concern_texts if t not in existing_concerns]
-                ConcernSolution.objects.bulk_create(new_concerns, ignore_conflicts=True)
+                # FIX-4E: Auto-learn Batch Optimization
+                new_concern_texts = [c.concern_text.strip() for c in saved_concerns if c.concern_text and c.concern_text.strip()]
+                if new_concern_texts:
+                    existing_concerns = set(ConcernSolution.objects.filter(
+                        concern__in=new_concern_texts
+                    ).values_list('concern', flat=True))
+                    new_concerns = [ConcernSolution(concern=t) for t in new_concern_texts if t not in existing_concerns]
+                    ConcernSolution.objects.bulk_create(new_concerns, ignore_conflicts=True)
+                    if new_concerns:
+                        invalidate_autocomplete('concerns')  # bulk_create sends no signals
             
-            new_spare_names = [s.spare_part_name.strip() for s in saved_spares if s.spare_part_name and s.spare_part_name.strip()]
-            if new_spare_names:
-                existing_spares = set(SparePart.objects.filter(
-                    name__in=new_spare_names
-                ).values_list('name', flat=True))
-                new_spare_parts = [SparePart(name=n) for n in new_spare_names if n not in existing_spares]
-                SparePart.objects.bulk_create(new_spare_parts, ignore_conflicts=True)
+                new_spare_names = [s.spare_part_name.strip() for s in saved_spares if s.spare_part_name and s.spare_part_name.strip()]
+                if new_spare_names:
+                    existing_spares = set(SparePart.objects.filter(
+                        name__in=new_spare_names
+                    ).values_list('name', flat=True))
+                    new_spare_parts = [SparePart(name=n) for n in new_spare_names if n not in existing_spares]
+                    SparePart.objects.bulk_create(new_spare_parts, ignore_conflicts=True)
+                    if new_spare_parts:
+                        invalidate_autocomplete('spares')
 
-            # FIX-4C: Batch shop lookup
-            all_spares = list(jobcard.spares.all())
-            shop_names = {s.shop_name.strip().lower() for s in all_spares if s.shop_name and s.shop_name.strip()}
-            shops_map = {}
-            if shop_names:
-                for shop in SpareShop.objects.filter(is_trashed=False):
-                    shops_map[shop.name.lower()] = shop
+                # FIX-4C: Batch shop lookup
+                all_spares = list(jobcard.spares.all())
+                shop_names = {s.shop_name.strip().lower() for s in all_spares if s.shop_name and s.shop_name.strip()}
+                shops_map = {}
+                if shop_names:
+                    for shop in SpareShop.objects.filter(is_trashed=False):
+                        shops_map[shop.name.lower()] = shop
             
-            shops_to_update = set()
-            for spare in all_spares:
-                key = spare.shop_name.strip().lower() if spare.shop_name else None
-                shop_obj = shops_map.get(key) if key else None
-                JobCardSpareItem.objects.filter(pk=spare.pk).update(shop=shop_obj)
-                if shop_obj:
-                    shops_to_update.add(shop_obj)
+                shops_to_update = set()
+                for spare in all_spares:
+                    key = spare.shop_name.strip().lower() if spare.shop_name else None
+                    shop_obj = shops_map.get(key) if key else None
+                    JobCardSpareItem.objects.filter(pk=spare.pk).update(shop=shop_obj)
+                    if shop_obj:
+                        shops_to_update.add(shop_obj)
 
-            # Delete imported unassigned spares to prevent duplicates
-            imported_ids = request.POST.getlist('imported_unassigned_ids')
-            if imported_ids:
-                old_items = JobCardSpareItem.objects.filter(pk__in=imported_ids, job_card__isnull=True)
-                for old_item in old_items.select_related('shop'):
-                    if old_item.shop:
-                        shops_to_update.add(old_item.shop)
-                old_items.delete()
+                # Delete imported unassigned spares to prevent duplicates
+                imported_ids = request.POST.getlist('imported_unassigned_ids')
+                if imported_ids:
+                    old_items = JobCardSpareItem.objects.filter(pk__in=imported_ids, job_card__isnull=True)
+                    for old_item in old_items.select_related('shop'):
+                        if old_item.shop:
+                            shops_to_update.add(old_item.shop)
+                    old_items.delete()
 
-            # Update totals for all affected shops
-            for shop in shops_to_update:
-                shop.update_totals()
+                # Update totals for all affected shops
+                for shop in shops_to_update:
+                    recompute_totals(shop=shop)
 
             messages.success(request, f'Job card for {jobcard.registration_number} updated successfully!')
             
@@ -2,7 +2,7 @@ from decimal import Decimal
 
 from django.shortcuts import render
 from django.db.models import (
-    Sum, Q, Value, F, OuterRef, Subquery,
+    Sum, Value, F, OuterRef, Subquery,
     DecimalField, ExpressionWrapper,
 )
 from django.db.models.functions import Coalesce
@@ -10,6 +10,7 @@ from django.core.paginator import Paginator
 
 from ..models import JobCard, JobCardSpareItem, JobCardLabourItem
 from ..decorators import office_required
+from ..search import search_job_cards
 
 
 @office_required
@@ -27,13 +28,7 @@ def pending_payments_list(request):
     is_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest'
     q = request.GET.get('q', '').strip() if is_ajax else ''
     if q:
-        for word in q.split():
-            pending_jobs = pending_jobs.filter(
-                Q(registration_number__icontains=word) |
-                Q(customer_name__icontains=word) |
-                Q(brand_name__icontains=word) |
-                Q(model_name__icontains=word)
-            )
+        pending_jobs = search_job_cards(pending_jobs, q)
 
     pending_jobs = pending_jobs.annotate(
         balance_amount=ExpressionWrapper(
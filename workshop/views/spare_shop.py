@@ -11,6 +11,14 @@ from django.core.paginator import Paginator
 
 from ..models import JobCardSpareItem, SpareShop, SpareShopPayment
 from ..decorators import office_required, owner_required
+from ..ledger import apply_waterfall, running_totals
+
+# Shop cost of one spare line (quantity defaults to 1)
+ITEM_COST = ExpressionWrapper(
+    Coalesce(F('unit_price'), Value(Decimal('0'), output_field=DecimalField())) *
+    Coalesce(F('quantity'), Value(Decimal('1'), output_field=DecimalField())),
+    output_field=DecimalField()
+)
 
 
 @office_required
@@ -141,30 +149,7 @@ def spare_shop_detail(request, pk):
                 created_at__date__lte=end_date_str
             )
 
-    from django.db.models import OuterRef, Subquery, Q
-    older_items_sum_sq = JobCardSpareItem.objects.filter(
-        shop=OuterRef('shop')
-    ).filter(
-        Q(job_card__admitted_date__lt=OuterRef('job_card__admitted_date')) | 
-        Q(job_card__admitted_date=OuterRef('job_card__admitted_date'), pk__lte=OuterRef('pk'))
-    ).values('shop').annotate(
-        total=Sum(
-            ExpressionWrapper(
-                Coalesce(F('unit_price'), Value(Decimal('0'), output_field=DecimalField())) * 
-                Coalesce(F('quantity'), Value(Decimal('1'), output_field=DecimalField())),
-                output_field=DecimalField()
-            )
-        )
-    ).values('total')
-
-    items_qs = items_qs.annotate(
-        absolute_running_sum=Coalesce(Subquery(older_items_sum_sq), Decimal('0'), output_field=DecimalField()),
-        item_cost=ExpressionWrapper(
-            Coalesce(F('unit_price'), Value(Decimal('0'), output_field=DecimalField())) * 
-            Coalesce(F('quantity'), Value(Decimal('1'), output_field=DecimalField())),
-            output_field=DecimalField()
-        )
-    )
+    items_qs = items_qs.annotate(item_cost=ITEM_COST)
 
     total_purchases = shop.total_purchased_amount
     total_paid = shop.total_paid_amount
@@ -173,24 +158,17 @@ def spare_shop_detail(request, pk):
 
     paginator = Paginator(items_qs, 45)
     page_obj = paginator.get_page(request.GET.get('page'))
-    
+
     # ── Absolute Ledger Waterfall Calculation ──
+    # Running sums over the shop's whole history (oldest first), one window query
     page_items = list(page_obj)
-    for item in page_items:
-        item_cost = item.item_cost
-        older_sum = item.absolute_running_sum - item_cost
-        bulk_pool = total_paid - older_sum
-        
-        if bulk_pool >= item_cost:
-            item.covered_status = 'COVERED'
-            item.pending_amount = Decimal('0')
-        elif bulk_pool <= Decimal('0'):
-            item.covered_status = 'UNPAID'
-            item.pending_amount = item_cost
-        else:
-            item.covered_status = 'PARTIAL'
-            item.pending_amount = item_cost - bulk_pool
-            item.covered_amount = bulk_pool
+    running = running_totals(
+        JobCardSpareItem.objects.filter(shop=shop),
+        amount=ITEM_COST,
+        order_by=[Coalesce('job_card__admitted_date', 'ordered_date', 'received_date').asc(), F('pk').asc()],
+        pks=[item.pk for item in page_items],
+    )
+    apply_waterfall(page_items, running, total_paid, amount=lambda item: item.item_cost)
 
     pay_paginator = Paginator(payment_qs, 15)
     pay_page_obj = pay_paginator.get_page(request.GET.get('pay_page'))
@@ -360,7 +338,7 @@ def spare_shop_print(request, pk):
 
     # Grand totals (pure SQL)
     total_purchases = items_qs.aggregate(
-        total_purchases=Coalesce(Sum(ExpressionWrapper(F('unit_price') * Coalesce(F('quantity'), Value(Decimal('1'), output_field=DecimalField())), output_field=DecimalField())), Value(Decimal('0'), output_field=DecimalField()), output_field=DecimalField())
+        total_purchases=Coalesce(Sum(ITEM_COST), Value(Decimal('0'), output_field=DecimalField()), output_field=DecimalField())
     )['total_purchases']
     
     total_paid = payment_qs.aggregate(